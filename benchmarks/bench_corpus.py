@@ -0,0 +1,62 @@
+"""
+Benchmark corpus-wide brand voice analysis against the number of processes.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_corpus --posts 50000
+    python -m benchmarks.bench_corpus --posts 50000 --processes 1 --processes 2 --processes 4
+
+A synthetic corpus (see `benchmarks.corpus`) is stored for one user in a
+temporary SQLite database and analysed once per process count.  The
+speedup is relative to the single-process run; near-linear scaling needs
+as many idle cores as processes.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+BENCH_USER_ID = "__bench_corpus__"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--posts", type=int, default=50000)
+    parser.add_argument("--processes", type=int, action="append", help="Process count to try; may be repeated")
+    args = parser.parse_args()
+    counts = args.processes or sorted({1, 2, os.cpu_count() or 1})
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    from benchmarks.corpus import generate_records
+    from main import create_app
+    from services.brand_voice_service import brand_voice_service
+    from services.brand_voice_analysis_service import analyze_posts_by_type
+    from services.corpus_analysis_service import corpus_analysis_service
+
+    app = create_app()
+    with app.app_context():
+        brand_voice_service.add_training_data_batch(generate_records(args.posts, [BENCH_USER_ID], seed=1))
+        corpus_analysis_service.min_parallel = 0
+        baseline = None
+        for processes in counts:
+            corpus_analysis_service.shutdown()
+            corpus_analysis_service.processes = processes
+            if processes > 1:
+                # Start the workers outside the timed run
+                pool = corpus_analysis_service._get_pool()
+                for future in [pool.submit(analyze_posts_by_type, []) for _ in range(processes)]:
+                    future.result()
+            start = time.perf_counter()
+            result = corpus_analysis_service.analyze_user_corpus(BENCH_USER_ID)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(
+                f"{processes:>3} process(es): {result['post_count']} posts in {elapsed:.2f}s "
+                f"({result['post_count'] / elapsed:,.0f} posts/s, {baseline / elapsed:.2f}x)"
+            )
+        corpus_analysis_service.shutdown()
+
+
+if __name__ == "__main__":
+    main()
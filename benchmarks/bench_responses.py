@@ -0,0 +1,109 @@
+"""
+Benchmark response encoding: bytes on the wire and JSON serialisation time.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_responses
+    python -m benchmarks.bench_responses --tests 500 --repeat 200
+
+Seeds a temporary SQLite database with training data, A/B tests and the
+WECAR fixture report, then requests each endpoint with identity, gzip
+and (when installed) brotli encoding.  Serialisation time compares
+Flask's default JSON provider with `FastJSONProvider` on each response
+body.  ``/generate-content`` is measured with and without echoed
+request fields.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+BENCH_USER_ID = "__bench_responses__"
+
+
+def seed(app, tests: int) -> None:
+    from services.ab_testing_service import ab_testing_service
+    from services.brand_voice_service import brand_voice_service
+    from services.wecar_ingestion_service import wecar_ingestion_service
+
+    with app.app_context():
+        brand_voice_service.add_training_data_batch(
+            [
+                {
+                    "user_id": BENCH_USER_ID,
+                    "content": f"Just listed in Windsor! Post {i} #WindsorRealEstate #JustListed 🏡",
+                    "post_type": "listing",
+                }
+                for i in range(200)
+            ]
+        )
+        for i in range(tests):
+            ab_testing_service.create_test_variations(
+                f"Benchmark test {i}",
+                {"content": f"Open house this weekend {i}!", "content_type": "listing", "platform": "instagram"},
+            )
+        wecar_ingestion_service.ingest(os.path.join("fixtures", "wecar", "monthly_statistics.html"))
+
+
+def endpoints(tests: int) -> list:
+    profile = {
+        "dominant_tone": "energetic",
+        "writing_style": "balanced",
+        "hashtags": ["#WindsorRealEstate", "#JustListed"],
+        "vocabulary": {"avg_word_length": 4.8},
+        "top_hashtags": [{"tag": f"#tag{i}", "count": 100 - i} for i in range(50)],
+    }
+    generate = {"prompt": "Write about our new listing", "user_id": BENCH_USER_ID, "brand_profile": profile}
+    return [
+        ("GET /ab-testing/tests", "get", f"/api/ab-testing/tests?limit={min(tests, 200)}", None),
+        ("GET /ab-testing/tests?summary", "get", f"/api/ab-testing/tests?limit={min(tests, 200)}&summary=true", None),
+        ("POST /generate-content", "post", "/api/brand-voice/generate-content", generate),
+        ("POST /generate-content echo=false", "post", "/api/brand-voice/generate-content", dict(generate, echo=False)),
+        ("GET /voice-profile", "get", f"/api/brand-voice/voice-profile?user_id={BENCH_USER_ID}", None),
+        ("GET /training-data", "get", f"/api/brand-voice/training-data?user_id={BENCH_USER_ID}&limit=200", None),
+        ("GET /market-trends", "get", "/api/market-data/market-trends?from=2024-07&window=3", None),
+    ]
+
+
+def time_dumps(provider, obj, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        provider.dumps(obj)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tests", type=int, default=200, help="A/B tests to create")
+    parser.add_argument("--repeat", type=int, default=100, help="Serialisations timed per endpoint")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    os.environ.setdefault("SHARED_CACHE_ENABLED", "0")
+    from flask.json.provider import DefaultJSONProvider
+    from main import create_app
+    from services.http_responses import FastJSONProvider, brotli
+
+    app = create_app()
+    seed(app, args.tests)
+    client = app.test_client()
+    default_provider, fast_provider = DefaultJSONProvider(app), FastJSONProvider(app)
+    encodings = ["identity", "gzip"] + (["br"] if brotli is not None else [])
+
+    header = f"{'endpoint':36} " + " ".join(f"{e + ' B':>10}" for e in encodings) + f" {'json us':>9} {'fast us':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, method, path, body in endpoints(args.tests):
+        sizes = []
+        for encoding in encodings:
+            response = getattr(client, method)(path, json=body, headers={"Accept-Encoding": encoding})
+            sizes.append(len(response.get_data()))
+        payload = getattr(client, method)(path, json=body, headers={"Accept-Encoding": "identity"}).get_json()
+        default_us = time_dumps(default_provider, payload, args.repeat)
+        fast_us = time_dumps(fast_provider, payload, args.repeat)
+        print(f"{name:36} " + " ".join(f"{size:>10}" for size in sizes) + f" {default_us:>9.1f} {fast_us:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Synthetic Windsor-Essex real-estate corpora for benchmarks.
+
+`generate_posts` builds reproducible social posts (listings, sold
+announcements, market updates, ...) that mix the keywords, locations,
+calls to action, hashtags and emoji the services look for, with lengths
+varying from one-liners to long captions.
+"""
+
+import random
+from typing import Dict, Iterator, List
+
+POST_TYPES = ("listing", "sold", "market_update", "community", "testimonial", "general")
+LOCATIONS = (
+    "Windsor", "South Windsor", "Walkerville", "Tecumseh", "LaSalle",
+    "Amherstburg", "Kingsville", "Leamington", "Belle River", "Essex",
+)
+FEATURES = (
+    "an updated kitchen", "a finished basement", "a double garage", "hardwood floors",
+    "a fenced backyard", "an inground pool", "a main floor primary suite", "new windows",
+    "a walk-in pantry", "quartz countertops", "a gas fireplace", "a covered deck",
+)
+OPENERS = {
+    "listing": ("Just listed!", "New on the market:", "Don't miss this one!", "Fresh listing alert"),
+    "sold": ("SOLD!", "Another one sold over asking!", "Congratulations to my clients!", "Sold in 5 days"),
+    "market_update": ("Market update:", "Here's what happened this month.", "Thinking of selling?", "Rates are moving."),
+    "community": ("Love this community!", "Weekend plans?", "Local spotlight:", "Support local!"),
+    "testimonial": ("Kind words from a client:", "Thank you for the review!", "Happy homeowners!", "5 stars!"),
+    "general": ("Happy Monday!", "Quick tip for buyers:", "Question of the day:", "Behind the scenes"),
+}
+CTAS = ("Contact me for details.", "DM me to book a showing.", "Call now!", "Learn more at the link in bio.",
+        "Schedule a viewing today.", "What do you think?", "")
+HASHTAGS = ("#WindsorRealEstate", "#WindsorEssex", "#JustListed", "#JustSold", "#HomeForSale",
+            "#RealEstateAgent", "#YQG", "#DreamHome", "#MarketUpdate", "#OpenHouse", "#FirstTimeBuyer")
+EMOJI = ("🏡", "🔑", "✨", "📈", "🎉", "👍", "❤️", "📍", "👨‍👩‍👧")
+
+
+def make_post(rng: random.Random, post_type: str) -> str:
+    location = rng.choice(LOCATIONS)
+    sentences = [rng.choice(OPENERS[post_type])]
+    if post_type in ("listing", "sold"):
+        sentences.append(
+            f"This {rng.randint(2, 5)} bedroom home in {location} offers {rng.choice(FEATURES)} "
+            f"and {rng.choice(FEATURES)}, priced at ${rng.randrange(350, 1200) * 1000:,}."
+        )
+    elif post_type == "market_update":
+        sentences.append(
+            f"Average prices in {location} are {rng.choice(('up', 'down'))} {rng.randint(1, 9)}% "
+            f"year over year with {rng.randint(300, 700)} properties sold."
+        )
+    else:
+        sentences.append(f"There is so much to love about {location} and the people who make it home.")
+    # Long captions repeat descriptive sentences
+    for _ in range(rng.choice((0, 0, 1, 2, 6))):
+        sentences.append(f"Imagine weekends here enjoying {rng.choice(FEATURES)} with family and friends.")
+    cta = rng.choice(CTAS)
+    if cta:
+        sentences.append(cta)
+    emoji = "".join(rng.choice(EMOJI) for _ in range(rng.randint(0, 3)))
+    hashtags = " ".join(rng.sample(HASHTAGS, rng.randint(0, 5)))
+    return " ".join(sentences) + (f" {emoji}" if emoji else "") + (f"\n\n{hashtags}" if hashtags else "")
+
+
+def generate_posts(count: int, seed: int = 0) -> List[str]:
+    """Return ``count`` posts of mixed types, identical for the same ``seed``."""
+    rng = random.Random(seed)
+    return [make_post(rng, rng.choice(POST_TYPES)) for _ in range(count)]
+
+
+def generate_records(count: int, user_ids: List[str], seed: int = 0) -> Iterator[Dict]:
+    """Yield training records spread over ``user_ids`` and every post type."""
+    rng = random.Random(seed)
+    for i in range(count):
+        post_type = POST_TYPES[i % len(POST_TYPES)]
+        yield {
+            "user_id": user_ids[i % len(user_ids)],
+            "content": make_post(rng, post_type),
+            "post_type": post_type,
+        }
@@ -0,0 +1,305 @@
+"""
+Benchmark suite for services and HTTP endpoints with regression checks.
+
+Run from the repository root:
+
+    python -m benchmarks.suite
+    python -m benchmarks.suite --size 5000 --output results.json
+    python -m benchmarks.suite --update-baseline
+    python -m benchmarks.suite --only seo --only route:
+
+A synthetic corpus (see `benchmarks.corpus`) is loaded into a temporary
+SQLite database.  Every case is then timed call by call, and the suite
+reports throughput (ops/s) and p50/p95 latency of the best of three
+rounds.  Results are written as JSON and compared with
+``benchmarks/baseline.json``.  A case fails when its throughput drops,
+or its median latency grows, by more than ``--tolerance`` (25% by
+default; latency changes under ``--min-delta-ms`` are ignored), and the
+suite then exits non-zero.  p95 is recorded for reference only, as it
+is too noisy on shared machines to gate on.
+
+Baselines are machine specific and are not committed; record one with
+``--update-baseline`` on the machine that runs the comparison.  The
+baseline stores the corpus size, iteration count, Python version and
+host it was recorded with, and the comparison is skipped (without
+failing) when the current run differs in any of them.
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.corpus import POST_TYPES, generate_posts, generate_records
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+BENCH_USERS = [f"bench_user_{i}" for i in range(5)]
+ROUNDS = 3
+# Results are only comparable when these match the baseline's
+COMPARABLE_META = ("size", "iterations", "python", "host")
+
+
+def measure(func: Callable[[int], object], iterations: int, warmup: int = 5) -> dict:
+    """Time ``func(i)`` for ``iterations`` calls after ``warmup`` untimed calls.
+
+    The calls are repeated for `ROUNDS` rounds and the best round is
+    reported, which keeps scheduler noise out of the comparison.
+    """
+    for i in range(warmup):
+        func(i)
+    timer = time.perf_counter
+    best = None
+    for _ in range(ROUNDS):
+        latencies = []
+        for i in range(iterations):
+            start = timer()
+            func(i)
+            latencies.append(timer() - start)
+        latencies.sort()
+        total = sum(latencies)
+        result = {
+            "iterations": iterations,
+            "ops_per_sec": round(iterations / total, 2) if total else None,
+            "p50_ms": round(latencies[len(latencies) // 2] * 1000, 4),
+            "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 4),
+        }
+        if best is None or result["p50_ms"] < best["p50_ms"]:
+            best = result
+    return best
+
+
+def setup_app(size: int):
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    from main import create_app
+    from services.brand_voice_service import brand_voice_service
+    from services.wecar_ingestion_service import wecar_ingestion_service
+
+    app = create_app()
+    with app.app_context():
+        brand_voice_service.add_training_data_batch(generate_records(size, BENCH_USERS, seed=1))
+        wecar_ingestion_service.ingest(os.path.join("fixtures", "wecar", "monthly_statistics.html"))
+    return app
+
+
+def service_cases(app, posts: List[str], iterations: int) -> Dict[str, Callable[[], dict]]:
+    from services.ab_testing_service import ab_testing_service
+    from services.brand_voice_analysis_service import brand_voice_analysis_service
+    from services.learning_algorithm_service import learning_algorithm_service
+    from services.seo_service import seo_service
+
+    def in_context(func):
+        def run():
+            with app.app_context():
+                return measure(func, iterations)
+        return run
+
+    def recommendations_cold(i):
+        learning_algorithm_service.cache.clear()
+        learning_algorithm_service.generate_content_recommendations(
+            BENCH_USERS[i % len(BENCH_USERS)], POST_TYPES[i % len(POST_TYPES)], "instagram", "home in windsor"
+        )
+
+    def recommendations_warm(i):
+        learning_algorithm_service.generate_content_recommendations(
+            BENCH_USERS[0], "listing", "instagram", "home in windsor"
+        )
+
+    def create_test(i):
+        # A small ranking budget, comparable with plain test creation
+        ab_testing_service.create_test_variations(
+            f"Benchmark {i}",
+            {"content": posts[i % len(posts)], "content_type": "listing", "platform": "instagram", "candidates": 64},
+        )
+
+    def create_test_ranked(i):
+        ab_testing_service.create_test_variations(
+            f"Benchmark {i}", {"content": posts[i % len(posts)], "content_type": "listing", "platform": "instagram"}
+        )
+
+    def list_tests(i):
+        ab_testing_service.cache.clear()
+        ab_testing_service.list_tests(limit=50, summary=True)
+
+    return {
+        "seo.analyze_content": lambda: measure(lambda i: seo_service.analyze_content(posts[i % len(posts)]), iterations),
+        "brand_voice.analyze_from_text_input": lambda: measure(
+            lambda i: brand_voice_analysis_service.analyze_from_text_input(posts[i % len(posts)]), iterations
+        ),
+        "learning.recommendations_cold": in_context(recommendations_cold),
+        "learning.recommendations_cached": in_context(recommendations_warm),
+        "ab_testing.create_test_variations": in_context(create_test),
+        "ab_testing.create_test_variations_ranked": in_context(create_test_ranked),
+        "ab_testing.list_tests_uncached": in_context(list_tests),
+    }
+
+
+def route_cases(app, posts: List[str], iterations: int) -> Dict[str, Callable[[], dict]]:
+    client = app.test_client()
+    with app.app_context():
+        from services.ab_testing_service import ab_testing_service
+
+        test = ab_testing_service.create_test_variations(
+            "Route benchmark", {"content": posts[0], "content_type": "listing", "platform": "instagram"}
+        )
+    user = BENCH_USERS[0]
+    upload = "\n\n".join(posts[:200]).encode()
+    specs = {
+        "POST /api/brand-voice/train": lambda i: client.post(
+            "/api/brand-voice/train", json={"user_id": "bench_route", "content": posts[i % len(posts)], "post_type": "listing"}
+        ),
+        "POST /api/brand-voice/train-batch": lambda i: client.post(
+            "/api/brand-voice/train-batch",
+            json=[{"user_id": "bench_route", "content": post, "post_type": "general"} for post in posts[:100]],
+        ),
+        "GET /api/brand-voice/training-data": lambda i: client.get(f"/api/brand-voice/training-data?user_id={user}&limit=50"),
+        "POST /api/brand-voice/analyze-text": lambda i: client.post(
+            "/api/brand-voice/analyze-text", json={"content": posts[i % len(posts)]}
+        ),
+        "GET /api/brand-voice/voice-profile": lambda i: client.get(f"/api/brand-voice/voice-profile?user_id={user}"),
+        "POST /api/brand-voice/generate-content": lambda i: client.post(
+            "/api/brand-voice/generate-content", json={"prompt": "Open house this weekend", "user_id": user}
+        ),
+        "POST /api/brand-voice/generate-content/batch": lambda i: client.post(
+            "/api/brand-voice/generate-content/batch",
+            json={"prompts": posts[:50], "profiles": [{"user_id": bench_user} for bench_user in BENCH_USERS]},
+        ),
+        "GET /api/brand-voice/sample-analysis": lambda i: client.get("/api/brand-voice/sample-analysis"),
+        "POST /api/brand-voice/upload-content": lambda i: client.post(
+            "/api/brand-voice/upload-content",
+            data={"file": (io.BytesIO(upload), "posts.txt")},
+            content_type="multipart/form-data",
+        ),
+        "GET /api/learning/content-recommendations": lambda i: client.get(
+            f"/api/learning/content-recommendations?user_id={user}&type=listing&topic=home+{i % 20}"
+        ),
+        "GET /api/learning/similar": lambda i: client.get(f"/api/learning/similar?user_id={user}&q=finished+basement+windsor"),
+        "POST /api/ab-testing/create": lambda i: client.post(
+            "/api/ab-testing/create",
+            json={"test_name": f"Route {i}", "base_content": {"content": posts[i % len(posts)], "candidates": 64}},
+        ),
+        "POST /api/ab-testing/create (ranked)": lambda i: client.post(
+            "/api/ab-testing/create", json={"test_name": f"Route {i}", "base_content": {"content": posts[i % len(posts)]}}
+        ),
+        "GET /api/ab-testing/tests": lambda i: client.get("/api/ab-testing/tests?limit=50&summary=true"),
+        "GET /api/ab-testing/analyze-results": lambda i: client.get(f"/api/ab-testing/analyze-results/{test['id']}"),
+        "POST /api/ab-testing/events": lambda i: client.post(
+            "/api/ab-testing/events",
+            json={"events": [{"variation_id": test["variations"][i % 2]["id"], "type": "impression"}] * 50},
+        ),
+        "GET /api/market-data/": lambda i: client.get("/api/market-data/"),
+        "GET /api/market-data/market-trends": lambda i: client.get("/api/market-data/market-trends?from=2024-07&window=3"),
+        "POST /api/seo/analyze": lambda i: client.post("/api/seo/analyze", json={"content": posts[i % len(posts)]}),
+        "POST /api/seo/analyze-batch": lambda i: client.post("/api/seo/analyze-batch", json={"texts": posts[:200]}),
+    }
+
+    def checked(name, request):
+        def call(i):
+            response = request(i)
+            # Consume streamed bodies so they are part of the timing
+            response.get_data()
+            if response.status_code >= 400:
+                raise RuntimeError(f"{name} returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+        return call
+
+    return {f"route:{name}": (lambda n=name, r=request: measure(checked(n, r), iterations)) for name, request in specs.items()}
+
+
+def compare(results: dict, baseline: dict, tolerance: float, min_delta_ms: float = 0.1) -> List[str]:
+    """Return a description of every case that regressed beyond ``tolerance``.
+
+    Latency changes smaller than ``min_delta_ms`` are ignored, since
+    sub-millisecond cases are dominated by timer and scheduler noise.
+    """
+    regressions = []
+    for name, current in results["cases"].items():
+        previous = baseline.get("cases", {}).get(name)
+        if not previous:
+            continue
+        if previous.get("ops_per_sec") and current["ops_per_sec"] < previous["ops_per_sec"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {current['ops_per_sec']} ops/s < baseline {previous['ops_per_sec']} ops/s"
+            )
+        if (
+            previous.get("p50_ms")
+            and current["p50_ms"] > previous["p50_ms"] * (1 + tolerance)
+            and current["p50_ms"] - previous["p50_ms"] > min_delta_ms
+        ):
+            regressions.append(f"{name}: p50 {current['p50_ms']} ms > baseline {previous['p50_ms']} ms")
+    return regressions
+
+
+def baseline_mismatch(meta: dict, baseline_meta: dict) -> List[str]:
+    """Names of the run settings that differ from the baseline's."""
+    return [key for key in COMPARABLE_META if meta.get(key) != baseline_meta.get(key)]
+
+
+def run(size: int, iterations: int, only: Optional[List[str]]) -> dict:
+    app = setup_app(size)
+    posts = generate_posts(max(size // 4, 200), seed=2)
+    cases = {**service_cases(app, posts, iterations), **route_cases(app, posts, iterations)}
+    results = {
+        "meta": {
+            "size": size,
+            "iterations": iterations,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "host": platform.node(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "cases": {},
+    }
+    for name, case in cases.items():
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        results["cases"][name] = case()
+        result = results["cases"][name]
+        print(f"{name:48} {result['ops_per_sec']:>10} ops/s  p50 {result['p50_ms']:>8} ms  p95 {result['p95_ms']:>8} ms")
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=2000, help="Training records in the seeded database")
+    parser.add_argument("--iterations", type=int, default=100, help="Timed calls per case")
+    parser.add_argument("--only", action="append", help="Run only cases whose name starts with this prefix")
+    parser.add_argument("--output", help="Write results JSON to this file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression")
+    parser.add_argument("--min-delta-ms", type=float, default=0.1, help="Ignore smaller latency regressions")
+    parser.add_argument("--update-baseline", action="store_true", help="Store the results as the new baseline")
+    args = parser.parse_args()
+
+    results = run(args.size, args.iterations, args.only)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one")
+        return
+    with open(args.baseline, encoding="utf-8") as handle:
+        baseline = json.load(handle)
+    mismatched = baseline_mismatch(results["meta"], baseline.get("meta", {}))
+    if mismatched:
+        print(f"Skipping the comparison: the baseline was recorded with a different {', '.join(mismatched)}")
+        return
+    regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print(f"\nNo regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,10 @@
 # main.py
 
+import time
+
+# Taken before any other import so the startup report includes import time
+IMPORT_STARTED = time.perf_counter()
+
 from flask import Flask, render_template, send_from_directory
 from flask_cors import CORS
 import os
@@ -8,13 +13,27 @@ import os
 from models.social_media import db
 
 # Import the corrected blueprints
-from routes.brand_voice_routes import brand_voice_bp
+from routes.brand_voice import brand_voice_bp
 from routes.learning_algorithm_routes import learning_algorithm_bp
 from routes.ab_testing_routes import ab_testing_bp
 from routes.market_data_routes import market_data_bp
+from routes.seo_routes import seo_bp
+from routes.metrics_routes import metrics_bp
+from routes.job_routes import jobs_bp
+from services.ab_event_service import ab_event_service
+from services.brand_voice_service import brand_voice_service
+from services.database import database_config
+from services.http_responses import response_optimizer
+from services.job_service import job_service
+from services.metrics import metrics
+from services.shared_cache import shared_cache
+from services.startup import startup
+from services.wecar_ingestion_service import wecar_ingestion_service
+from services.wecar_market_service import wecar_market_service
 
 def create_app():
     """Create and configure the Flask application."""
+    startup.begin(IMPORT_STARTED)
     # Set the static folder path
     app = Flask(__name__, static_folder='static', template_folder='static')
 
@@ -25,15 +44,27 @@ def create_app():
     app.config['SQLALCHEMY_DATABASE_URI'] = db_url
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     CORS(app)
+    # Registered first so its after_request hook sees the final, compressed response
+    metrics.init_app(app)
+    response_optimizer.init_app(app)
 
     # --- Initialize Database ---
+    database_config.init_app(app)
     db.init_app(app)
+    shared_cache.init_app(app)
+    brand_voice_service.init_app(app)
+    ab_event_service.init_app(app)
+    wecar_market_service.init_app(app)
+    job_service.init_app(app)
 
     # --- Register Blueprints ---
     app.register_blueprint(brand_voice_bp, url_prefix='/api/brand-voice')
     app.register_blueprint(learning_algorithm_bp, url_prefix='/api/learning')
     app.register_blueprint(ab_testing_bp, url_prefix='/api/ab-testing')
     app.register_blueprint(market_data_bp, url_prefix='/api/market-data')
+    app.register_blueprint(seo_bp, url_prefix='/api/seo')
+    app.register_blueprint(metrics_bp, url_prefix='/api')
+    app.register_blueprint(jobs_bp, url_prefix='/api/jobs')
 
     # --- THIS IS THE FIX ---
     # This route will now serve the correct, self-contained HTML file.
@@ -43,8 +74,11 @@ def create_app():
     # ---------------------
 
     # --- Create Database Tables ---
-    with app.app_context():
-        db.create_all()
+    # Skipped with DB_AUTO_CREATE=0; run `flask init-db` on deploy instead
+    startup.init_app(app)
+
+    # Its scheduler starts on each worker's first request, once the tables exist
+    wecar_ingestion_service.init_app(app)
 
     return app
 
@@ -5,12 +5,38 @@ This module defines a single instance of SQLAlchemy that should be
 imported by all other models to avoid creating multiple database
 objects.  Import `db` from this package whenever you need the
 database object.
+
+The session routes reads to the ``replica`` bind, when one is
+configured (see `services.database`), while a request marked read-only
+with `services.database.read_replica` is being handled.  Flushes and
+INSERT/UPDATE/DELETE statements always go to the primary.
 """
 
+from flask import g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 
-# Global SQLAlchemy instance used throughout the application
-db = SQLAlchemy()
+REPLICA_BIND = "replica"
+
+
+class RoutingSession(Session):
+    """Session sending reads of read-only requests to the replica bind."""
 
-__all__ = ["db"]
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and not getattr(clause, "is_dml", False)
+            and has_app_context()
+            and g.get("_db_read_replica")
+        ):
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+# Global SQLAlchemy instance used throughout the application
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
+__all__ = ["db", "REPLICA_BIND"]
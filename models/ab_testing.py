@@ -0,0 +1,114 @@
+"""
+Database models for A/B tests.
+
+An `ABTest` groups two or more `ABTestVariation` rows generated from the
+same base content; `ABTestStoreVersion` records when any of them last
+changed.  Tests are stored in the database rather than in process
+memory so that every gunicorn worker sees the same tests and they
+survive restarts.  All models import the shared `db` instance from
+`models.__init__`.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import event
+
+from . import db
+
+
+class ABTest(db.Model):
+    """A named A/B test for one platform and content type."""
+
+    __tablename__ = "ab_tests"
+
+    id = db.Column(db.String(36), primary_key=True)
+    name = db.Column(db.String(200), nullable=False)
+    content_type = db.Column(db.String(50), nullable=False)
+    platform = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="draft", index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    variations = db.relationship(
+        "ABTestVariation",
+        back_populates="test",
+        order_by="ABTestVariation.position",
+        cascade="all, delete-orphan",
+        lazy="selectin",
+    )
+
+    def __repr__(self) -> str:
+        return f"<ABTest {self.id} {self.name!r}>"
+
+    def to_dict(self) -> dict:
+        """Return a JSON-serialisable representation including variations."""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "content_type": self.content_type,
+            "platform": self.platform,
+            "variations": [variation.to_dict() for variation in self.variations],
+            "status": self.status,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
+
+    def to_summary_dict(self) -> dict:
+        """Return a compact representation without variation bodies."""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "content_type": self.content_type,
+            "platform": self.platform,
+            "status": self.status,
+            "variation_count": len(self.variations),
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
+
+
+class ABTestVariation(db.Model):
+    """One content variation within an `ABTest`."""
+
+    __tablename__ = "ab_test_variations"
+
+    id = db.Column(db.String(36), primary_key=True)
+    test_id = db.Column(db.String(36), db.ForeignKey("ab_tests.id"), nullable=False, index=True)
+    position = db.Column(db.Integer, nullable=False, default=0)
+    content = db.Column(db.Text, nullable=False)
+    hashtags = db.Column(db.JSON, nullable=False, default=list)
+    image_prompt = db.Column(db.Text, nullable=True)
+    # Outcome counters, incremented in bulk by `ABEventService.flush`
+    impressions = db.Column(db.BigInteger, nullable=False, default=0)
+    clicks = db.Column(db.BigInteger, nullable=False, default=0)
+    conversions = db.Column(db.BigInteger, nullable=False, default=0)
+    test = db.relationship("ABTest", back_populates="variations")
+
+    def __repr__(self) -> str:
+        return f"<ABTestVariation {self.id} of test {self.test_id}>"
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "content": self.content,
+            "hashtags": self.hashtags or [],
+            "image_prompt": self.image_prompt,
+            "impressions": self.impressions or 0,
+            "clicks": self.clicks or 0,
+            "conversions": self.conversions or 0,
+        }
+
+
+class ABTestStoreVersion(db.Model):
+    """Single-row counter bumped whenever any test or its counts change.
+
+    Listings use it as a cheap, cross-worker change marker for ETags and
+    cache keys.
+    """
+
+    __tablename__ = "ab_test_store_version"
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+@event.listens_for(ABTestStoreVersion.__table__, "after_create")
+def _seed_store_version(target, connection, **kw):
+    # Writers only ever update the row, so it must exist from the start
+    connection.execute(target.insert().values(id=1, version=0))
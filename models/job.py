@@ -0,0 +1,66 @@
+"""
+Database model for background jobs.
+
+A `Job` row records one heavy request (such as a file analysis) that is
+run by `services.job_service` outside the request thread: its owner,
+status, progress and, once finished, its result or error.  Jobs are
+stored in the database so that any gunicorn worker can answer a status
+poll, whichever worker runs the job.  It imports the shared `db`
+instance from `models.__init__`.
+"""
+
+from datetime import datetime
+
+from . import db
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+ACTIVE_JOB_STATUSES = (JOB_QUEUED, JOB_RUNNING)
+
+
+class Job(db.Model):
+    """A unit of background work and its outcome."""
+
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Serves the per-user active job count checked on every submission
+        db.Index("ix_jobs_user_status", "user_id", "status"),
+    )
+
+    id = db.Column(db.String(36), primary_key=True)
+    user_id = db.Column(db.String(80), nullable=False)
+    kind = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default=JOB_QUEUED, index=True)
+    # Fraction of the work done, from 0 to 1
+    progress = db.Column(db.Float, nullable=False, default=0.0)
+    result = db.Column(db.JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    # Touched on every status or progress change; active jobs not updated
+    # for a long time were lost with their worker
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<Job {self.id} {self.kind} {self.status}>"
+
+    def to_dict(self) -> dict:
+        """Return a JSON-serialisable representation; ``result`` only once succeeded."""
+        data = {
+            "id": self.id,
+            "user_id": self.user_id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": round(self.progress or 0.0, 4),
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+        if self.status == JOB_SUCCEEDED:
+            data["result"] = self.result
+        elif self.status == JOB_FAILED:
+            data["error"] = self.error
+        return data
@@ -0,0 +1,42 @@
+"""
+Database models for real-estate market statistics.
+
+`MarketStat` stores one row of monthly statistics per source and month,
+written by the background WECAR ingestion and read by the market data
+routes.  It imports the shared `db` instance from `models.__init__`.
+"""
+
+from datetime import datetime
+
+from . import db
+
+
+class MarketStat(db.Model):
+    """Monthly market statistics for one source (e.g. WECAR)."""
+
+    __tablename__ = "market_stats"
+    __table_args__ = (
+        # One row per source and month; also serves period range queries
+        db.UniqueConstraint("source", "period", name="uq_market_stats_source_period"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    source = db.Column(db.String(50), nullable=False, default="WECAR")
+    # First day of the reported month
+    period = db.Column(db.Date, nullable=False)
+    new_listings = db.Column(db.Integer, nullable=True)
+    properties_sold = db.Column(db.Integer, nullable=True)
+    average_price = db.Column(db.Integer, nullable=True)
+    fetched_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self) -> str:
+        return f"<MarketStat {self.source} {self.period:%Y-%m}>"
+
+    def to_dict(self) -> dict:
+        return {
+            "month": self.period.strftime("%B %Y"),
+            "period": self.period.strftime("%Y-%m"),
+            "new_listings": self.new_listings,
+            "properties_sold": self.properties_sold,
+            "average_price": self.average_price,
+        }
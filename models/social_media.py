@@ -2,7 +2,8 @@
 Database models related to social media content.
 
 This module defines the `TrainingData` model used to store examples
-of user content.  It imports the shared `db` instance from
+of user content and the `BrandVoiceProfile` model holding running
+aggregates over that content.  It imports the shared `db` instance from
 `models.__init__` rather than creating a new one.
 """
 
@@ -21,6 +22,11 @@ class TrainingData(db.Model):
     """
 
     __tablename__ = "training_data"
+    __table_args__ = (
+        # Serves per-type lookups and keyset pagination ordered by recency
+        db.Index("ix_training_data_user_type_created", "user_id", "post_type", "created_at"),
+        db.Index("ix_training_data_user_created", "user_id", "created_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.String(80), nullable=False, index=True)
@@ -42,3 +48,89 @@ class TrainingData(db.Model):
             "post_type": self.post_type,
             "created_at": self.created_at.isoformat(),
         }
+
+
+class BrandVoiceProfile(db.Model):
+    """Running brand voice aggregates for one user and post type.
+
+    Rows are updated incrementally as training data arrives, so reading
+    a profile never requires reanalysing the user's stored posts.  The
+    row with ``post_type == ALL_POST_TYPES`` aggregates every post type.
+    """
+
+    __tablename__ = "brand_voice_profiles"
+    __table_args__ = (db.UniqueConstraint("user_id", "post_type", name="uq_brand_voice_profile"),)
+
+    ALL_POST_TYPES = "*"
+    # Only the most frequent hashtags are retained per profile
+    MAX_HASHTAGS = 50
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.String(80), nullable=False)
+    post_type = db.Column(db.String(50), nullable=False)
+    post_count = db.Column(db.Integer, nullable=False, default=0)
+    word_count = db.Column(db.Integer, nullable=False, default=0)
+    whitespace_word_count = db.Column(db.Integer, nullable=False, default=0)
+    total_word_length = db.Column(db.Integer, nullable=False, default=0)
+    long_word_count = db.Column(db.Integer, nullable=False, default=0)
+    sentence_count = db.Column(db.Integer, nullable=False, default=0)
+    exclamation_count = db.Column(db.Integer, nullable=False, default=0)
+    question_count = db.Column(db.Integer, nullable=False, default=0)
+    emoji_count = db.Column(db.Integer, nullable=False, default=0)
+    posts_with_questions = db.Column(db.Integer, nullable=False, default=0)
+    posts_with_exclamations = db.Column(db.Integer, nullable=False, default=0)
+    posts_with_emojis = db.Column(db.Integer, nullable=False, default=0)
+    hashtag_counts = db.Column(db.JSON, nullable=False, default=dict)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self) -> str:
+        return f"<BrandVoiceProfile {self.user_id}/{self.post_type}>"
+
+    def apply(self, post_count: int, features, posts_with: dict) -> None:
+        """Fold aggregated `TextFeatures` for ``post_count`` new posts into this row."""
+        self.post_count = (self.post_count or 0) + post_count
+        self.word_count = (self.word_count or 0) + features.word_count
+        self.whitespace_word_count = (self.whitespace_word_count or 0) + features.whitespace_word_count
+        self.total_word_length = (self.total_word_length or 0) + features.total_word_length
+        self.long_word_count = (self.long_word_count or 0) + features.long_word_count
+        self.sentence_count = (self.sentence_count or 0) + features.sentence_count
+        self.exclamation_count = (self.exclamation_count or 0) + features.exclamations
+        self.question_count = (self.question_count or 0) + features.questions
+        self.emoji_count = (self.emoji_count or 0) + features.emoji_count
+        self.posts_with_questions = (self.posts_with_questions or 0) + posts_with["questions"]
+        self.posts_with_exclamations = (self.posts_with_exclamations or 0) + posts_with["exclamations"]
+        self.posts_with_emojis = (self.posts_with_emojis or 0) + posts_with["emojis"]
+        if features.hashtags:
+            counts = dict(self.hashtag_counts or {})
+            for tag, count in features.hashtags.items():
+                counts[tag] = counts.get(tag, 0) + count
+            if len(counts) > self.MAX_HASHTAGS:
+                top = sorted(counts.items(), key=lambda item: item[1], reverse=True)
+                counts = dict(top[: self.MAX_HASHTAGS])
+            # Reassign so SQLAlchemy notices the JSON change
+            self.hashtag_counts = counts
+
+    def top_hashtags(self, limit: int = 10) -> list:
+        counts = self.hashtag_counts or {}
+        return sorted(counts, key=counts.get, reverse=True)[:limit]
+
+    def to_dict(self) -> dict:
+        """Return a JSON-serialisable representation of the raw aggregates."""
+        return {
+            "user_id": self.user_id,
+            "post_type": self.post_type,
+            "post_count": self.post_count,
+            "word_count": self.word_count,
+            "whitespace_word_count": self.whitespace_word_count,
+            "total_word_length": self.total_word_length,
+            "long_word_count": self.long_word_count,
+            "sentence_count": self.sentence_count,
+            "exclamation_count": self.exclamation_count,
+            "question_count": self.question_count,
+            "emoji_count": self.emoji_count,
+            "posts_with_questions": self.posts_with_questions,
+            "posts_with_exclamations": self.posts_with_exclamations,
+            "posts_with_emojis": self.posts_with_emojis,
+            "hashtag_counts": self.hashtag_counts or {},
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
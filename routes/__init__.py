@@ -10,4 +10,7 @@ __all__ = [
     "learning_algorithm_routes",
     "ab_testing_routes",
     "market_data_routes",
+    "seo_routes",
+    "metrics_routes",
+    "job_routes",
 ]
@@ -2,12 +2,18 @@
 """
 A/B testing routes.
 
-Defines endpoints for creating A/B tests, listing them, and analyzing
-results using the `ABTestingService`.
+Defines endpoints for creating A/B tests, listing them, recording
+impression/click/conversion events and analyzing results using the
+`ABTestingService` and `ABEventService`.
 """
 
-from flask import Blueprint, jsonify, request
-from services.ab_testing_service import ab_testing_service
+import zlib
+
+from flask import Blueprint, jsonify, make_response, request
+from services.ab_event_service import MAX_EVENTS_PER_REQUEST, ab_event_service
+from services.ab_statistics import METRICS, ab_statistics_engine
+from services.ab_testing_service import DEFAULT_PAGE_SIZE, ab_testing_service
+from services.database import read_replica
 
 
 ab_testing_bp = Blueprint("ab_testing", __name__)
@@ -26,46 +32,118 @@ def create_ab_test():
 
         test = ab_testing_service.create_test_variations(test_name, base_content)
         return jsonify({"success": True, "test": test})
+    except ValueError as exc:
+        return jsonify({"success": False, "error": str(exc)}), 400
     except Exception as exc:
         print(f"Error creating A/B test: {exc}")
         return jsonify({"success": False, "error": f"Failed to create A/B test: {exc}"}), 500
 
 
 @ab_testing_bp.route("/tests", methods=["GET"])
+@read_replica
 def get_all_tests():
     """
-    Return a list of all active A/B tests.
-    This is a new endpoint to match the frontend's requirements.
+    Return one page of A/B tests.
+
+    Query parameters: ``status``, ``platform`` and ``content_type``
+    filters; ``limit`` and ``cursor`` (the ``next_cursor`` of the previous
+    page); ``order`` (``asc``, the default, or ``desc``); and
+    ``summary=true`` to leave out variation bodies.  Responses carry an
+    ETag derived from the store version, so unchanged polls get a 304.
     """
     try:
-        active_tests = list(ab_testing_service.active_tests.values())
-        # Convert dataclass objects to dictionaries for JSON serialization
-        tests_as_dicts = [test for test in active_tests]
-        return jsonify({"success": True, "tests": tests_as_dicts})
+        limit = int(request.args.get("limit", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"success": False, "error": "limit must be an integer"}), 400
+    try:
+        # The ETag only depends on the store version and the query, so an
+        # unchanged poll is answered before any test is read
+        version = ab_testing_service.current_version()
+        etag = f"tests-{version}-{zlib.crc32(request.query_string):08x}"
+        if request.if_none_match.contains_weak(etag):
+            response = make_response("", 304)
+        else:
+            tests, next_cursor, version = ab_testing_service.list_tests(
+                status=request.args.get("status"),
+                platform=request.args.get("platform"),
+                content_type=request.args.get("content_type"),
+                limit=limit,
+                cursor=request.args.get("cursor"),
+                descending=request.args.get("order", "asc").lower() == "desc",
+                summary=request.args.get("summary", "").lower() in ("1", "true", "yes"),
+                version=version,
+            )
+            response = jsonify({"success": True, "tests": tests, "next_cursor": next_cursor})
+    except ValueError as exc:
+        return jsonify({"success": False, "error": str(exc)}), 400
     except Exception as exc:
         print(f"Error fetching all tests: {exc}")
         return jsonify({"success": False, "error": f"Failed to fetch tests: {exc}"}), 500
 
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
 
 @ab_testing_bp.route("/analyze-results/<string:test_id>", methods=["GET"])
 def get_test_results(test_id):
     """
     Return analysis for a specific A/B test.
-    This is a new endpoint to match the frontend's requirements.
+
+    Computes frequentist significance and Bayesian win probabilities from
+    the recorded events.  ``metric`` selects ``click`` (default) or
+    ``conversion`` rates; the first variation is treated as the control.
     """
+    metric = request.args.get("metric", "click")
+    if metric not in METRICS:
+        return jsonify({"success": False, "error": f"metric must be one of {', '.join(METRICS)}"}), 400
     try:
-        if test_id in ab_testing_service.active_tests:
-            test = ab_testing_service.active_tests[test_id]
-            return jsonify({
-                "success": True,
-                "data": {
-                    "test_name": test.get("name"),
-                    "message": "Analysis complete. Variation 1 performed slightly better.",
-                    "variations": test.get("variations"),
-                    "instructions": ["Post winning elements in future content."]
-                }
-            })
-        return jsonify({"success": False, "error": "Test not found"}), 404
+        test = ab_testing_service.get_test(test_id)
+        if test is None:
+            return jsonify({"success": False, "error": "Test not found"}), 404
+        analysis = ab_statistics_engine.analyze_test(test, metric)
+        variations = [
+            dict(variation, statistics=stats)
+            for variation, stats in zip(test.get("variations", []), analysis["variations"])
+        ]
+        if analysis["winner"] is not None:
+            instructions = [f"Post winning elements of Variation {analysis['winner'] + 1} in future content."]
+        else:
+            instructions = ["Keep the test running to collect more impressions before choosing a winner."]
+        return jsonify({
+            "success": True,
+            "data": {
+                "test_name": test.get("name"),
+                "message": analysis["message"],
+                "variations": variations,
+                "winner": analysis["winner"],
+                "metric": metric,
+                "total_impressions": analysis["total_trials"],
+                "instructions": instructions,
+            }
+        })
     except Exception as exc:
         print(f"Error analyzing test {test_id}: {exc}")
         return jsonify({"success": False, "error": f"Failed to analyze test results: {exc}"}), 500
+
+
+@ab_testing_bp.route("/events", methods=["POST"])
+def record_events():
+    """Record a batch of impression, click and conversion events.
+
+    Expects ``{"events": [{"variation_id": ..., "type": "impression"|"click"|"conversion",
+    "count": 1}, ...]}``.  Events are counted in memory and written to the
+    database in periodic bulk flushes, so the response is ``202 Accepted``.
+    """
+    try:
+        data = request.get_json(silent=True)
+        events = data.get("events") if isinstance(data, dict) else data
+        if not isinstance(events, list):
+            return jsonify({"success": False, "error": "Expected a list of events."}), 400
+        if len(events) > MAX_EVENTS_PER_REQUEST:
+            return jsonify({"success": False, "error": f"At most {MAX_EVENTS_PER_REQUEST} events per request."}), 400
+        result = ab_event_service.record_events(events)
+        return jsonify({"success": True, "data": result}), 202
+    except Exception as exc:
+        print(f"Error recording A/B events: {exc}")
+        return jsonify({"success": False, "error": f"Failed to record events: {exc}"}), 500
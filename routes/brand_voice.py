@@ -7,13 +7,27 @@ and to generate content using that voice.  Analysis is handled by
 via `services.brand_voice_service`.
 """
 
-from flask import Blueprint, jsonify, request
-from services.brand_voice_service import brand_voice_service
+import json
+import os
+import shutil
+import tempfile
+
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from models.social_media import BrandVoiceProfile
+from routes.job_routes import job_accepted_response, job_rejected_response
+from services.brand_voice_service import DEFAULT_PAGE_SIZE, BatchRecordError, brand_voice_service
 from services.brand_voice_analysis_service import brand_voice_analysis_service
+from services.database import read_replica
+from services.hashtag_index import hashtag_index
+from services.http_responses import response_optimizer
+from services.job_service import JobRejected, job_service
 
 
 brand_voice_bp = Blueprint("brand_voice", __name__)
 
+# Hashtags suggested for generated content
+GENERATED_HASHTAGS = 5
+
 
 @brand_voice_bp.route("/train", methods=["POST"])
 def train_brand_voice():
@@ -27,6 +41,8 @@ def train_brand_voice():
     content = data["content"]
     image_url = data.get("image_url")
     post_type = data["post_type"]
+    if post_type == BrandVoiceProfile.ALL_POST_TYPES:
+        return jsonify({"success": False, "error": f"post_type {post_type!r} is reserved"}), 400
     try:
         new_entry = brand_voice_service.add_training_data(user_id, content, image_url, post_type)
         return jsonify({"success": True, "data": new_entry.to_dict(), "message": "Training data added successfully"})
@@ -34,26 +50,175 @@ def train_brand_voice():
         return jsonify({"success": False, "error": f"Failed to add training data: {exc}"}), 500
 
 
+NDJSON_MIMETYPES = {"application/x-ndjson", "application/ndjson", "application/jsonlines"}
+
+
+def _iter_ndjson_records(stream):
+    """Yield one parsed record per non-empty line of an NDJSON request body."""
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as exc:
+            yield BatchRecordError(f"Invalid JSON: {exc}")
+
+
+@brand_voice_bp.route("/train-batch", methods=["POST"])
+def train_brand_voice_batch():
+    """Accept many training records as a JSON array or streamed NDJSON.
+
+    Valid rows are inserted in large batches; invalid rows are reported by
+    position in ``errors`` without aborting the rest of the load.
+    """
+    try:
+        if request.mimetype in NDJSON_MIMETYPES:
+            records = _iter_ndjson_records(request.stream)
+        else:
+            data = request.get_json(silent=True)
+            if isinstance(data, dict):
+                data = data.get("records")
+            if not isinstance(data, list):
+                return jsonify({"success": False, "error": "Expected a JSON array of records or NDJSON"}), 400
+            records = data
+        summary = brand_voice_service.add_training_data_batch(records)
+        return jsonify({"success": True, "data": summary, "message": f"Inserted {summary['inserted']} of {summary['received']} records"})
+    except Exception as exc:
+        return jsonify({"success": False, "error": f"Failed to add training data: {exc}"}), 500
+
+
+@brand_voice_bp.route("/training-data", methods=["GET"])
+@read_replica
+def list_training_data():
+    """List a user's training data, newest first, using cursor pagination.
+
+    Query parameters: ``user_id`` (required), ``post_type``, ``limit`` and
+    ``cursor`` (the ``next_cursor`` value from the previous page).
+    """
+    user_id = request.args.get("user_id")
+    if not user_id:
+        return jsonify({"success": False, "error": "user_id is required"}), 400
+    try:
+        limit = int(request.args.get("limit", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"success": False, "error": "limit must be an integer"}), 400
+    try:
+        rows, next_cursor = brand_voice_service.list_training_data(
+            user_id, request.args.get("post_type"), limit, request.args.get("cursor")
+        )
+    except ValueError as exc:
+        return jsonify({"success": False, "error": str(exc)}), 400
+    except Exception as exc:
+        return jsonify({"success": False, "error": f"Failed to list training data: {exc}"}), 500
+    return jsonify({"success": True, "data": [row.to_dict() for row in rows], "next_cursor": next_cursor})
+
+
+def _job_user(data=None) -> str:
+    """Return the user a background job is counted against."""
+    user_id = request.args.get("user_id") or request.form.get("user_id")
+    if not user_id and isinstance(data, dict):
+        user_id = data.get("user_id")
+    return user_id or request.remote_addr or "anonymous"
+
+
+# Analysis jobs are CPU bound; they hand the work to the corpus analysis
+# worker processes rather than compete for the GIL with request threads
+
+
+def _analyze_text_job(context, content, content_type):
+    from services.corpus_analysis_service import corpus_analysis_service
+
+    return corpus_analysis_service.run(brand_voice_analysis_service.analyze_from_text_input, content, content_type)
+
+
+def _analyze_upload_job(context, path, content_type):
+    from services.corpus_analysis_service import corpus_analysis_service
+
+    with open(path, "rb") as handle:
+        return corpus_analysis_service.analyze_stream(
+            handle, content_type, progress=context.progress, total_bytes=os.path.getsize(path)
+        )
+
+
 @brand_voice_bp.route("/analyze-text", methods=["POST"])
 def analyze_text_content():
-    """Analyze brand voice from manually provided text content."""
+    """Analyze brand voice from manually provided text content.
+
+    With ``async=true`` the analysis runs as a background job and the
+    response is a 202 with the job's status URL.
+    """
     try:
         data = request.get_json() or {}
         if not data or "content" not in data:
             return jsonify({"success": False, "error": "Content is required"}), 400
         content = data["content"]
         content_type = data.get("content_type", "mixed")
+        if job_service.async_requested(data):
+            job = job_service.submit("analyze-text", _job_user(data), _analyze_text_job, content, content_type)
+            return job_accepted_response(job)
         analysis_result = brand_voice_analysis_service.analyze_from_text_input(content, content_type)
         return jsonify({"success": True, "data": analysis_result, "message": "Brand voice analysis completed successfully"})
+    except JobRejected as exc:
+        return job_rejected_response(exc)
     except Exception as exc:
         return jsonify({"success": False, "error": f"Analysis failed: {exc}"}), 500
 
 
+def _analyze_corpus_job(context, user_id, post_type):
+    from services.corpus_analysis_service import corpus_analysis_service
+
+    return corpus_analysis_service.analyze_user_corpus(user_id, post_type, progress=context.progress)
+
+
+@brand_voice_bp.route("/analyze-corpus", methods=["GET"])
+@read_replica
+def analyze_corpus():
+    """Analyze every stored training post of a user.
+
+    Query parameters: ``user_id`` (required) and ``post_type``.  The
+    response holds the profile of the whole corpus and one per post type.
+    Corpora of at least ``CORPUS_ANALYSIS_MIN_PARALLEL`` posts, and any
+    with ``async=true``, are analysed by a background job instead.
+    """
+    user_id = request.args.get("user_id")
+    if not user_id:
+        return jsonify({"success": False, "error": "user_id is required"}), 400
+    post_type = request.args.get("post_type")
+    # Imported on first use: it pulls in multiprocessing, which most workers never need
+    from services.corpus_analysis_service import corpus_analysis_service
+
+    try:
+        large = corpus_analysis_service.count_posts(user_id, post_type) >= corpus_analysis_service.min_parallel
+        if large or job_service.async_requested():
+            job = job_service.submit("analyze-corpus", user_id, _analyze_corpus_job, user_id, post_type)
+            return job_accepted_response(job)
+        result = corpus_analysis_service.analyze_user_corpus(user_id, post_type)
+        if not result["post_count"]:
+            return jsonify({"success": False, "error": "No training data found for this user and post type"}), 404
+        return jsonify({"success": True, "data": result, "message": "Corpus analysis completed successfully"})
+    except JobRejected as exc:
+        return job_rejected_response(exc)
+    except Exception as exc:
+        print(f"Error in corpus analysis: {exc}")
+        return jsonify({"success": False, "error": f"Corpus analysis failed: {exc}"}), 500
+
+
 @brand_voice_bp.route("/voice-profile", methods=["GET"])
 def get_voice_profile():
-    """Return a sample brand voice profile."""
+    """Return the stored brand voice profile for a user, or a sample profile.
+
+    Pass ``user_id`` (and optionally ``post_type``) to read the profile
+    maintained from that user's training data.
+    """
     try:
-        profile = brand_voice_analysis_service.get_sample_profile()
+        user_id = request.args.get("user_id")
+        if not user_id:
+            profile = brand_voice_analysis_service.get_sample_profile()
+            return jsonify({"success": True, "data": profile, "message": "Voice profile retrieved successfully"})
+        profile = brand_voice_service.get_profile_data(user_id, request.args.get("post_type"))
+        if profile is None:
+            return jsonify({"success": False, "error": "No training data found for this user and post type"}), 404
         return jsonify({"success": True, "data": profile, "message": "Voice profile retrieved successfully"})
     except Exception as exc:
         return jsonify({"success": False, "error": f"Failed to retrieve voice profile: {exc}"}), 500
@@ -61,20 +226,144 @@ def get_voice_profile():
 
 @brand_voice_bp.route("/generate-content", methods=["POST"])
 def generate_content_with_voice():
-    """Generate content using the analyzed brand voice."""
+    """Generate content using the analyzed brand voice.
+
+    Uses ``brand_profile`` from the request if given, otherwise the stored
+    profile for ``user_id``, falling back to the sample profile.  Unless
+    the request supplies the profile, hashtags are those related to the
+    prompt in the user's (or everyone's) posts.  Pass ``echo: false`` to
+    leave the prompt and profile out of the response.
+    """
     try:
         data = request.get_json() or {}
         if not data or "prompt" not in data:
             return jsonify({"success": False, "error": "Prompt is required"}), 400
         prompt = data["prompt"]
         content_type = data.get("content_type", "social_post")
-        brand_profile = data.get("brand_profile", brand_voice_analysis_service.get_sample_profile())
-        generated = brand_voice_analysis_service.generate_content_with_voice(prompt, brand_profile, content_type)
-        return jsonify({"success": True, "data": {"generated_content": generated, "prompt": prompt, "content_type": content_type, "brand_profile_used": brand_profile}, "message": "Content generated successfully with brand voice"})
+        brand_profile = data.get("brand_profile")
+        hashtags = None
+        if brand_profile is None:
+            if data.get("user_id"):
+                brand_profile = brand_voice_service.get_profile_data(data["user_id"], data.get("post_type"))
+            hashtags = hashtag_index.suggest(prompt, data.get("user_id"), k=GENERATED_HASHTAGS)
+        if brand_profile is None:
+            brand_profile = brand_voice_analysis_service.get_sample_profile()
+        generated = brand_voice_analysis_service.generate_content_with_voice(
+            prompt, brand_profile, content_type, hashtags
+        )
+        result = {"generated_content": generated}
+        if response_optimizer.echo_requested(data):
+            result.update(
+                {
+                    "prompt": prompt,
+                    "content_type": content_type,
+                    "brand_profile_used": brand_profile,
+                    "hashtags_suggested": hashtags,
+                }
+            )
+        return jsonify({"success": True, "data": result, "message": "Content generated successfully with brand voice"})
     except Exception as exc:
         return jsonify({"success": False, "error": f"Content generation failed: {exc}"}), 500
 
 
+# Most prompt × profile combinations generated by one batch request
+MAX_GENERATION_BATCH = 50000
+
+
+def _batch_prompts(data: dict):
+    """Return ``(prompt, content_type)`` pairs from a batch request, or an error message."""
+    prompts = data.get("prompts")
+    if not isinstance(prompts, list) or not prompts:
+        return None, "prompts must be a non-empty list"
+    default_type = data.get("content_type", "social_post")
+    pairs = []
+    for position, prompt in enumerate(prompts):
+        if isinstance(prompt, dict):
+            prompt, content_type = prompt.get("prompt"), prompt.get("content_type", default_type)
+        else:
+            content_type = default_type
+        if not isinstance(prompt, str) or not isinstance(content_type, str):
+            return None, f"prompts[{position}] must be a string or an object with a string prompt"
+        pairs.append((prompt, content_type))
+    return pairs, None
+
+
+def _batch_profiles(data: dict):
+    """Resolve each profile of a batch request once, or return an error message.
+
+    An entry is either ``{"brand_profile": {...}}`` or ``{"user_id": ...,
+    "post_type": ...}``; unknown users get the sample profile, as in
+    ``/generate-content``.  Profiles not supplied by the request use the
+    hashtags the user (or everyone) uses most, from `hashtag_index`; every
+    prompt of a profile shares them, so its outputs can still be deduplicated.
+    """
+    specs = data.get("profiles") or [{}]
+    if not isinstance(specs, list):
+        return None, "profiles must be a list"
+    profiles, stored = [], {}
+    for position, spec in enumerate(specs):
+        if not isinstance(spec, dict):
+            return None, f"profiles[{position}] must be an object"
+        profile = spec.get("brand_profile")
+        if profile is not None and not isinstance(profile, dict):
+            return None, f"profiles[{position}].brand_profile must be an object"
+        if profile is None:
+            if spec.get("user_id"):
+                key = (spec["user_id"], spec.get("post_type"))
+                if key not in stored:
+                    stored[key] = brand_voice_service.get_profile_data(*key)
+                profile = stored[key]
+            profile = dict(profile or brand_voice_analysis_service.get_sample_profile())
+            hashtags = hashtag_index.suggest("", spec.get("user_id"), k=GENERATED_HASHTAGS)
+            if hashtags:
+                profile["hashtags"] = hashtags
+        profiles.append(profile)
+    return profiles, None
+
+
+@brand_voice_bp.route("/generate-content/batch", methods=["POST"])
+def generate_content_batch():
+    """Generate content for every prompt with every brand profile, streamed as NDJSON.
+
+    The body holds ``prompts`` (strings, or objects with ``prompt`` and
+    ``content_type``), ``profiles`` (see `_batch_profiles`), a default
+    ``content_type`` and ``dedupe`` (default true).  Each output line is
+    one item with its ``index``, ``profile_index`` and ``prompt_index``
+    and either ``generated_content`` or, for a repeat of an earlier
+    output, ``duplicate_of``; the last line is a ``summary``.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"success": False, "error": "Expected a JSON object"}), 400
+    prompts, error = _batch_prompts(data)
+    if error is None:
+        try:
+            profiles, error = _batch_profiles(data)
+        except Exception as exc:
+            return jsonify({"success": False, "error": f"Failed to load brand profiles: {exc}"}), 500
+    if error is not None:
+        return jsonify({"success": False, "error": error}), 400
+    total = len(prompts) * len(profiles)
+    if total > MAX_GENERATION_BATCH:
+        return jsonify({"success": False, "error": f"Batch too large; at most {MAX_GENERATION_BATCH} prompt × profile combinations"}), 400
+    dedupe = str(data.get("dedupe", True)).lower() not in ("0", "false", "no")
+    dumps = current_app.json.dumps
+
+    def generate():
+        duplicates = 0
+        try:
+            for item in brand_voice_analysis_service.generate_batch(prompts, profiles, dedupe):
+                duplicates += "duplicate_of" in item
+                yield dumps(item) + "\n"
+        except Exception as exc:
+            print(f"Error in batch content generation: {exc}")
+            yield dumps({"error": f"Content generation failed: {exc}"}) + "\n"
+            return
+        yield dumps({"summary": {"total": total, "unique": total - duplicates, "duplicates": duplicates}}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
 @brand_voice_bp.route("/sample-analysis", methods=["GET"])
 def get_sample_analysis():
     """Return a sample analysis for demonstration."""
@@ -95,7 +384,11 @@ def get_sample_analysis():
 
 @brand_voice_bp.route("/upload-content", methods=["POST"])
 def upload_content_file():
-    """Upload and analyze content from a text file."""
+    """Upload and analyze content from a text file.
+
+    With ``async=true`` the upload is spooled to a temporary file and
+    analysed by a background job, which reports progress as it reads.
+    """
     try:
         if 'file' not in request.files:
             return jsonify({"success": False, "error": "No file uploaded"}), 400
@@ -104,9 +397,20 @@ def upload_content_file():
             return jsonify({"success": False, "error": "No file selected"}), 400
         if not file.filename.lower().endswith('.txt'):
             return jsonify({"success": False, "error": "Only .txt files are supported"}), 400
-        content = file.read().decode('utf-8')
         content_type = request.form.get('content_type', 'mixed')
-        analysis_result = brand_voice_analysis_service.analyze_from_text_input(content, content_type)
+        if job_service.async_requested():
+            # The request stream is gone once the response is sent
+            with tempfile.NamedTemporaryFile(prefix="imp-upload-", suffix=".txt", delete=False) as spool:
+                shutil.copyfileobj(file.stream, spool)
+            job = job_service.submit(
+                "upload-content", _job_user(), _analyze_upload_job, spool.name, content_type,
+                cleanup=lambda: os.unlink(spool.name),
+            )
+            return job_accepted_response(job)
+        # Analyze the upload incrementally rather than reading it all into memory
+        analysis_result = brand_voice_analysis_service.analyze_stream(file.stream, content_type)
         return jsonify({"success": True, "data": analysis_result, "message": "Content file analysed successfully"})
+    except JobRejected as exc:
+        return job_rejected_response(exc)
     except Exception as exc:
         return jsonify({"success": False, "error": f"File analysis failed: {exc}"}), 500
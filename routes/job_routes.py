@@ -0,0 +1,44 @@
+"""
+Background job routes.
+
+``GET /api/jobs/<id>`` reports the status, progress and (once finished)
+the result or error of a job started by a heavy endpoint called with
+``async=true``.  The helpers below build the responses those endpoints
+return when they queue a job or when it is rejected.
+"""
+
+from flask import Blueprint, jsonify, url_for
+from services.job_service import JobRejected, job_service
+
+
+jobs_bp = Blueprint("jobs", __name__)
+
+
+def job_accepted_response(job: dict):
+    """Return a 202 response pointing at the status URL of ``job``."""
+    status_url = url_for("jobs.get_job", job_id=job["id"])
+    response = jsonify({"success": True, "data": job, "status_url": status_url})
+    response.status_code = 202
+    response.headers["Location"] = status_url
+    return response
+
+
+def job_rejected_response(exc: JobRejected):
+    """Return a 429 or 503 response with ``Retry-After`` for a rejected job."""
+    response = jsonify({"success": False, "error": str(exc)})
+    response.status_code = exc.status_code
+    response.headers["Retry-After"] = str(exc.retry_after)
+    return response
+
+
+@jobs_bp.route("/<string:job_id>", methods=["GET"])
+def get_job(job_id):
+    """Return the status of a background job."""
+    try:
+        job = job_service.get(job_id)
+        if job is None:
+            return jsonify({"success": False, "error": "Job not found"}), 404
+        return jsonify({"success": True, "data": job})
+    except Exception as exc:
+        print(f"Error fetching job {job_id}: {exc}")
+        return jsonify({"success": False, "error": f"Failed to fetch job: {exc}"}), 500
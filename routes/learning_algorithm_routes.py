@@ -7,6 +7,8 @@ selected content type.
 """
 
 from flask import Blueprint, jsonify, request
+from services.database import read_replica
+from services.hashtag_index import hashtag_index
 from services.learning_algorithm_service import learning_algorithm_service
 
 
@@ -14,18 +16,74 @@ learning_algorithm_bp = Blueprint("learning_algorithm", __name__)
 
 
 @learning_algorithm_bp.route("/content-recommendations", methods=["GET"])
+@read_replica
 def get_content_recommendations():
     """Return content recommendations based on user training data."""
     try:
         user_id = request.args.get("user_id", "default_user")
-        content_type = request.args.get("type", "general")
+        content_type = request.args.get("type") or request.args.get("content_type", "general")
         platform = request.args.get("platform", "instagram")
         result = learning_algorithm_service.generate_content_recommendations(
             user_id=user_id,
             content_type=content_type,
             platform=platform,
+            topic=request.args.get("topic"),
         )
         return jsonify(result)
     except Exception as exc:
         print(f"Error in content recommendations: {exc}")
         return jsonify({"success": False, "error": f"Failed to get content recommendations: {exc}"}), 500
+
+
+@learning_algorithm_bp.route("/similar", methods=["GET"])
+@read_replica
+def get_similar_posts():
+    """Return the user's training posts most similar to a query.
+
+    Query parameters: ``user_id`` and ``q`` (required), ``k`` (default 5,
+    at most 50) and ``post_type``.
+    """
+    user_id = request.args.get("user_id")
+    query = request.args.get("q", "")
+    if not user_id or not query.strip():
+        return jsonify({"success": False, "error": "user_id and q are required"}), 400
+    try:
+        k = max(1, min(int(request.args.get("k", 5)), 50))
+    except ValueError:
+        return jsonify({"success": False, "error": "k must be an integer"}), 400
+    try:
+        results = learning_algorithm_service.find_similar(
+            user_id, query, k, request.args.get("post_type")
+        )
+        return jsonify({"success": True, "results": results})
+    except Exception as exc:
+        print(f"Error in similar posts lookup: {exc}")
+        return jsonify({"success": False, "error": f"Failed to find similar posts: {exc}"}), 500
+
+
+@learning_algorithm_bp.route("/related-hashtags", methods=["GET"])
+@read_replica
+def get_related_hashtags():
+    """Return hashtags to use with a draft.
+
+    Query parameters: ``q`` (the draft; its own hashtags drive the
+    ranking), ``user_id`` to favour the user's own habits and ``k``
+    (default 5, at most 50).  Without hashtags in ``q`` the most used
+    hashtags are returned.
+    """
+    try:
+        k = max(1, min(int(request.args.get("k", 5)), 50))
+    except ValueError:
+        return jsonify({"success": False, "error": "k must be an integer"}), 400
+    try:
+        results = hashtag_index.related(request.args.get("q", ""), request.args.get("user_id"), k)
+        return jsonify({"success": True, "results": results})
+    except Exception as exc:
+        print(f"Error in related hashtags lookup: {exc}")
+        return jsonify({"success": False, "error": f"Failed to find related hashtags: {exc}"}), 500
+
+
+@learning_algorithm_bp.route("/cache-stats", methods=["GET"])
+def get_cache_stats():
+    """Return hit/miss statistics for the recommendation cache of this worker."""
+    return jsonify({"success": True, "data": learning_algorithm_service.cache.stats()})
@@ -2,18 +2,46 @@
 """
 Routes for real-estate market data.
 
-Provides endpoints to retrieve current market statistics and simple
-historical trends. See `services.wecar_market_service` for the
-implementation details.
+Provides endpoints to retrieve current market statistics and monthly
+trends. Statistics are ingested in the background (see
+`services.wecar_ingestion_service`); these routes only read what has
+been stored.
+
+Responses carry ``Cache-Control`` and ``ETag`` headers derived from the
+service cache, and conditional requests with a matching
+``If-None-Match`` receive an empty ``304 Not Modified``.
 """
 
-from flask import Blueprint, jsonify
-from services.wecar_market_service import wecar_market_service
+from datetime import datetime
+
+from flask import Blueprint, jsonify, make_response, request
+from services.wecar_market_service import MAX_TREND_WINDOW, wecar_market_service
 
 
 market_data_bp = Blueprint("market_data", __name__)
 
 
+def _cacheable_response(etag: str, build_body):
+    """Return a 304 if the client has ``etag``, else the JSON body, with cache headers."""
+    if request.if_none_match.contains_weak(etag):
+        response = make_response("", 304)
+    else:
+        response = jsonify(build_body())
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = (
+        f"public, max-age={int(wecar_market_service.ttl)}, "
+        f"stale-while-revalidate={int(wecar_market_service.max_stale)}"
+    )
+    return response
+
+
+def _month_arg(name: str):
+    value = request.args.get(name)
+    if not value:
+        return None
+    return datetime.strptime(value, "%Y-%m").date()
+
+
 @market_data_bp.route("/", methods=["GET"])
 def get_current_market_stats():
     """
@@ -21,25 +49,52 @@ def get_current_market_stats():
     This route now serves the base /api/market-data/ endpoint.
     """
     try:
-        data = wecar_market_service.get_market_data()
-        return jsonify({"success": True, "data": data, "source": "WECAR", "message": "Current market statistics retrieved successfully"})
+        data, market_etag = wecar_market_service.get_market_data()
+        if data is None:
+            return jsonify({"success": False, "error": "No market data has been ingested yet", "message": "Unable to retrieve current market statistics"}), 503
+        etag = f"market-{market_etag}"
+        return _cacheable_response(
+            etag,
+            lambda: {"success": True, "data": data, "source": "WECAR", "message": "Current market statistics retrieved successfully"},
+        )
     except Exception as exc:
         return jsonify({"success": False, "error": f"Failed to fetch market data: {exc}", "message": "Unable to retrieve current market statistics"}), 500
 
 
 @market_data_bp.route("/market-trends", methods=["GET"])
 def get_market_trends():
-    """Return simplified market trends for the past six months."""
+    """
+    Return monthly market statistics for a range of months.
+
+    Query parameters: ``from`` and ``to`` (``YYYY-MM``, defaulting to the
+    six months up to the latest report) and ``window`` (months averaged
+    into each entry's ``rolling_average``, default 1 for none).
+    """
+    try:
+        start, end = _month_arg("from"), _month_arg("to")
+        window = int(request.args.get("window", 1))
+    except ValueError:
+        return jsonify({"success": False, "error": "from/to must be YYYY-MM and window an integer"}), 400
+    if not 1 <= window <= MAX_TREND_WINDOW:
+        return jsonify({"success": False, "error": f"window must be between 1 and {MAX_TREND_WINDOW}"}), 400
+    if start and end and start > end:
+        return jsonify({"success": False, "error": "from must not be after to"}), 400
     try:
-        trends = wecar_market_service.get_historical_trends()
-        current_data = wecar_market_service.get_market_data()
-        return jsonify({
-            "success": True,
-            "trends": trends,
-            "current_period": current_data.get("report_period", "Current"),
-            "insights": current_data.get("market_insights", {}),
-            "source": "WECAR",
-            "message": "Market trends retrieved successfully",
-        })
+        trends, trends_etag = wecar_market_service.get_trends(start, end, window)
+        current_data, market_etag = wecar_market_service.get_market_data()
+        current_data = current_data or {}
+        etag = f"trends-{trends_etag}-{market_etag}"
+        return _cacheable_response(
+            etag,
+            lambda: {
+                "success": True,
+                "trends": trends,
+                "window": window,
+                "current_period": current_data.get("report_period", "Current"),
+                "insights": current_data.get("market_insights", {}),
+                "source": "WECAR",
+                "message": "Market trends retrieved successfully",
+            },
+        )
     except Exception as exc:
         return jsonify({"success": False, "error": f"Failed to fetch market trends: {exc}", "message": "Unable to retrieve market trends"}), 500
@@ -0,0 +1,22 @@
+"""
+Metrics routes.
+
+Exposes request latency, database and service metrics, merged across
+all gunicorn workers, in the Prometheus text exposition format.
+"""
+
+from flask import Blueprint, Response
+from services.metrics import metrics
+
+
+metrics_bp = Blueprint("metrics", __name__)
+
+
+@metrics_bp.route("/_metrics", methods=["GET"])
+def get_metrics():
+    """Return all metrics in Prometheus text format."""
+    try:
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+    except Exception as exc:
+        print(f"Error rendering metrics: {exc}")
+        return Response(f"# Failed to render metrics: {exc}\n", status=500, mimetype="text/plain")
@@ -0,0 +1,46 @@
+"""
+SEO analysis routes.
+
+Exposes `SeoService` over HTTP so clients can score single pieces of
+content or large batches of listing captions in one request.
+"""
+
+from flask import Blueprint, jsonify, request
+from services.seo_service import seo_service
+
+
+seo_bp = Blueprint("seo", __name__)
+
+# Upper bound on the number of texts accepted by a single batch request
+MAX_BATCH_SIZE = 10000
+
+
+@seo_bp.route("/analyze", methods=["POST"])
+def analyze_seo():
+    """Return the SEO score and recommendations for a single text."""
+    try:
+        data = request.get_json() or {}
+        if "content" not in data:
+            return jsonify({"success": False, "error": "Content is required"}), 400
+        result = seo_service.analyze_content(data["content"])
+        return jsonify({"success": True, "data": result})
+    except Exception as exc:
+        return jsonify({"success": False, "error": f"SEO analysis failed: {exc}"}), 500
+
+
+@seo_bp.route("/analyze-batch", methods=["POST"])
+def analyze_seo_batch():
+    """Return SEO results for a list of texts, in the order they were given."""
+    try:
+        data = request.get_json() or {}
+        texts = data.get("texts")
+        if not isinstance(texts, list):
+            return jsonify({"success": False, "error": "texts must be a list of strings"}), 400
+        if len(texts) > MAX_BATCH_SIZE:
+            return jsonify({"success": False, "error": f"Batch too large; at most {MAX_BATCH_SIZE} texts per request"}), 400
+        if not all(isinstance(text, str) for text in texts):
+            return jsonify({"success": False, "error": "texts must be a list of strings"}), 400
+        results = seo_service.analyze_many(texts)
+        return jsonify({"success": True, "count": len(results), "results": results})
+    except Exception as exc:
+        return jsonify({"success": False, "error": f"SEO batch analysis failed: {exc}"}), 500
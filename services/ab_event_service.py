@@ -0,0 +1,241 @@
+"""
+Impression/click/conversion event ingestion for A/B test variations.
+
+Events are counted in a `ShardedCounter` in process memory and written
+to the `ab_test_variations` counters by a background thread every
+``AB_EVENT_FLUSH_INTERVAL`` seconds.  Each flush applies all pending
+increments with a single executemany ``UPDATE`` in one transaction, so
+thousands of events per second cost one write per flush rather than one
+transaction per event.  Pending counts are flushed again at interpreter
+exit so a clean worker shutdown does not lose them, and are put back
+into the counter if a flush fails.
+
+Events for variation ids that do not exist are rejected when recorded.
+Ids are checked against the database once per batch for the ids not
+already known to this worker, and known ids are remembered in a bounded
+`TTLCache`.
+"""
+
+import atexit
+import os
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import bindparam, select, update
+
+from models.ab_testing import ABTestVariation
+from models.social_media import db
+from services.ab_testing_service import ab_testing_service
+from services.cache import TTLCache
+
+EVENT_TYPES = ("impression", "click", "conversion")
+_EVENT_INDEX = {event_type: index for index, event_type in enumerate(EVENT_TYPES)}
+# Upper bound on events accepted in a single request
+MAX_EVENTS_PER_REQUEST = 10000
+
+
+class ShardedCounter:
+    """Per-key event counters split across independently locked shards.
+
+    Spreading keys over several locks keeps concurrent request threads
+    from contending on a single lock while recording events.
+    """
+
+    def __init__(self, shards: int = 16) -> None:
+        self._shards = [(threading.Lock(), {}) for _ in range(shards)]
+
+    def add(self, key: str, index: int, amount: int = 1) -> None:
+        lock, counts = self._shards[hash(key) % len(self._shards)]
+        with lock:
+            row = counts.get(key)
+            if row is None:
+                row = counts[key] = [0] * len(EVENT_TYPES)
+            row[index] += amount
+
+    def drain(self) -> Dict[str, List[int]]:
+        """Remove and return every pending count."""
+        drained: Dict[str, List[int]] = {}
+        for i, (lock, _) in enumerate(self._shards):
+            with lock:
+                counts = self._shards[i][1]
+                self._shards[i] = (lock, {})
+            drained.update(counts)
+        return drained
+
+    def restore(self, drained: Dict[str, List[int]]) -> None:
+        """Add previously drained counts back, e.g. after a failed flush."""
+        for key, row in drained.items():
+            for index, amount in enumerate(row):
+                if amount:
+                    self.add(key, index, amount)
+
+    def pending(self) -> int:
+        return sum(len(counts) for _, counts in self._shards)
+
+
+class ABEventService:
+    """Accept A/B events and periodically flush them to the database."""
+
+    def __init__(self, flush_interval: float = 5.0, shards: int = 16, known_variations: int = 65536) -> None:
+        self.flush_interval = flush_interval
+        self.counter = ShardedCounter(shards)
+        self.app = None
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_pid: Optional[int] = None
+        self.flushed_events = 0
+        self.flush_count = 0
+        # Variations are never deleted, so a known id stays valid
+        self.known_variations = TTLCache(maxsize=known_variations, ttl=float("inf"))
+        self._atexit_registered = False
+
+    def init_app(self, app) -> None:
+        """Bind the service to a Flask app and flush pending counts at exit."""
+        self.app = app
+        if not self._atexit_registered:
+            atexit.register(self.shutdown)
+            self._atexit_registered = True
+
+    def record_events(self, events: Iterable) -> dict:
+        """Validate and count a batch of events; invalid ones are reported by index.
+
+        Must be called inside an application context, to look up
+        variation ids not seen before.
+        """
+        accepted, errors = 0, []
+        valid = []
+        for position, event in enumerate(events):
+            if not isinstance(event, dict):
+                errors.append({"index": position, "error": "Event must be a JSON object"})
+                continue
+            variation_id = event.get("variation_id")
+            index = _EVENT_INDEX.get(event.get("type"))
+            count = event.get("count", 1)
+            if not isinstance(variation_id, str) or not variation_id:
+                errors.append({"index": position, "error": "variation_id is required"})
+            elif index is None:
+                errors.append({"index": position, "error": f"type must be one of {', '.join(EVENT_TYPES)}"})
+            elif not isinstance(count, int) or isinstance(count, bool) or count < 1:
+                errors.append({"index": position, "error": "count must be a positive integer"})
+            else:
+                valid.append((position, variation_id, index, count))
+        existing = self._existing_variations({variation_id for _, variation_id, _, _ in valid})
+        for position, variation_id, index, count in valid:
+            if variation_id in existing:
+                self.counter.add(variation_id, index, count)
+                accepted += 1
+            else:
+                errors.append({"index": position, "error": "Unknown variation_id"})
+        errors.sort(key=lambda error: error["index"])
+        if accepted:
+            self._ensure_flusher()
+        return {"accepted": accepted, "rejected": len(errors), "errors": errors}
+
+    def _existing_variations(self, variation_ids: set) -> set:
+        """Return the subset of ``variation_ids`` that are stored variations."""
+        existing = {variation_id for variation_id in variation_ids if self.known_variations.get(variation_id)}
+        missing = variation_ids - existing
+        if missing:
+            found = db.session.scalars(
+                select(ABTestVariation.id).where(ABTestVariation.id.in_(list(missing)))
+            ).all()
+            for variation_id in found:
+                self.known_variations.set(variation_id, True)
+            existing.update(found)
+        return existing
+
+    def flush(self) -> int:
+        """Write all pending counts in one bulk UPDATE; return the variations touched.
+
+        Must be called inside an application context.  Counts for unknown
+        variation ids are discarded.
+        """
+        with self._flush_lock:
+            drained = self.counter.drain()
+            if not drained:
+                return 0
+            table = ABTestVariation.__table__
+            stmt = (
+                update(table)
+                .where(table.c.id == bindparam("variation_id"))
+                .values(
+                    impressions=table.c.impressions + bindparam("add_impressions"),
+                    clicks=table.c.clicks + bindparam("add_clicks"),
+                    conversions=table.c.conversions + bindparam("add_conversions"),
+                )
+            )
+            params = [
+                {
+                    "variation_id": variation_id,
+                    "add_impressions": row[0],
+                    "add_clicks": row[1],
+                    "add_conversions": row[2],
+                }
+                for variation_id, row in drained.items()
+            ]
+            try:
+                db.session.execute(stmt, params)
+                ab_testing_service.bump_version()
+                test_ids = db.session.scalars(
+                    select(table.c.test_id).where(table.c.id.in_(list(drained))).distinct()
+                ).all()
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                self.counter.restore(drained)
+                print(f"Failed to flush A/B events: {e}")
+                raise
+            self.flush_count += 1
+            self.flushed_events += sum(sum(row) for row in drained.values())
+            ab_testing_service.invalidate(test_ids)
+            return len(drained)
+
+    def shutdown(self) -> None:
+        """Stop the background flusher and write any remaining counts."""
+        self._stop.set()
+        if self._thread is not None and self._thread_pid == os.getpid():
+            self._thread.join(timeout=self.flush_interval + 5)
+        if self.app is not None and self.counter.pending():
+            with self.app.app_context():
+                self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "pending_variations": self.counter.pending(),
+            "flushed_events": self.flushed_events,
+            "flush_count": self.flush_count,
+            "flush_interval_seconds": self.flush_interval,
+        }
+
+    def _ensure_flusher(self) -> None:
+        # Started lazily (and restarted after a fork) so that preloading
+        # the app in a gunicorn master never leaves a thread behind.
+        if self.app is None:
+            return
+        if self._thread is not None and self._thread_pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._flush_lock:
+            if self._thread is not None and self._thread_pid == os.getpid() and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="ab-event-flusher", daemon=True)
+            self._thread_pid = os.getpid()
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            try:
+                with self.app.app_context():
+                    self.flush()
+            except Exception:
+                # Counts were restored; the next interval retries
+                pass
+
+
+# Singleton instance
+ab_event_service = ABEventService(
+    flush_interval=float(os.environ.get("AB_EVENT_FLUSH_INTERVAL", 5)),
+    shards=int(os.environ.get("AB_EVENT_SHARDS", 16)),
+    known_variations=int(os.environ.get("AB_EVENT_KNOWN_VARIATIONS", 65536)),
+)
@@ -0,0 +1,217 @@
+"""
+Statistical analysis of A/B test outcomes.
+
+Each variation is summarised by its sufficient statistics: the number of
+trials (impressions) and successes (clicks or conversions).  From these
+the engine computes
+
+* frequentist two-proportion z-tests of every variation against the
+  control (the first variation), with Wilson confidence intervals, and
+* Bayesian beta-binomial posteriors (uniform ``Beta(1, 1)`` prior),
+  reporting the probability that each variation beats the control and
+  that it is the best overall.
+
+Pairwise probabilities, and so the probability of being best for the
+usual two-variation test, use Evan Miller's closed form (or a normal
+approximation for very large counts).  Only tests with more than two
+variations fall back to seeded Monte Carlo sampling in pure Python,
+with a draw count sized to keep an analysis in the low milliseconds.
+Results are memoised per test and
+metric until the underlying counts change, so repeated polling of an
+unchanged test costs a dictionary lookup.
+"""
+
+import math
+import os
+import random
+from typing import List, Sequence, Tuple
+
+from services.cache import TTLCache
+
+METRICS = {"click": "clicks", "conversion": "conversions"}
+SIGNIFICANCE_LEVEL = 0.05
+WIN_PROBABILITY_THRESHOLD = 0.95
+# Draws used for tests with more than two variations; the standard error
+# of each probability is at most 0.5 / sqrt(MONTE_CARLO_DRAWS)
+MONTE_CARLO_DRAWS = 5000
+# Above this many successes the closed form is replaced by a normal approximation
+CLOSED_FORM_MAX_SUCCESSES = 20000
+
+
+def _log_beta(a: float, b: float) -> float:
+    return math.lgamma(a) + math.lgamma(b) - math.lgamma(a + b)
+
+
+def _normal_cdf(x: float) -> float:
+    return 0.5 * math.erfc(-x / math.sqrt(2))
+
+
+def _rate(successes: int, trials: int) -> float:
+    # Clicks and impressions are counted separately, so successes can
+    # exceed trials; the proportion is clamped to [0, 1]
+    return min(1.0, max(0.0, successes / trials)) if trials else 0.0
+
+
+def wilson_interval(successes: int, trials: int, z: float = 1.959964) -> Tuple[float, float]:
+    """Return the Wilson score interval for a binomial proportion."""
+    if trials == 0:
+        return 0.0, 0.0
+    p = _rate(successes, trials)
+    denom = 1 + z * z / trials
+    centre = (p + z * z / (2 * trials)) / denom
+    margin = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denom
+    return max(0.0, centre - margin), min(1.0, centre + margin)
+
+
+def two_proportion_z_test(
+    successes_a: int, trials_a: int, successes_b: int, trials_b: int
+) -> Tuple[float, float]:
+    """Return the z statistic and two-sided p-value for rate(b) vs rate(a)."""
+    if trials_a == 0 or trials_b == 0:
+        return 0.0, 1.0
+    rate_a, rate_b = _rate(successes_a, trials_a), _rate(successes_b, trials_b)
+    pooled = (rate_a * trials_a + rate_b * trials_b) / (trials_a + trials_b)
+    variance = pooled * (1 - pooled) * (1 / trials_a + 1 / trials_b)
+    if variance <= 0:
+        return 0.0, 1.0
+    z = (rate_b - rate_a) / math.sqrt(variance)
+    return z, math.erfc(abs(z) / math.sqrt(2))
+
+
+def probability_b_beats_a(alpha_a: float, beta_a: float, alpha_b: float, beta_b: float) -> float:
+    """Return P(p_b > p_a) for independent Beta posteriors.
+
+    Uses the exact closed form when ``alpha_b`` is an integer of moderate
+    size and a normal approximation otherwise.
+    """
+    if float(alpha_b).is_integer() and alpha_b <= CLOSED_FORM_MAX_SUCCESSES:
+        total = 0.0
+        log_beta_a = _log_beta(alpha_a, beta_a)
+        for i in range(int(alpha_b)):
+            total += math.exp(
+                _log_beta(alpha_a + i, beta_a + beta_b)
+                - math.log(beta_b + i)
+                - _log_beta(1 + i, beta_b)
+                - log_beta_a
+            )
+        return min(1.0, max(0.0, total))
+    mean_a, mean_b = alpha_a / (alpha_a + beta_a), alpha_b / (alpha_b + beta_b)
+    var_a = alpha_a * beta_a / ((alpha_a + beta_a) ** 2 * (alpha_a + beta_a + 1))
+    var_b = alpha_b * beta_b / ((alpha_b + beta_b) ** 2 * (alpha_b + beta_b + 1))
+    return _normal_cdf((mean_b - mean_a) / math.sqrt(var_a + var_b))
+
+
+def probability_best(
+    posteriors: Sequence[Tuple[float, float]], draws: int = MONTE_CARLO_DRAWS, seed: int = 0
+) -> List[float]:
+    """Return P(each arm has the highest rate) for Beta ``(alpha, beta)`` posteriors."""
+    if len(posteriors) == 1:
+        return [1.0]
+    if len(posteriors) == 2:
+        (a1, b1), (a2, b2) = posteriors
+        p_second = probability_b_beats_a(a1, b1, a2, b2)
+        return [1 - p_second, p_second]
+    rng = random.Random(seed)
+    wins = [0] * len(posteriors)
+    betavariate = rng.betavariate
+    for _ in range(draws):
+        samples = [betavariate(a, b) for a, b in posteriors]
+        wins[samples.index(max(samples))] += 1
+    return [w / draws for w in wins]
+
+
+def analyze_counts(counts: Sequence[Tuple[int, int]]) -> dict:
+    """Analyze ``(trials, successes)`` per variation; the first is the control."""
+    if not counts:
+        return {"variations": [], "winner": None, "total_trials": 0}
+    posteriors = [(1 + min(s, t), 1 + max(t - s, 0)) for t, s in counts]
+    best = probability_best(posteriors)
+    control_trials, control_successes = counts[0]
+    results = []
+    for index, (trials, successes) in enumerate(counts):
+        rate = _rate(successes, trials)
+        low, high = wilson_interval(successes, trials)
+        entry = {
+            "trials": trials,
+            "successes": successes,
+            "rate": round(rate, 6),
+            "confidence_interval": [round(low, 6), round(high, 6)],
+            "probability_best": round(best[index], 4),
+        }
+        if index > 0:
+            z, p_value = two_proportion_z_test(control_successes, control_trials, successes, trials)
+            control_rate = _rate(control_successes, control_trials)
+            entry.update(
+                {
+                    "lift_vs_control": round((rate - control_rate) / control_rate, 4) if control_rate else None,
+                    "z_score": round(z, 4),
+                    "p_value": round(p_value, 6),
+                    "significant": p_value < SIGNIFICANCE_LEVEL,
+                    "probability_beats_control": round(
+                        probability_b_beats_a(*posteriors[0], *posteriors[index]), 4
+                    ),
+                }
+            )
+        results.append(entry)
+
+    leader = max(range(len(counts)), key=lambda i: best[i])
+    winner = None
+    if best[leader] >= WIN_PROBABILITY_THRESHOLD and (
+        leader == 0 or results[leader].get("significant")
+    ):
+        winner = leader
+    return {
+        "variations": results,
+        "winner": winner,
+        "leader": leader,
+        "total_trials": sum(t for t, _ in counts),
+    }
+
+
+class ABStatisticsEngine:
+    """Memoising front end for `analyze_counts` over stored A/B tests."""
+
+    def __init__(self, maxsize: int = 4096) -> None:
+        self._memo = TTLCache(maxsize=maxsize, ttl=float("inf"))
+
+    def analyze_test(self, test: dict, metric: str = "click") -> dict:
+        """Analyze a serialised test (as returned by `ABTestingService.get_test`)."""
+        if metric not in METRICS:
+            raise ValueError(f"metric must be one of {', '.join(METRICS)}")
+        field = METRICS[metric]
+        counts = tuple(
+            (variation.get("impressions", 0), variation.get(field, 0))
+            for variation in test.get("variations", [])
+        )
+        key = (test["id"], metric)
+        memo = self._memo.get(key)
+        if memo is not None and memo[0] == counts:
+            return memo[1]
+        result = analyze_counts(counts)
+        result["metric"] = metric
+        result["message"] = self._summarise(result)
+        self._memo.set(key, (counts, result))
+        return result
+
+    def stats(self) -> dict:
+        return self._memo.stats()
+
+    @staticmethod
+    def _summarise(result: dict) -> str:
+        if not result["total_trials"]:
+            return "No impressions recorded yet. Record events to analyze this test."
+        leader = result["leader"]
+        probability = result["variations"][leader]["probability_best"]
+        if result["winner"] is not None:
+            return (
+                f"Variation {leader + 1} is the winner with a {probability:.1%} probability "
+                f"of having the best {result['metric']} rate."
+            )
+        return (
+            f"No significant winner yet. Variation {leader + 1} leads with a {probability:.1%} "
+            f"probability of having the best {result['metric']} rate."
+        )
+
+
+# Singleton instance
+ab_statistics_engine = ABStatisticsEngine(int(os.environ.get("AB_STATS_MEMO_SIZE", 4096)))
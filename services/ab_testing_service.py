@@ -2,57 +2,120 @@
 Simplified A/B testing service.
 
 This service allows creation of simple A/B tests by generating
-variations from a base piece of content.  In a full implementation,
-variations could alter hooks, call‑to‑action styles, emoji usage,
-and hashtags.  For demonstration purposes the service below creates
-two basic variations.
+variations from a base piece of content.  Variations alter the hook,
+call to action, emoji usage and hashtags; `services.variation_engine`
+ranks the combinations by SEO score and fit with the user's brand
+voice and the best ones become the test's variations.  Hashtag options
+favour those `hashtag_index` finds related to the content.
+
+Tests are persisted with the `ABTest`/`ABTestVariation` models so they
+are shared by all workers.  Reads go through a bounded in-process
+`TTLCache` of serialised tests, so the hot listing and analysis paths
+only reach the database on a miss.  Every write, including each flush
+of event counters, bumps the shared `ABTestStoreVersion` counter.
+Listing pages are cached under that version, which also serves as
+their ETag, and a cached test is only used while the version it was
+read at is current.
 """
 
-from dataclasses import dataclass, asdict
-from typing import Dict, List, Optional
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
 import uuid
 
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+
+from models.ab_testing import ABTest, ABTestStoreVersion, ABTestVariation
+from models.social_media import db
+from services.brand_voice_service import brand_voice_service
+from services.cache import TTLCache
+from services.hashtag_index import hashtag_index
+from services.pagination import keyset_page
+from services.variation_engine import MAX_HASHTAG_POOL, MAX_VARIATIONS, variation_engine
 
-@dataclass
-class ABTestVariation:
-    id: str
-    content: str
-    hashtags: List[str]
-    image_prompt: str | None = None
+# Page size limits for test listings
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+# Dialects whose INSERT supports ON CONFLICT DO NOTHING
+_CONFLICT_INSERTS = {"sqlite": sqlite_insert, "postgresql": postgresql_insert}
 
 
-@dataclass
-class ABTest:
-    id: str
-    name: str
-    content_type: str
-    platform: str
-    variations: List[ABTestVariation]
-    status: str
+def _int_option(
+    options: Dict,
+    name: str,
+    default: Optional[int],
+    minimum: Optional[int] = None,
+    maximum: Optional[int] = None,
+) -> Optional[int]:
+    """Read an integer option, raising ValueError if it is not a whole number in range."""
+    value = options.get(name, default)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f"{name} must be an integer")
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer") from None
+    if (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+        raise ValueError(f"{name} must be between {minimum} and {maximum}")
+    return value
 
 
 class ABTestingService:
     """Service for creating and managing simple A/B tests."""
 
     def __init__(self) -> None:
-        self.active_tests: Dict[str, ABTest] = {}
+        self.cache = TTLCache(
+            maxsize=int(os.environ.get("AB_TEST_CACHE_SIZE", 1024)),
+            ttl=float(os.environ.get("AB_TEST_CACHE_TTL", 60)),
+        )
+        # Listing pages are keyed by store version, so the TTL only
+        # bounds how long superseded pages occupy memory.
+        self.list_ttl = float(os.environ.get("AB_TEST_LIST_CACHE_TTL", 30))
 
     def create_test_variations(self, test_name: str, base_content: Dict) -> Dict:
-        """Generate a new A/B test with two basic variations."""
+        """Generate a new A/B test with the best scoring variations of the base content.
+
+        ``base_content`` may set ``variations`` (how many, default 2),
+        ``seed`` (for reproducible generation; derived from the content by
+        default), ``candidates`` (a smaller ranking budget, trading quality
+        for latency) and ``brand_profile`` or ``user_id`` to score the
+        candidates against a brand voice.  The returned test carries a
+        ``generation`` summary with each variation's scores.  Raises
+        ValueError for invalid options.
+        """
+        if not isinstance(base_content, dict):
+            raise ValueError("base_content must be an object")
+        count = _int_option(base_content, "variations", 2, 1, MAX_VARIATIONS)
+        seed = _int_option(base_content, "seed", None)
+        candidates = _int_option(base_content, "candidates", None, 1, variation_engine.max_candidates)
         test_id = str(uuid.uuid4())
         content_text = base_content.get("content", "")
         content_type = base_content.get("content_type", "general")
         platform = base_content.get("platform", "instagram")
+        brand_profile = base_content.get("brand_profile")
+        if brand_profile is None and base_content.get("user_id"):
+            brand_profile = brand_voice_service.get_profile_data(base_content["user_id"], content_type)
+        suggested = hashtag_index.suggest(content_text, base_content.get("user_id"), k=MAX_HASHTAG_POOL)
 
-        # Create two simple variations by appending suffixes
-        variations: List[ABTestVariation] = []
-        for i in range(2):
-            variation_id = str(uuid.uuid4())
-            variation_content = f"{content_text}\n\nVariation {i + 1}: try a different opening."
-            hashtags = ["#Test", f"#{content_type}"]
-            variations.append(
-                ABTestVariation(id=variation_id, content=variation_content, hashtags=hashtags)
+        generation = variation_engine.generate(
+            content_text,
+            content_type,
+            count=count,
+            brand_profile=brand_profile,
+            seed=seed,
+            suggested_hashtags=suggested,
+            max_candidates=candidates,
+        )
+        variations: List[ABTestVariation] = [
+            ABTestVariation(
+                id=str(uuid.uuid4()), position=i, content=candidate["content"], hashtags=candidate["hashtags"]
             )
+            for i, candidate in enumerate(generation["variations"])
+        ]
 
         ab_test = ABTest(
             id=test_id,
@@ -62,9 +125,124 @@ class ABTestingService:
             variations=variations,
             status="draft",
         )
-        self.active_tests[test_id] = ab_test
+        try:
+            db.session.add(ab_test)
+            self.bump_version()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Database error in ABTestingService: {e}")
+            raise e
         # Return serialisable structure
-        return asdict(ab_test)
+        test_dict = ab_test.to_dict()
+        return {
+            **test_dict,
+            "generation": {
+                "seed": generation["seed"],
+                "candidate_space": generation["candidate_space"],
+                "candidates_ranked": generation["candidates_ranked"],
+                "scores": [
+                    {key: candidate[key] for key in ("score", "seo_score", "brand_score", "options")}
+                    for candidate in generation["variations"]
+                ],
+            },
+        }
+
+    def get_test(self, test_id: str) -> Optional[Dict]:
+        """Return a test as a dictionary, or None if it does not exist.
+
+        A cached copy is only served while the store version it was read
+        at is current, so counters flushed by another worker are never
+        analysed stale.
+        """
+        version = self.current_version()
+        cached = self.cache.get(test_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        ab_test = db.session.get(ABTest, test_id)
+        if ab_test is None:
+            return None
+        test_dict = ab_test.to_dict()
+        self.cache.set(test_id, (version, test_dict))
+        return test_dict
+
+    def list_tests(
+        self,
+        status: Optional[str] = None,
+        platform: Optional[str] = None,
+        content_type: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        descending: bool = False,
+        summary: bool = False,
+        version: Optional[int] = None,
+    ) -> Tuple[List[Dict], Optional[str], int]:
+        """Return one page of tests, oldest first unless ``descending``.
+
+        Returns the serialised tests, the cursor of the next page (or
+        None) and the store version the page was read at (``version``,
+        if the caller already read it).  ``summary`` leaves out variation
+        bodies.  Raises ValueError for a bad cursor.
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        if version is None:
+            version = self.current_version()
+        key = ("list", version, status, platform, content_type, limit, cursor, descending, summary)
+        page = self.cache.get(key)
+        if page is None:
+            query = ABTest.query
+            if status:
+                query = query.filter(ABTest.status == status)
+            if platform:
+                query = query.filter(ABTest.platform == platform)
+            if content_type:
+                query = query.filter(ABTest.content_type == content_type)
+            rows, next_cursor = keyset_page(
+                query, ABTest.created_at, ABTest.id, limit, cursor, descending
+            )
+            tests = [row.to_summary_dict() if summary else row.to_dict() for row in rows]
+            page = (tests, next_cursor)
+            self.cache.set(key, page, ttl=self.list_ttl)
+        return page[0], page[1], version
+
+    def current_version(self) -> int:
+        """Return the shared store version (0 before the first write)."""
+        version = db.session.execute(
+            select(ABTestStoreVersion.version).where(ABTestStoreVersion.id == 1)
+        ).scalar()
+        return version or 0
+
+    def bump_version(self) -> None:
+        """Increment the store version inside the caller's transaction.
+
+        The row is seeded when the table is created; for databases created
+        before that, it is inserted race-free on first use.
+        """
+        bump = (
+            update(ABTestStoreVersion)
+            .where(ABTestStoreVersion.id == 1)
+            .values(version=ABTestStoreVersion.version + 1)
+        )
+        if db.session.execute(bump).rowcount == 0:
+            conflict_insert = _CONFLICT_INSERTS.get(db.session.get_bind().dialect.name)
+            if conflict_insert is not None:
+                db.session.execute(
+                    conflict_insert(ABTestStoreVersion)
+                    .values(id=1, version=0)
+                    .on_conflict_do_nothing(index_elements=["id"])
+                )
+            else:
+                try:
+                    with db.session.begin_nested():
+                        db.session.add(ABTestStoreVersion(id=1, version=0))
+                except IntegrityError:
+                    pass
+            db.session.execute(bump)
+
+    def invalidate(self, test_ids: Iterable[str]) -> None:
+        """Drop cached copies of the given tests."""
+        for test_id in test_ids:
+            self.cache.invalidate(test_id)
 
 
 # Singleton instance
@@ -8,11 +8,52 @@ generation.  In a production system, you would replace this with a more
 sophisticated NLP model.
 """
 
+import hashlib
+import io
 import re
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from functools import lru_cache
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from services.seo_service import seo_service
+from services.text_features import TextFeatures, extract_features
+
+# Maximum characters read per line from an uploaded stream
+STREAM_READ_SIZE = 64 * 1024
+# Posts longer than this are analyzed in pieces to keep memory bounded
+MAX_POST_CHARS = 1024 * 1024
+# Share of posts that must use a feature for a profile to "use" it
+PROFILE_USAGE_SHARE = 0.25
+# Hashtags for profiles without any of their own and an empty hashtag index
+DEFAULT_HASHTAGS = ("#RealEstate", "#Windsor")
+
+_WHITESPACE = re.compile(r"\s")
+
+
+class ContentTemplate:
+    """A generation template for one tone, writing style and content type.
+
+    Everything that depends only on those three is rendered once, when
+    the template is compiled; `render` just joins the prompt and hashtags
+    around the precomputed text.
+    """
+
+    __slots__ = ("tone", "style", "content_type", "_middle")
+
+    def __init__(self, tone: str, style: str, content_type: str) -> None:
+        self.tone = tone
+        self.style = style
+        self.content_type = content_type
+        self._middle = f"\n\n(Tone: {tone}, Style: {style})\n"
+
+    def render(self, prompt: str, hashtags: str) -> str:
+        return prompt + self._middle + hashtags
+
+
+@lru_cache(maxsize=1024)
+def compile_template(tone: str, style: str, content_type: str) -> ContentTemplate:
+    """Return the (cached) template for a tone, writing style and content type."""
+    return ContentTemplate(tone, style, content_type)
 
 
 class BrandVoiceAnalysisService:
@@ -26,23 +67,18 @@ class BrandVoiceAnalysisService:
         `brand_voice_strength` metric based on length and punctuation usage.
         """
         if not content or not content.strip():
-            return {
-                "dominant_tone": "neutral",
-                "writing_style": "unknown",
-                "personality_traits": [],
-                "communication_preferences": {},
-                "vocabulary_level": "unknown",
-                "brand_voice_strength": 0,
-                "seo": {"score": 0, "recommendations": ["Content is empty."]},
-            }
+            return self._empty_analysis()
 
         text = content.strip()
-        words = re.findall(r"\b\w+\b", text)
-        sentences = re.split(r"[.!?]", text)
+        # One scan of the text feeds both the voice metrics and SEO scoring
+        features = extract_features(text, seo_service.matcher, keep_tokens=False)
+        return self.analyze_features(features)
 
+    def analyze_features(self, features: TextFeatures) -> dict:
+        """Build the brand voice analysis from pre-extracted text features."""
         # Determine dominant tone: more exclamation marks -> energetic, more periods -> professional
-        exclamations = text.count("!")
-        questions = text.count("?")
+        exclamations = features.exclamations
+        questions = features.questions
         if exclamations > questions:
             dominant_tone = "energetic"
         elif questions > exclamations:
@@ -51,7 +87,7 @@ class BrandVoiceAnalysisService:
             dominant_tone = "professional"
 
         # Vocabulary level based on average word length
-        avg_word_len = sum(len(w) for w in words) / len(words) if words else 0
+        avg_word_len = features.avg_word_length
         if avg_word_len > 6:
             vocab_level = "advanced"
         elif avg_word_len > 4:
@@ -60,46 +96,189 @@ class BrandVoiceAnalysisService:
             vocab_level = "basic"
 
         # Brand voice strength: normalize on number of sentences and punctuation
-        strength = min(100, int(len(words) * 0.5 + exclamations * 5 + questions * 3))
+        strength = min(100, int(features.word_count * 0.5 + exclamations * 5 + questions * 3))
 
-        # SEO analysis using the existing service
-        seo_result = seo_service.analyze_content(text)
+        # SEO analysis using the existing service, without rescanning the text
+        seo_result = seo_service.analyze_features(features)
 
         return {
             "dominant_tone": dominant_tone,
-            "writing_style": "balanced" if len(sentences) <= 3 else "detailed",
+            # Counted as the original fragment split, so existing analyses keep their style
+            "writing_style": "balanced" if features.sentence_fragments <= 3 else "detailed",
             "personality_traits": [dominant_tone],
             "communication_preferences": {
                 "uses_questions": questions > 0,
                 "uses_exclamations": exclamations > 0,
-                "uses_emojis": bool(re.search(r"[\U0001F600-\U0001F64F]", text)),
-                "prefers_short_sentences": len(text.split()) < 50,
-                "prefers_long_sentences": len(text.split()) > 100,
+                "uses_emojis": features.emoji_count > 0,
+                "prefers_short_sentences": features.whitespace_word_count < 50,
+                "prefers_long_sentences": features.whitespace_word_count > 100,
             },
             "vocabulary_level": vocab_level,
             "brand_voice_strength": strength,
             "seo": seo_result,
         }
 
+    def analyze_stream(
+        self,
+        stream: BinaryIO,
+        content_type: str = "mixed",
+        encoding: str = "utf-8",
+        progress: Optional[Callable[[float], None]] = None,
+        total_bytes: Optional[int] = None,
+    ) -> dict:
+        """Analyze a (possibly very large) binary text stream incrementally.
+
+        The stream is read line by line and split into posts on blank
+        lines.  Each post is scanned once and folded into running
+        aggregates, so memory use is bounded by the largest post rather
+        than the size of the upload.  The result has the same shape as
+        `analyze_from_text_input` plus a ``post_stats`` summary.
+
+        If ``progress`` and ``total_bytes`` are given, ``progress`` is called
+        with the fraction of the stream consumed after each post.
+        """
+        analyzer = StreamingVoiceAnalyzer(self)
+        for post in iter_stream_posts(stream, encoding):
+            analyzer.add_post(post)
+            if progress is not None and total_bytes:
+                progress(stream.tell() / total_bytes)
+        return analyzer.result()
+
+    def _empty_analysis(self) -> dict:
+        return {
+            "dominant_tone": "neutral",
+            "writing_style": "unknown",
+            "personality_traits": [],
+            "communication_preferences": {},
+            "vocabulary_level": "unknown",
+            "brand_voice_strength": 0,
+            "seo": {"score": 0, "recommendations": ["Content is empty."]},
+        }
+
     def generate_content_with_voice(
         self,
         prompt: str,
         brand_profile: Dict[str, any],
         content_type: str = "social_post",
+        hashtags: Optional[List[str]] = None,
     ) -> str:
         """Generate content using a simple brand profile and a prompt.
 
         This function appends information from the brand profile to the prompt
         to demonstrate how the voice might influence generation.  It is
         intentionally naive and should be replaced with proper language models
-        in a production environment.
+        in a production environment.  ``hashtags`` (e.g. suggested for the
+        prompt by `services.hashtag_index`) replace the profile's own.
+        """
+        template, profile_hashtags = self._template_for(brand_profile, content_type)
+        return template.render(prompt, " ".join(hashtags) if hashtags else profile_hashtags)
+
+    def generate_batch(
+        self,
+        prompts: List[Tuple[str, str]],
+        profiles: List[Dict[str, any]],
+        dedupe: bool = True,
+    ) -> Iterable[dict]:
+        """Lazily generate every ``(prompt, content_type)`` for every profile.
+
+        Items are yielded profile by profile, in prompt order, with their
+        ``index``, ``profile_index`` and ``prompt_index``.  Each profile's
+        templates and hashtags are resolved once.  With ``dedupe``, an item
+        whose text was already generated carries ``duplicate_of`` (the
+        index of the first occurrence) instead of the text; only digests
+        of earlier outputs are kept, so memory does not grow with their
+        length.
+        """
+        seen: Dict[bytes, int] = {}
+        index = 0
+        for profile_index, profile in enumerate(profiles):
+            resolved = {}
+            for prompt_index, (prompt, content_type) in enumerate(prompts):
+                if content_type not in resolved:
+                    resolved[content_type] = self._template_for(profile, content_type)
+                template, hashtags = resolved[content_type]
+                generated = template.render(prompt, hashtags)
+                item = {"index": index, "profile_index": profile_index, "prompt_index": prompt_index}
+                digest = hashlib.blake2b(generated.encode(), digest_size=16).digest() if dedupe else None
+                if digest is not None and digest in seen:
+                    item["duplicate_of"] = seen[digest]
+                else:
+                    if digest is not None:
+                        seen[digest] = index
+                    item["generated_content"] = generated
+                yield item
+                index += 1
+
+    @staticmethod
+    def _template_for(brand_profile: Dict[str, any], content_type: str) -> Tuple[ContentTemplate, str]:
+        template = compile_template(
+            str(brand_profile.get("dominant_tone", "professional")),
+            str(brand_profile.get("writing_style", "balanced")),
+            content_type,
+        )
+        return template, " ".join(brand_profile.get("hashtags", DEFAULT_HASHTAGS))
+
+    def build_profile(self, profile) -> dict:
+        """Turn a stored `BrandVoiceProfile` into a brand profile dictionary.
+
+        The result has the same keys as `get_sample_profile`, so it can be
+        passed straight to `generate_content_with_voice`, plus vocabulary
+        statistics and the profile's most used hashtags.
         """
-        tone = brand_profile.get("dominant_tone", "professional")
-        style = brand_profile.get("writing_style", "balanced")
-        hashtags = brand_profile.get("hashtags", ["#RealEstate", "#Windsor"])
-        generated = f"{prompt}\n\n(Tone: {tone}, Style: {style})"
-        generated += "\n" + " ".join(hashtags)
-        return generated
+        posts = profile.post_count or 0
+        words = profile.word_count or 0
+        exclamations = profile.exclamation_count or 0
+        questions = profile.question_count or 0
+        if exclamations > questions:
+            dominant_tone = "energetic"
+        elif questions > exclamations:
+            dominant_tone = "inquisitive"
+        else:
+            dominant_tone = "professional"
+
+        avg_word_len = (profile.total_word_length or 0) / words if words else 0
+        if avg_word_len > 6:
+            vocab_level = "advanced"
+        elif avg_word_len > 4:
+            vocab_level = "intermediate"
+        else:
+            vocab_level = "basic"
+
+        # Per-post averages keep the thresholds comparable with single-text analysis
+        words_per_post = (profile.whitespace_word_count or 0) / posts if posts else 0
+        sentences_per_post = (profile.sentence_count or 0) / posts if posts else 0
+        strength = (
+            min(100, int((words * 0.5 + exclamations * 5 + questions * 3) / posts)) if posts else 0
+        )
+        hashtags = profile.top_hashtags()
+
+        return {
+            "dominant_tone": dominant_tone,
+            "writing_style": "balanced" if sentences_per_post <= 3 else "detailed",
+            "personality_traits": [dominant_tone],
+            "communication_preferences": {
+                "uses_questions": posts > 0 and profile.posts_with_questions / posts >= PROFILE_USAGE_SHARE,
+                "uses_exclamations": posts > 0 and profile.posts_with_exclamations / posts >= PROFILE_USAGE_SHARE,
+                "uses_emojis": posts > 0 and profile.posts_with_emojis / posts >= PROFILE_USAGE_SHARE,
+                "prefers_short_sentences": words_per_post < 50,
+                "prefers_long_sentences": words_per_post > 100,
+            },
+            "vocabulary_level": vocab_level,
+            "vocabulary": {
+                "avg_word_length": round(avg_word_len, 2),
+                "long_word_ratio": round((profile.long_word_count or 0) / words, 3) if words else 0,
+                "avg_words_per_post": round(words_per_post, 1),
+                "avg_sentences_per_post": round(sentences_per_post, 1),
+            },
+            "brand_voice_strength": strength,
+            "hashtags": hashtags[:5] or list(DEFAULT_HASHTAGS),
+            "top_hashtags": [
+                {"tag": tag, "count": profile.hashtag_counts[tag]} for tag in hashtags
+            ],
+            "post_type": profile.post_type,
+            "post_count": posts,
+            "last_updated": profile.updated_at.isoformat() if profile.updated_at else None,
+        }
 
     def get_sample_profile(self) -> dict:
         """Return a default brand profile for demonstration purposes."""
@@ -120,5 +299,173 @@ class BrandVoiceAnalysisService:
         }
 
 
+class RunningStats:
+    """Count, minimum, maximum and mean of a stream of numbers in O(1) memory."""
+
+    __slots__ = ("count", "total", "minimum", "maximum")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0
+        self.minimum = None
+        self.maximum = None
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+
+    def merge(self, other: "RunningStats") -> "RunningStats":
+        if other.count:
+            self.count += other.count
+            self.total += other.total
+            self.minimum = other.minimum if self.minimum is None else min(self.minimum, other.minimum)
+            self.maximum = other.maximum if self.maximum is None else max(self.maximum, other.maximum)
+        return self
+
+    def to_dict(self) -> dict:
+        return {
+            "min": self.minimum or 0,
+            "max": self.maximum or 0,
+            "mean": round(self.total / self.count, 2) if self.count else 0,
+        }
+
+
+def iter_stream_posts(stream: BinaryIO, encoding: str = "utf-8") -> Iterator[str]:
+    """Yield the posts of a binary text stream, split on blank lines.
+
+    Posts of ``MAX_POST_CHARS`` or more are yielded in pieces, split
+    between words.  The stream is left open.
+    """
+    text_stream = io.TextIOWrapper(stream, encoding=encoding, newline=None)
+    try:
+        post_lines: List[str] = []
+        post_chars = 0
+        # Whether the next read starts a line, rather than continuing
+        # one longer than STREAM_READ_SIZE
+        line_start = True
+        while True:
+            line = text_stream.readline(STREAM_READ_SIZE)
+            if not line:
+                break
+            starts_line, line_start = line_start, line.endswith("\n")
+            if starts_line and line_start and not line.strip():
+                # Blank line: the current post is complete
+                if post_lines:
+                    yield "".join(post_lines)
+                    post_lines, post_chars = [], 0
+                continue
+            post_lines.append(line)
+            post_chars += len(line)
+            if post_chars >= MAX_POST_CHARS:
+                # Split an overlong post between words, carrying the
+                # trailing partial token over to the next piece
+                piece, rest = _split_trailing_token("".join(post_lines))
+                yield piece
+                post_lines, post_chars = ([rest] if rest else []), len(rest)
+        if post_lines:
+            yield "".join(post_lines)
+    finally:
+        # Leave the underlying upload stream open for its owner
+        text_stream.detach()
+
+
+def _split_trailing_token(text: str) -> Tuple[str, str]:
+    """Split ``text`` before the token it ends in, if it does not end in whitespace.
+
+    Text that is a single token is returned whole, so that a post without
+    any whitespace is still analyzed in bounded pieces.
+    """
+    # Search the reversed text: a backwards scan stays linear however long the token
+    match = _WHITESPACE.search(text[::-1])
+    if match is None:
+        return text, ""
+    split = len(text) - match.start()
+    return text[:split], text[split:]
+
+
+class StreamingVoiceAnalyzer:
+    """Fold posts one at a time into aggregate brand voice statistics.
+
+    Only counts are retained between posts: the combined `TextFeatures`
+    of every post seen so far and a few `RunningStats` describing the
+    per-post distribution.
+    """
+
+    def __init__(self, service: BrandVoiceAnalysisService) -> None:
+        self.service = service
+        self.features = TextFeatures()
+        self.post_count = 0
+        self.words_per_post = RunningStats()
+        self.sentences_per_post = RunningStats()
+        self.seo_score = RunningStats()
+        self.posts_with_emojis = 0
+        self.posts_with_questions = 0
+        self.posts_with_exclamations = 0
+
+    def add_post(self, post: str) -> None:
+        post = post.strip()
+        if not post:
+            return
+        features = extract_features(post, seo_service.matcher, keep_tokens=False)
+        self.post_count += 1
+        self.words_per_post.add(features.whitespace_word_count)
+        self.sentences_per_post.add(features.sentence_count)
+        self.seo_score.add(seo_service.analyze_features(features)["score"])
+        self.posts_with_emojis += features.emoji_count > 0
+        self.posts_with_questions += features.questions > 0
+        self.posts_with_exclamations += features.exclamations > 0
+        self.features.merge(features)
+
+    def merge(self, other: "StreamingVoiceAnalyzer") -> "StreamingVoiceAnalyzer":
+        """Combine the aggregates of another analyzer into this one."""
+        self.features.merge(other.features)
+        self.post_count += other.post_count
+        self.words_per_post.merge(other.words_per_post)
+        self.sentences_per_post.merge(other.sentences_per_post)
+        self.seo_score.merge(other.seo_score)
+        self.posts_with_emojis += other.posts_with_emojis
+        self.posts_with_questions += other.posts_with_questions
+        self.posts_with_exclamations += other.posts_with_exclamations
+        return self
+
+    def post_stats(self) -> dict:
+        return {
+            "post_count": self.post_count,
+            "words_per_post": self.words_per_post.to_dict(),
+            "sentences_per_post": self.sentences_per_post.to_dict(),
+            "seo_score": self.seo_score.to_dict(),
+            "posts_with_emojis": self.posts_with_emojis,
+            "posts_with_questions": self.posts_with_questions,
+            "posts_with_exclamations": self.posts_with_exclamations,
+        }
+
+    def result(self) -> dict:
+        if not self.post_count:
+            analysis = self.service._empty_analysis()
+        else:
+            analysis = self.service.analyze_features(self.features)
+        analysis["post_stats"] = self.post_stats()
+        return analysis
+
+
+def analyze_posts_by_type(posts: Iterable[Tuple[str, str]]) -> Dict[str, StreamingVoiceAnalyzer]:
+    """Fold ``(post_type, content)`` pairs into one analyzer per post type.
+
+    Used as the task of corpus analysis worker processes, which is why it
+    is a module-level function in this dependency-light module.
+    """
+    analyzers: Dict[str, StreamingVoiceAnalyzer] = {}
+    for post_type, content in posts:
+        analyzer = analyzers.get(post_type)
+        if analyzer is None:
+            analyzer = analyzers[post_type] = StreamingVoiceAnalyzer(brand_voice_analysis_service)
+        analyzer.add_post(content)
+    return analyzers
+
+
 # Singleton instance
 brand_voice_analysis_service = BrandVoiceAnalysisService()
@@ -3,14 +3,70 @@ Service to manage training data for brand voice.
 
 This service creates new training examples in the database.  It does not
 perform analysis; see `brand_voice_analysis_service` for analysis.
+Large imports should go through `add_training_data_batch`, which validates
+each record and inserts valid rows in multi-row batches.
+
+Every insert also folds the new posts into the user's `BrandVoiceProfile`
+rows in the same transaction, so profiles stay current without ever
+reanalysing the stored corpus, and invalidates cached recommendations
+for the affected user and post type once the rows are committed.  The
+similarity and hashtag indexes are updated (or, for bulk loads, marked
+for catch-up) at the same point.
+Built profiles are shared between workers through `shared_cache` and
+dropped from it whenever new training data changes them.
+
+Profiles of training data stored before profiles existed (or after a
+manual change to the table) are rebuilt from the stored posts with
+``flask rebuild-profiles``, once per deploy; reads never rebuild them.
 """
 
-from models.social_media import TrainingData, db
+import time
+from collections import defaultdict
+from typing import Iterable, List, Optional, Tuple
+
+import click
+from sqlalchemy import delete, insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+
+from models.social_media import BrandVoiceProfile, TrainingData, db
+from services.brand_voice_analysis_service import brand_voice_analysis_service
+from services.hashtag_index import hashtag_index
+from services.learning_algorithm_service import learning_algorithm_service
+from services.pagination import keyset_page
+from services.shared_cache import shared_cache
+from services.similarity_index import similarity_index
+from services.text_features import TextFeatures, extract_features
+
+# Rows inserted per executemany round trip during batch ingestion
+INSERT_BATCH_SIZE = 1000
+# Cap on per-row errors echoed back to the client for one load
+MAX_REPORTED_ERRORS = 1000
+# Page size limits for training data listings
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+# Posts folded into profiles per round trip while rebuilding them
+REBUILD_CHUNK_SIZE = 1000
+# Dialects whose INSERT supports ON CONFLICT DO NOTHING
+_CONFLICT_INSERTS = {"sqlite": sqlite_insert, "postgresql": postgresql_insert}
+
+
+def _profile_cache_key(user_id: str, post_type: str) -> str:
+    return f"profile:{user_id}:{post_type}"
+
+
+class BatchRecordError(Exception):
+    """Placeholder for a record that could not be parsed from the input."""
 
 
 class BrandVoiceService:
     """Handles persistence of brand voice training data."""
 
+    def init_app(self, app) -> None:
+        """Register the ``rebuild-profiles`` command."""
+        app.cli.add_command(rebuild_profiles_command)
+
     def add_training_data(
         self, user_id: str, content: str, image_url: str | None, post_type: str
     ) -> TrainingData:
@@ -23,13 +79,272 @@ class BrandVoiceService:
                 post_type=post_type,
             )
             db.session.add(new_entry)
+            self._update_profiles([(user_id, post_type, content)])
             db.session.commit()
+            self._after_insert([(user_id, post_type, content)], new_entry)
             return new_entry
         except Exception as e:
             db.session.rollback()
             print(f"Database error in BrandVoiceService: {e}")
             raise e
 
+    def validate_training_record(self, record) -> Optional[str]:
+        """Return an error message if ``record`` is not a valid training row."""
+        if not isinstance(record, dict):
+            return "Record must be a JSON object"
+        missing = {"user_id", "content", "post_type"} - record.keys()
+        if missing:
+            return f"Missing fields: {', '.join(sorted(missing))}"
+        for name, max_len in (("user_id", 80), ("post_type", 50)):
+            value = record[name]
+            if not isinstance(value, str) or not value.strip():
+                return f"{name} must be a non-empty string"
+            if len(value) > max_len:
+                return f"{name} must be at most {max_len} characters"
+        if record["post_type"] == BrandVoiceProfile.ALL_POST_TYPES:
+            return f"post_type {BrandVoiceProfile.ALL_POST_TYPES!r} is reserved"
+        if not isinstance(record["content"], str) or not record["content"].strip():
+            return "content must be a non-empty string"
+        image_url = record.get("image_url")
+        if image_url is not None and (not isinstance(image_url, str) or len(image_url) > 2048):
+            return "image_url must be a string of at most 2048 characters"
+        return None
+
+    def add_training_data_batch(
+        self, records: Iterable, batch_size: int = INSERT_BATCH_SIZE
+    ) -> dict:
+        """Validate and insert many training records in large batches.
+
+        ``records`` may be any iterable (including a generator reading a
+        request stream); it is consumed one batch at a time.  Invalid
+        records are reported by their zero-based position and skipped
+        without aborting the rest of the load.
+        """
+        summary = {"received": 0, "inserted": 0, "failed": 0, "errors": []}
+        pending: list = []
+        for index, record in enumerate(records):
+            summary["received"] += 1
+            error = record if isinstance(record, BatchRecordError) else None
+            if error is None:
+                message = self.validate_training_record(record)
+                if message:
+                    error = BatchRecordError(message)
+            if error is not None:
+                self._record_batch_error(summary, index, str(error))
+                continue
+            pending.append(
+                (
+                    index,
+                    {
+                        "user_id": record["user_id"],
+                        "content": record["content"],
+                        "image_url": record.get("image_url"),
+                        "post_type": record["post_type"],
+                    },
+                )
+            )
+            if len(pending) >= batch_size:
+                self._insert_batch(pending, summary)
+                pending = []
+        if pending:
+            self._insert_batch(pending, summary)
+        summary["errors_truncated"] = summary["failed"] > len(summary["errors"])
+        return summary
+
+    def _insert_batch(self, pending: list, summary: dict) -> None:
+        """Insert one batch with executemany, isolating failing rows if it errors."""
+        try:
+            db.session.execute(insert(TrainingData), [row for _, row in pending])
+            posts = [(row["user_id"], row["post_type"], row["content"]) for _, row in pending]
+            self._update_profiles(posts)
+            db.session.commit()
+            self._after_insert(posts)
+            summary["inserted"] += len(pending)
+            return
+        except Exception as e:
+            db.session.rollback()
+            print(f"Batch insert failed, retrying rows individually: {e}")
+        # Fall back to row-by-row inserts so one bad row does not sink the batch
+        for index, row in pending:
+            try:
+                posts = [(row["user_id"], row["post_type"], row["content"])]
+                db.session.execute(insert(TrainingData), [row])
+                self._update_profiles(posts)
+                db.session.commit()
+                self._after_insert(posts)
+                summary["inserted"] += 1
+            except Exception as e:
+                db.session.rollback()
+                self._record_batch_error(summary, index, f"Database error: {e}")
+
+    def list_training_data(
+        self,
+        user_id: str,
+        post_type: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[TrainingData], Optional[str]]:
+        """Return one page of a user's training data, newest first.
+
+        Pages are addressed with an opaque keyset ``cursor`` (the
+        ``created_at``/``id`` of the last row of the previous page) rather
+        than an offset, so every page costs the same index range scan.
+        Returns the rows and the cursor for the next page, if any.
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        query = TrainingData.query.filter(TrainingData.user_id == user_id)
+        if post_type:
+            query = query.filter(TrainingData.post_type == post_type)
+        return keyset_page(
+            query, TrainingData.created_at, TrainingData.id, limit, cursor, descending=True
+        )
+
+    def get_profile(self, user_id: str, post_type: Optional[str] = None) -> Optional[BrandVoiceProfile]:
+        """Return the stored profile for a user and post type (all types by default)."""
+        return BrandVoiceProfile.query.filter_by(
+            user_id=user_id, post_type=post_type or BrandVoiceProfile.ALL_POST_TYPES
+        ).first()
+
+    def get_profile_data(self, user_id: str, post_type: Optional[str] = None) -> Optional[dict]:
+        """Return the built brand profile dictionary for a user and post type, if any."""
+        key = _profile_cache_key(user_id, post_type or BrandVoiceProfile.ALL_POST_TYPES)
+        profile = shared_cache.get(key)
+        if profile is None:
+            # Refused by the cache if new training data invalidates the
+            # key while the profile is being read
+            read_at = time.time()
+            stored = self.get_profile(user_id, post_type)
+            if stored is None:
+                return None
+            profile = brand_voice_analysis_service.build_profile(stored)
+            shared_cache.set(key, profile, as_of=read_at)
+        return profile
+
+    def rebuild_profiles(self, user_id: Optional[str] = None) -> int:
+        """Recompute the profiles of ``user_id`` (or every user) from their stored posts.
+
+        The old rows are replaced in one transaction.  Returns the number
+        of posts folded in.
+        """
+        conditions = [] if user_id is None else [TrainingData.user_id == user_id]
+        profile_conditions = [] if user_id is None else [BrandVoiceProfile.user_id == user_id]
+        posted = 0
+        try:
+            db.session.execute(delete(BrandVoiceProfile).where(*profile_conditions))
+            rows = (
+                db.session.query(TrainingData.user_id, TrainingData.post_type, TrainingData.content)
+                .filter(*conditions)
+                .order_by(TrainingData.id)
+                .yield_per(REBUILD_CHUNK_SIZE)
+            )
+            chunk: List[Tuple[str, str, str]] = []
+            for row in rows:
+                chunk.append(tuple(row))
+                if len(chunk) >= REBUILD_CHUNK_SIZE:
+                    self._update_profiles(chunk)
+                    posted += len(chunk)
+                    chunk = []
+            if chunk:
+                self._update_profiles(chunk)
+                posted += len(chunk)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Database error rebuilding brand voice profiles: {e}")
+            raise e
+        if user_id is None:
+            shared_cache.delete_prefix("profile:")
+        else:
+            shared_cache.delete_prefix(_profile_cache_key(user_id, ""))
+        return posted
+
+    def _profile_row(self, user_id: str, post_type: str) -> BrandVoiceProfile:
+        """Return the locked profile row for ``(user_id, post_type)``, creating it if missing.
+
+        Creation is an ``INSERT ... ON CONFLICT DO NOTHING`` (or a savepoint
+        on other databases), so concurrent first inserts for the same user
+        and post type both end up updating the one row.
+        """
+        query = BrandVoiceProfile.query.filter_by(user_id=user_id, post_type=post_type).with_for_update()
+        profile = query.first()
+        if profile is not None:
+            return profile
+        values = {"user_id": user_id, "post_type": post_type, "hashtag_counts": {}}
+        conflict_insert = _CONFLICT_INSERTS.get(db.session.get_bind().dialect.name)
+        if conflict_insert is not None:
+            db.session.execute(
+                conflict_insert(BrandVoiceProfile)
+                .values(**values)
+                .on_conflict_do_nothing(index_elements=["user_id", "post_type"])
+            )
+        else:
+            try:
+                with db.session.begin_nested():
+                    db.session.add(BrandVoiceProfile(**values))
+            except IntegrityError:
+                pass
+        return query.populate_existing().one()
+
+    def _update_profiles(self, posts: List[Tuple[str, str, str]]) -> None:
+        """Fold ``(user_id, post_type, content)`` posts into their profile rows.
+
+        Posts are aggregated in memory first, so a batch touches each
+        affected profile row once regardless of how many posts it holds.
+        The caller owns the transaction.
+        """
+        aggregates: dict = defaultdict(
+            lambda: [0, TextFeatures(), {"questions": 0, "exclamations": 0, "emojis": 0}]
+        )
+        for user_id, post_type, content in posts:
+            features = extract_features(content, keep_tokens=False)
+            for key in ((user_id, post_type), (user_id, BrandVoiceProfile.ALL_POST_TYPES)):
+                aggregate = aggregates[key]
+                aggregate[0] += 1
+                aggregate[1].merge(features)
+                aggregate[2]["questions"] += features.questions > 0
+                aggregate[2]["exclamations"] += features.exclamations > 0
+                aggregate[2]["emojis"] += features.emoji_count > 0
+
+        for (user_id, post_type), (count, features, posts_with) in aggregates.items():
+            self._profile_row(user_id, post_type).apply(count, features, posts_with)
+
+    def _after_insert(
+        self, posts: List[Tuple[str, str, str]], entry: Optional[TrainingData] = None
+    ) -> None:
+        """Refresh caches and indexes derived from the training data just committed.
+
+        A single ``entry`` is added to the similarity and hashtag indexes
+        directly; bulk loads (whose row ids are not known) mark them stale
+        instead.
+        """
+        changed = {(user_id, post_type) for user_id, post_type, _ in posts}
+        for user_id, post_type in changed:
+            learning_algorithm_service.invalidate_recommendations(user_id, post_type)
+            if entry is None:
+                similarity_index.mark_stale(user_id)
+                hashtag_index.mark_stale(user_id)
+        shared_cache.delete(
+            {_profile_cache_key(user_id, post_type) for user_id, post_type in changed}
+            | {_profile_cache_key(user_id, BrandVoiceProfile.ALL_POST_TYPES) for user_id, _ in changed}
+        )
+        if entry is not None:
+            similarity_index.add(entry.user_id, entry.id, entry.post_type, entry.content)
+            hashtag_index.add(entry.user_id, entry.id, entry.content)
+
+    @staticmethod
+    def _record_batch_error(summary: dict, index: int, message: str) -> None:
+        summary["failed"] += 1
+        if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+            summary["errors"].append({"row": index, "error": message})
+
+
+@click.command("rebuild-profiles")
+@click.option("--user-id", default=None, help="Rebuild only this user's profiles.")
+def rebuild_profiles_command(user_id):
+    """Rebuild brand voice profiles from the stored training data."""
+    posts = brand_voice_service.rebuild_profiles(user_id)
+    click.echo(f"Rebuilt brand voice profiles from {posts} posts")
+
 
 # Singleton instance
 brand_voice_service = BrandVoiceService()
@@ -0,0 +1,245 @@
+"""
+In-process caching helpers.
+
+`TTLCache` is a small thread-safe LRU cache whose entries also expire
+after a fixed time-to-live.  Services use it to avoid repeating database
+queries and analysis for hot, rarely changing results, and expose its
+hit/miss counters for monitoring.  `StaleWhileRevalidate` caches one
+slow-to-build value, serving it stale while a single background refresh
+runs.
+
+Both caches are per process: each gunicorn worker holds its own copy,
+and the TTL bounds how long a worker can serve an entry that another
+worker has invalidated.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+_MISSING = object()
+
+
+class TTLCache:
+    """A bounded least-recently-used cache with per-entry expiry."""
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 300.0,
+        timer: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._timer = timer
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        # Keys being computed by `get_or_set`: [computations, invalidations]
+        self._in_flight: Dict[Hashable, List[int]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for ``key`` or ``default`` if absent/expired."""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > self._timer():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store ``value`` under ``key``, evicting the least recently used entry if full."""
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def get_or_set(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return the cached value for ``key``, computing and storing it on a miss.
+
+        A value whose computation overlapped an invalidation of ``key``
+        (or a clear) is returned but not stored, as it may predate it.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        with self._lock:
+            flight = self._in_flight.setdefault(key, [0, 0])
+            flight[0] += 1
+            generation = flight[1]
+        try:
+            value = compute()
+        finally:
+            with self._lock:
+                flight[0] -= 1
+                if not flight[0]:
+                    del self._in_flight[key]
+                if value is not _MISSING and flight[1] == generation:
+                    self._store(key, value, None)
+        return value
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Remove ``key`` from the cache; return whether it was present."""
+        with self._lock:
+            self._bump(key)
+            if self._data.pop(key, _MISSING) is _MISSING:
+                return False
+            self.invalidations += 1
+            return True
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Remove every key for which ``predicate(key)`` is true; return the count."""
+        with self._lock:
+            for key in self._in_flight:
+                if predicate(key):
+                    self._bump(key)
+            doomed = [key for key in self._data if predicate(key)]
+            for key in doomed:
+                del self._data[key]
+            self.invalidations += len(doomed)
+            return len(doomed)
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in self._in_flight:
+                self._bump(key)
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and current size for monitoring."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+    def _store(self, key: Hashable, value: Any, ttl: Optional[float]) -> None:
+        """Store an entry and evict beyond ``maxsize``.  Holds ``_lock``."""
+        self._data[key] = (self._timer() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def _bump(self, key: Hashable) -> None:
+        """Mark computations of ``key`` in progress as stale.  Holds ``_lock``."""
+        flight = self._in_flight.get(key)
+        if flight is not None:
+            flight[1] += 1
+
+
+class StaleWhileRevalidate:
+    """Cache a single expensive value with stale-while-revalidate semantics.
+
+    While the value is younger than ``ttl`` it is returned as is.  Once it
+    is older, but younger than ``ttl + max_stale``, the stale value is
+    still returned immediately and one background thread refreshes it.
+    With no usable value, the first caller loads it synchronously and
+    concurrent callers wait for that load instead of starting their own
+    (single flight), so a cold or expired cache never causes a stampede.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], Any],
+        ttl: float = 300.0,
+        max_stale: float = 3600.0,
+        timer: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.loader = loader
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._timer = timer
+        self._value: Any = _MISSING
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._loading: Optional[threading.Event] = None
+        self.hits = 0
+        self.stale_hits = 0
+        self.loads = 0
+        self.errors = 0
+
+    def get(self) -> Any:
+        """Return the cached value, refreshing it as described above."""
+        now = self._timer()
+        with self._lock:
+            age = now - self._loaded_at
+            if self._value is not _MISSING and age < self.ttl:
+                self.hits += 1
+                return self._value
+            if self._value is not _MISSING and age < self.ttl + self.max_stale:
+                self.stale_hits += 1
+                if self._loading is None:
+                    self._loading = threading.Event()
+                    threading.Thread(
+                        target=self._refresh, name="swr-refresh", daemon=True
+                    ).start()
+                return self._value
+            loading = self._loading
+            leader = loading is None
+            if leader:
+                loading = self._loading = threading.Event()
+        if leader:
+            self._refresh()
+        else:
+            loading.wait()
+        with self._lock:
+            if self._value is _MISSING:
+                raise RuntimeError("Cached value could not be loaded")
+            return self._value
+
+    def invalidate(self, drop: bool = False) -> None:
+        """Mark the value as expired so the next call refreshes it.
+
+        With ``drop`` the value is discarded instead of served stale, so
+        the next call waits for the refresh.
+        """
+        with self._lock:
+            self._loaded_at = self._timer() - self.ttl
+            if drop:
+                self._value = _MISSING
+
+    def _refresh(self) -> None:
+        try:
+            value = self.loader()
+        except Exception as e:
+            print(f"Cache refresh failed: {e}")
+            with self._lock:
+                self.errors += 1
+        else:
+            with self._lock:
+                self._value = value
+                self._loaded_at = self._timer()
+                self.loads += 1
+        finally:
+            with self._lock:
+                loading, self._loading = self._loading, None
+            if loading is not None:
+                loading.set()
+
+    def stats(self) -> dict:
+        return {
+            "ttl_seconds": self.ttl,
+            "max_stale_seconds": self.max_stale,
+            "age_seconds": round(self._timer() - self._loaded_at, 3) if self._value is not _MISSING else None,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "loads": self.loads,
+            "errors": self.errors,
+        }
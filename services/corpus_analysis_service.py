@@ -0,0 +1,245 @@
+"""
+Brand voice analysis of a user's whole stored corpus.
+
+`CorpusAnalysisService.analyze_user_corpus` streams a user's
+`TrainingData` rows from the database in chunks of
+``CORPUS_ANALYSIS_CHUNK_SIZE`` and folds every post into a
+`StreamingVoiceAnalyzer` per post type.  Corpora of at least
+``CORPUS_ANALYSIS_MIN_PARALLEL`` posts are analysed by a pool of
+``CORPUS_ANALYSIS_PROCESSES`` worker processes.  Every gunicorn worker
+has its own pool, so the default splits the cores between the
+``WEB_CONCURRENCY`` workers (the variable gunicorn reads its worker
+count from) rather than giving each worker one process per core:
+each chunk is analysed in a worker and only its aggregates travel back,
+to be merged in the parent.  Merging is order independent, so chunks are
+merged as they complete, and at most two chunks per process are in
+flight, which keeps memory bounded however large the corpus.  The text
+analysis is pure Python and CPU bound, so processes rather than threads
+are what lets it scale with cores.
+
+The result holds the profile of the whole corpus and one per post type,
+each in the shape returned by `analyze_stream`.
+
+Background jobs use the same pool so that their analysis does not
+compete for the GIL with the worker's request threads: `analyze_stream`
+analyses an uploaded file (the job thread only reads and splits it), and
+`run` computes any other picklable call in a worker process.
+"""
+
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+from sqlalchemy import func, select
+
+from models.social_media import TrainingData, db
+from services.brand_voice_analysis_service import (
+    MAX_POST_CHARS,
+    StreamingVoiceAnalyzer,
+    analyze_posts_by_type,
+    brand_voice_analysis_service,
+    iter_stream_posts,
+)
+
+Chunk = List[Tuple[str, str]]
+T = TypeVar("T")
+
+
+class CorpusAnalysisService:
+    """Analyze every stored post of a user, in parallel for large corpora."""
+
+    def __init__(
+        self,
+        processes: Optional[int] = None,
+        chunk_size: int = 1000,
+        min_parallel: int = 5000,
+        web_workers: int = 1,
+    ) -> None:
+        self.processes = max(1, processes or (os.cpu_count() or 1) // max(1, web_workers))
+        self.chunk_size = chunk_size
+        self.min_parallel = min_parallel
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_pid: Optional[int] = None
+
+    def analyze_user_corpus(
+        self,
+        user_id: str,
+        post_type: Optional[str] = None,
+        progress: Optional[Callable[[float], None]] = None,
+    ) -> dict:
+        """Return the brand voice profile of ``user_id``'s stored posts, overall and per post type."""
+        started = time.perf_counter()
+        conditions = self._conditions(user_id, post_type)
+        total = self.count_posts(user_id, post_type)
+        use_pool = self.processes > 1 and total >= self.min_parallel
+
+        def report(done: int) -> None:
+            if progress is not None and total:
+                progress(done / total)
+
+        merged = self._analyze_chunks(self._chunks(conditions), use_pool, report)
+        overall = StreamingVoiceAnalyzer(brand_voice_analysis_service)
+        by_post_type = {}
+        for key in sorted(merged):
+            overall.merge(merged[key])
+            by_post_type[key] = merged[key].result()
+        return {
+            "user_id": user_id,
+            "post_type": post_type,
+            "post_count": overall.post_count,
+            "profile": overall.result(),
+            "by_post_type": by_post_type,
+            "processes": self.processes if use_pool else 1,
+            "elapsed_seconds": round(time.perf_counter() - started, 3),
+        }
+
+    def count_posts(self, user_id: str, post_type: Optional[str] = None) -> int:
+        """Return how many stored posts `analyze_user_corpus` would analyse."""
+        return db.session.scalar(select(func.count(TrainingData.id)).where(*self._conditions(user_id, post_type)))
+
+    def analyze_stream(
+        self,
+        stream: BinaryIO,
+        content_type: str = "mixed",
+        progress: Optional[Callable[[float], None]] = None,
+        total_bytes: Optional[int] = None,
+    ) -> dict:
+        """Analyze an uploaded text stream like `BrandVoiceAnalysisService.analyze_stream`.
+
+        This thread only reads the stream and splits it into posts; the
+        posts are analysed in the worker processes, when there is more
+        than one.
+        """
+
+        def report(done: int) -> None:
+            if progress is not None and total_bytes:
+                progress(stream.tell() / total_bytes)
+
+        chunks = _stream_chunks(stream, content_type, self.chunk_size)
+        merged = self._analyze_chunks(chunks, self.processes > 1, report)
+        analyzer = merged.get(content_type) or StreamingVoiceAnalyzer(brand_voice_analysis_service)
+        return analyzer.result()
+
+    def run(self, func: Callable[..., T], *args) -> T:
+        """Return ``func(*args)``, computed in a worker process when there is more than one.
+
+        ``func`` and its arguments must be picklable.
+        """
+        if self.processes <= 1:
+            return func(*args)
+        try:
+            return self._get_pool().submit(func, *args).result()
+        except BrokenProcessPool:
+            self.shutdown()
+            raise
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None and self._pool_pid == os.getpid():
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool, self._pool_pid = None, None
+
+    @staticmethod
+    def _conditions(user_id: str, post_type: Optional[str]) -> list:
+        conditions = [TrainingData.user_id == user_id]
+        if post_type:
+            conditions.append(TrainingData.post_type == post_type)
+        return conditions
+
+    def _analyze_chunks(
+        self, chunks: Iterable[Chunk], use_pool: bool, report: Callable[[int], None]
+    ) -> Dict[str, StreamingVoiceAnalyzer]:
+        """Fold ``chunks`` into one analyzer per post type; ``report`` gets the posts done so far."""
+        merged: Dict[str, StreamingVoiceAnalyzer] = {}
+        done = 0
+
+        def fold(partial: Dict[str, StreamingVoiceAnalyzer]) -> None:
+            nonlocal done
+            for key, analyzer in partial.items():
+                if key in merged:
+                    merged[key].merge(analyzer)
+                else:
+                    merged[key] = analyzer
+                done += analyzer.post_count
+            report(done)
+
+        if use_pool:
+            pool = self._get_pool()
+            pending = set()
+            try:
+                for chunk in chunks:
+                    if len(pending) >= self.processes * 2:
+                        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            fold(future.result())
+                    pending.add(pool.submit(analyze_posts_by_type, chunk))
+                for future in wait(pending).done:
+                    fold(future.result())
+            except BrokenProcessPool:
+                # A worker died; start a fresh pool on the next call
+                self.shutdown()
+                raise
+        else:
+            for chunk in chunks:
+                fold(analyze_posts_by_type(chunk))
+        return merged
+
+    def _chunks(self, conditions) -> Iterator[Chunk]:
+        rows = (
+            db.session.query(TrainingData.post_type, TrainingData.content)
+            .filter(*conditions)
+            .order_by(TrainingData.id)
+            .yield_per(self.chunk_size)
+        )
+        chunk: Chunk = []
+        for post_type, content in rows:
+            chunk.append((post_type, content))
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # Created on first use, and again after a fork, so preloading the
+        # app in a gunicorn master never starts processes.  Workers are
+        # started with forkserver/spawn, since forking a process that runs
+        # request and job threads is unsafe.
+        with self._lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+                self._pool = ProcessPoolExecutor(max_workers=self.processes, mp_context=context)
+                self._pool_pid = os.getpid()
+            return self._pool
+
+
+def _stream_chunks(stream: BinaryIO, content_type: str, chunk_size: int) -> Iterator[Chunk]:
+    # Chunks also end at MAX_POST_CHARS characters, so that a few huge
+    # posts do not make a huge chunk
+    chunk: Chunk = []
+    chars = 0
+    for post in iter_stream_posts(stream):
+        chunk.append((content_type, post))
+        chars += len(post)
+        if len(chunk) >= chunk_size or chars >= MAX_POST_CHARS:
+            yield chunk
+            chunk, chars = [], 0
+    if chunk:
+        yield chunk
+
+
+# Singleton instance
+corpus_analysis_service = CorpusAnalysisService(
+    processes=int(os.environ.get("CORPUS_ANALYSIS_PROCESSES", 0)) or None,
+    chunk_size=int(os.environ.get("CORPUS_ANALYSIS_CHUNK_SIZE", 1000)),
+    min_parallel=int(os.environ.get("CORPUS_ANALYSIS_MIN_PARALLEL", 5000)),
+    web_workers=int(os.environ.get("WEB_CONCURRENCY", 1)),
+)
+atexit.register(corpus_analysis_service.shutdown)
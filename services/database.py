@@ -0,0 +1,162 @@
+"""
+Engine configuration from the environment.
+
+`DatabaseConfig.init_app` fills ``SQLALCHEMY_ENGINE_OPTIONS`` (and the
+``replica`` bind) before ``db.init_app``:
+
+``DB_POOL_SIZE``, ``DB_MAX_OVERFLOW``, ``DB_POOL_TIMEOUT``
+    Connection pool sizing; SQLAlchemy's defaults when unset.
+``DB_POOL_PRE_PING`` (default ``1``), ``DB_POOL_RECYCLE`` (default 1800s)
+    Test connections on checkout and replace them after this many
+    seconds, so connections dropped by the server or a proxy are never
+    handed to a request.  Not applied to SQLite.
+``DB_STATEMENT_TIMEOUT_MS``
+    PostgreSQL ``statement_timeout`` set on every connection.
+``DATABASE_REPLICA_URL``
+    A read replica.  Views decorated with `read_replica` (recommendations,
+    similar posts and the list endpoints) read from it; everything else,
+    and every write, uses the primary.
+
+SQLite connections get a pragma profile instead: WAL journaling, so
+readers no longer block the writer, ``synchronous=NORMAL`` (durable
+across application crashes, and WAL keeps the file consistent across
+power loss), a page cache of ``SQLITE_CACHE_SIZE_KB`` and a busy
+timeout.  ``SQLITE_JOURNAL_MODE``, ``SQLITE_SYNCHRONOUS``,
+``SQLITE_CACHE_SIZE_KB`` and ``SQLITE_BUSY_TIMEOUT_MS`` override the
+profile; an empty value leaves SQLite's default.
+"""
+
+import os
+from functools import wraps
+from typing import Optional
+
+from flask import g
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+
+from models import REPLICA_BIND
+
+_FALSE_VALUES = ("0", "false", "no", "off")
+
+
+def _optional_int(name: str, default: Optional[int] = None) -> Optional[int]:
+    """Read an integer setting; unset gives ``default``, an empty value gives ``None``."""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return int(value) if value.strip() else None
+
+
+def read_replica(view):
+    """Route the reads of ``view`` to the read replica, if one is configured."""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g._db_read_replica = True
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+class DatabaseConfig:
+    """Engine options, SQLite pragmas and replica bind for the Flask-SQLAlchemy engines."""
+
+    def __init__(
+        self,
+        pool_size: Optional[int] = None,
+        max_overflow: Optional[int] = None,
+        pool_timeout: Optional[int] = None,
+        pool_pre_ping: bool = True,
+        pool_recycle: int = 1800,
+        statement_timeout_ms: Optional[int] = None,
+        replica_url: str = "",
+        sqlite_journal_mode: str = "WAL",
+        sqlite_synchronous: str = "NORMAL",
+        sqlite_cache_size_kb: Optional[int] = 65536,
+        sqlite_busy_timeout_ms: Optional[int] = 5000,
+    ) -> None:
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_timeout = pool_timeout
+        self.pool_pre_ping = pool_pre_ping
+        self.pool_recycle = pool_recycle
+        self.statement_timeout_ms = statement_timeout_ms
+        self.replica_url = replica_url
+        self.sqlite_journal_mode = sqlite_journal_mode
+        self.sqlite_synchronous = sqlite_synchronous
+        self.sqlite_cache_size_kb = sqlite_cache_size_kb
+        self.sqlite_busy_timeout_ms = sqlite_busy_timeout_ms
+
+    def init_app(self, app) -> None:
+        """Configure the engines; call after ``SQLALCHEMY_DATABASE_URI`` is set and before ``db.init_app``."""
+        app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", {})
+        for key, value in self.engine_options(app.config["SQLALCHEMY_DATABASE_URI"]).items():
+            app.config["SQLALCHEMY_ENGINE_OPTIONS"].setdefault(key, value)
+        if self.replica_url:
+            replica_url = self.replica_url
+            if replica_url.startswith("postgres://"):
+                replica_url = replica_url.replace("postgres://", "postgresql://", 1)
+            binds = app.config.setdefault("SQLALCHEMY_BINDS", {})
+            binds.setdefault(REPLICA_BIND, {"url": replica_url, **self.engine_options(replica_url)})
+        if not event.contains(Engine, "connect", self._on_connect):
+            event.listen(Engine, "connect", self._on_connect)
+
+    def engine_options(self, url: str) -> dict:
+        """Return the ``create_engine`` keyword arguments for ``url``."""
+        backend = make_url(url).get_backend_name()
+        options = {}
+        for key, value in (
+            ("pool_size", self.pool_size),
+            ("max_overflow", self.max_overflow),
+            ("pool_timeout", self.pool_timeout),
+        ):
+            if value is not None:
+                options[key] = value
+        if backend == "sqlite":
+            return options
+        options["pool_pre_ping"] = self.pool_pre_ping
+        if self.pool_recycle > 0:
+            options["pool_recycle"] = self.pool_recycle
+        if self.statement_timeout_ms and backend == "postgresql":
+            options["connect_args"] = {"options": f"-c statement_timeout={self.statement_timeout_ms}"}
+        return options
+
+    def _on_connect(self, dbapi_connection, connection_record) -> None:
+        if type(dbapi_connection).__module__.split(".")[0] not in ("sqlite3", "pysqlite2"):
+            return
+        pragmas = []
+        if self.sqlite_busy_timeout_ms is not None:
+            pragmas.append(f"PRAGMA busy_timeout = {int(self.sqlite_busy_timeout_ms)}")
+        if self.sqlite_journal_mode:
+            pragmas.append(f"PRAGMA journal_mode = {self.sqlite_journal_mode}")
+        if self.sqlite_synchronous:
+            pragmas.append(f"PRAGMA synchronous = {self.sqlite_synchronous}")
+        if self.sqlite_cache_size_kb is not None:
+            # Negative sizes are in KiB rather than pages
+            pragmas.append(f"PRAGMA cache_size = -{abs(int(self.sqlite_cache_size_kb))}")
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                try:
+                    cursor.execute(pragma)
+                except Exception as e:
+                    # In-memory databases reject WAL, for instance
+                    print(f"SQLite pragma '{pragma}' failed: {e}")
+        finally:
+            cursor.close()
+
+
+# Singleton instance
+database_config = DatabaseConfig(
+    pool_size=_optional_int("DB_POOL_SIZE"),
+    max_overflow=_optional_int("DB_MAX_OVERFLOW"),
+    pool_timeout=_optional_int("DB_POOL_TIMEOUT"),
+    pool_pre_ping=os.environ.get("DB_POOL_PRE_PING", "1").lower() not in _FALSE_VALUES,
+    pool_recycle=int(os.environ.get("DB_POOL_RECYCLE", 1800)),
+    statement_timeout_ms=_optional_int("DB_STATEMENT_TIMEOUT_MS"),
+    replica_url=os.environ.get("DATABASE_REPLICA_URL", ""),
+    sqlite_journal_mode=os.environ.get("SQLITE_JOURNAL_MODE", "WAL"),
+    sqlite_synchronous=os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+    sqlite_cache_size_kb=_optional_int("SQLITE_CACHE_SIZE_KB", 65536),
+    sqlite_busy_timeout_ms=_optional_int("SQLITE_BUSY_TIMEOUT_MS", 5000),
+)
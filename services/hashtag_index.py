@@ -0,0 +1,266 @@
+"""
+Hashtag frequency and co-occurrence index over training data.
+
+`HashtagIndex` mines the hashtags of every `TrainingData` post into two
+in-memory tables per scope (one per active user plus a global one): how
+many posts use each hashtag, and how many posts use each pair of
+hashtags together.  Hashtags are matched case-insensitively and reported
+in the form they were first seen.
+
+`HashtagIndex.related` ranks hashtags for a draft: those most often used
+alongside the draft's own hashtags (the share of posts with a draft
+hashtag that also carry the candidate), weighing the user's own posts
+above the global corpus, topped up with the most used hashtags when the
+draft has few or none.  Each hashtag keeps a cached list of its
+``MAX_NEIGHBORS`` strongest partners, so a lookup touches a bounded
+number of entries however large the corpus and runs well under a
+millisecond.
+
+Like `services.similarity_index`, scopes are built lazily from the
+database, updated in place as posts are stored and caught up with rows
+written by other workers (or bulk loads) at most every
+``HASHTAG_INDEX_REFRESH`` seconds or as soon as the scope is marked
+stale.  A catch-up re-reads ids down to ``HASHTAG_INDEX_CATCHUP_WINDOW``
+(default 1000) below the highest one counted, so rows committed out of
+id order are not missed, and skips the posts of that window it has
+already counted.  Users are evicted least recently used beyond
+``HASHTAG_INDEX_MAX_USERS``.
+"""
+
+import heapq
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+from models.social_media import TrainingData, db
+from services.text_features import extract_hashtags
+
+# Rows fetched per round trip while building a scope
+BUILD_CHUNK_SIZE = 1000
+# Hashtags of one post counted towards co-occurrence; bounds the pairs a
+# hashtag-stuffed post can add
+MAX_TAGS_PER_POST = 30
+# Strongest partners kept ready per hashtag for lookups
+MAX_NEIGHBORS = 50
+# Most used hashtags kept ready per scope for topping up results
+MAX_POPULAR = 50
+# Draft hashtags considered by one lookup
+MAX_QUERY_TAGS = 10
+# Weight of the global corpus relative to the user's own posts
+GLOBAL_WEIGHT = 0.25
+
+
+def hashtag_keys(text: str) -> Dict[str, str]:
+    """Return the distinct hashtags of ``text`` as ``{lowercase: as written}``."""
+    keys: Dict[str, str] = {}
+    for tag in extract_hashtags(text):
+        keys.setdefault(tag.lower(), tag)
+    return keys
+
+
+class HashtagStats:
+    """Hashtag counts and co-occurrence counts over one scope's posts."""
+
+    def __init__(self, catchup_window: int) -> None:
+        self.catchup_window = catchup_window
+        self.counts: Counter = Counter()
+        self.pairs: Dict[str, Counter] = {}
+        self.display: Dict[str, str] = {}
+        self.max_id = 0
+        # Ids counted within ``catchup_window`` of ``max_id`` (or above
+        # it), which a catch-up re-reads and must not count twice
+        self.recent_ids: Set[int] = set()
+        self.built = False
+        self.stale = False
+        self.refreshed_at = 0.0
+        self.lock = threading.Lock()
+        self._neighbors: Dict[str, List[Tuple[str, int]]] = {}
+        self._popular: Optional[List[str]] = None
+
+    def add(self, doc_id: int, content: str) -> None:
+        """Count a newly stored post, once."""
+        if doc_id <= self.max_id - self.catchup_window or doc_id in self.recent_ids:
+            return
+        self.recent_ids.add(doc_id)
+        self.count(content)
+
+    def count(self, content: str) -> None:
+        keys = hashtag_keys(content)
+        if not keys:
+            return
+        for key, tag in keys.items():
+            self.display.setdefault(key, tag)
+        self.counts.update(keys.keys())
+        self._popular = None
+        tags = list(keys)[:MAX_TAGS_PER_POST]
+        for key in tags:
+            partners = self.pairs.setdefault(key, Counter())
+            partners.update(other for other in tags if other != key)
+            self._neighbors.pop(key, None)
+
+    def caught_up(self, max_id: int) -> None:
+        self.max_id = max(self.max_id, max_id)
+        floor = self.max_id - self.catchup_window
+        self.recent_ids = {doc_id for doc_id in self.recent_ids if doc_id > floor}
+
+    def neighbors(self, key: str) -> List[Tuple[str, int]]:
+        """Return the strongest partners of ``key`` and their shared post counts."""
+        neighbors = self._neighbors.get(key)
+        if neighbors is None:
+            partners = self.pairs.get(key) or {}
+            neighbors = heapq.nlargest(MAX_NEIGHBORS, partners.items(), key=lambda item: item[1])
+            self._neighbors[key] = neighbors
+        return neighbors
+
+    def popular(self) -> List[str]:
+        if self._popular is None:
+            self._popular = heapq.nlargest(MAX_POPULAR, self.counts, key=self.counts.get)
+        return self._popular
+
+    def score(self, keys: List[str], weight: float, scores: Dict[str, float]) -> None:
+        """Add ``weight`` × P(candidate | draft hashtag) for each draft hashtag to ``scores``."""
+        for key in keys:
+            used = self.counts.get(key)
+            if not used:
+                continue
+            for other, together in self.neighbors(key):
+                scores[other] = scores.get(other, 0.0) + weight * together / used
+
+
+class HashtagIndex:
+    """Lazily built, incrementally updated hashtag statistics per user and overall."""
+
+    def __init__(self, max_users: int = 256, refresh_seconds: float = 30.0, catchup_window: int = 1000) -> None:
+        self.max_users = max_users
+        self.refresh_seconds = refresh_seconds
+        self.catchup_window = catchup_window
+        self._users: "OrderedDict[str, HashtagStats]" = OrderedDict()
+        self._global = HashtagStats(catchup_window)
+        self._lock = threading.Lock()
+
+    def related(self, text: str, user_id: Optional[str] = None, k: int = 5) -> List[dict]:
+        """Return up to ``k`` hashtags to use with the draft ``text``, best first.
+
+        Each result has the ``tag``, its relatedness ``score`` (0 for
+        hashtags added only for their popularity) and how many posts use
+        it (``count``, the user's own when ``user_id`` is given).
+        Hashtags already in the draft are never suggested.
+        """
+        draft = hashtag_keys(text or "")
+        keys = list(draft)[:MAX_QUERY_TAGS]
+        scopes = [(self._global, GLOBAL_WEIGHT if user_id else 1.0)]
+        if user_id:
+            scopes.insert(0, (self._get_stats(user_id), 1.0))
+        self._refresh(self._global)
+
+        scores: Dict[str, float] = {}
+        for stats, weight in scopes:
+            with stats.lock:
+                stats.score(keys, weight, scores)
+        own = scopes[0][0]
+        with own.lock:
+            ranked = heapq.nlargest(
+                k,
+                ((score, own.counts.get(key, 0), key) for key, score in scores.items() if key not in draft),
+            )
+            results = [
+                {"tag": self._display(key), "score": round(score, 4), "count": count}
+                for score, count, key in ranked
+            ]
+        if len(results) < k:
+            chosen = set(draft) | {key for _, _, key in ranked}
+            for stats, _ in scopes:
+                with stats.lock:
+                    for key in stats.popular():
+                        if len(results) >= k:
+                            break
+                        if key not in chosen:
+                            chosen.add(key)
+                            results.append(
+                                {"tag": self._display(key), "score": 0.0, "count": own.counts.get(key, 0)}
+                            )
+        return results
+
+    def suggest(self, text: str, user_id: Optional[str] = None, k: int = 5) -> List[str]:
+        """Return just the hashtags of `related`."""
+        return [result["tag"] for result in self.related(text, user_id, k)]
+
+    def add(self, user_id: str, doc_id: int, content: str) -> None:
+        """Count a newly stored post in every loaded scope it belongs to."""
+        with self._lock:
+            stats = self._users.get(user_id)
+        for scope in (stats, self._global):
+            if scope is not None and scope.built:
+                with scope.lock:
+                    scope.add(doc_id, content)
+
+    def mark_stale(self, user_id: str) -> None:
+        """Make the next lookup for ``user_id`` (and the global scope) catch up first."""
+        with self._lock:
+            stats = self._users.get(user_id)
+        if stats is not None:
+            stats.stale = True
+        self._global.stale = True
+
+    def invalidate(self, user_id: str) -> None:
+        """Forget a user's statistics; they are rebuilt on the next lookup."""
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def _display(self, key: str) -> str:
+        return self._global.display.get(key) or key
+
+    def _get_stats(self, user_id: str) -> HashtagStats:
+        with self._lock:
+            stats = self._users.get(user_id)
+            if stats is not None:
+                self._users.move_to_end(user_id)
+            else:
+                stats = HashtagStats(self.catchup_window)
+                self._users[user_id] = stats
+                while len(self._users) > self.max_users:
+                    self._users.popitem(last=False)
+        self._refresh(stats, user_id)
+        return stats
+
+    def _refresh(self, stats: HashtagStats, user_id: Optional[str] = None) -> None:
+        # Load outside the global lock; concurrent lookups of this scope
+        # wait on its lock until it is populated
+        with stats.lock:
+            now = time.monotonic()
+            if not stats.built or stats.stale or now - stats.refreshed_at > self.refresh_seconds:
+                self._load(stats, user_id)
+                stats.built, stats.stale, stats.refreshed_at = True, False, now
+
+    def _load(self, stats: HashtagStats, user_id: Optional[str]) -> None:
+        """Count the scope's posts not counted yet, re-reading ``catchup_window`` ids back."""
+        conditions = [TrainingData.id > stats.max_id - stats.catchup_window]
+        if user_id is not None:
+            conditions.append(TrainingData.user_id == user_id)
+        # Bound the scan so rows committed while it runs are left for the
+        # next catch-up rather than skipped
+        max_id = db.session.query(db.func.max(TrainingData.id)).filter(*conditions).scalar()
+        if max_id is None:
+            return
+        rows = (
+            db.session.query(TrainingData.id, TrainingData.content)
+            .filter(*conditions, TrainingData.id <= max_id, TrainingData.content.contains("#"))
+            .yield_per(BUILD_CHUNK_SIZE)
+        )
+        floor = max_id - stats.catchup_window
+        for doc_id, content in rows:
+            if doc_id not in stats.recent_ids:
+                stats.count(content)
+                if doc_id > floor:
+                    stats.recent_ids.add(doc_id)
+        stats.caught_up(max_id)
+
+
+# Singleton instance
+hashtag_index = HashtagIndex(
+    int(os.environ.get("HASHTAG_INDEX_MAX_USERS", 256)),
+    float(os.environ.get("HASHTAG_INDEX_REFRESH", 30)),
+    int(os.environ.get("HASHTAG_INDEX_CATCHUP_WINDOW", 1000)),
+)
@@ -0,0 +1,178 @@
+"""
+Response encoding for every blueprint: fast JSON and compression.
+
+`FastJSONProvider` is a drop-in Flask JSON provider backed by ``orjson``
+that keeps the default provider's output rules (sorted keys, dates as
+HTTP dates, dataclasses as objects).  Pretty-printed output, used in
+debug mode, still goes through the standard library, as does parsing
+input orjson rejects (``NaN`` and ``Infinity``).  ``orjson`` and
+``brotli`` are listed in ``requirements.txt`` but remain optional: the
+module falls back to the standard library and gzip without them.
+
+`ResponseOptimizer.init_app` installs it (``JSON_PROVIDER``: ``auto``,
+the default, uses orjson when installed; ``default`` keeps Flask's) and
+compresses JSON and text responses of at least ``COMPRESS_MIN_SIZE``
+bytes (negative to disable) with brotli or gzip, whichever the client
+prefers and is available.  Compressed responses get a weak ETag, since
+their bytes differ from the identity encoding, and ``Vary:
+Accept-Encoding``.  Streamed responses are passed through untouched.
+
+Endpoints that echo request fields back (such as the brand profile used
+for generation) honour ``echo=false`` in the query string or JSON body;
+``RESPONSE_ECHO_FIELDS=0`` makes that the default.
+"""
+
+import gzip
+import os
+from typing import Optional
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+try:  # orjson is optional; the standard library is used without it
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+try:  # brotli is optional; gzip is always available
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = frozenset(
+    {
+        "application/json",
+        "application/x-ndjson",
+        "application/javascript",
+        "image/svg+xml",
+        "text/css",
+        "text/csv",
+        "text/html",
+        "text/javascript",
+        "text/plain",
+    }
+)
+_FALSE_VALUES = ("0", "false", "no", "off")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that serialises with orjson when it is installed."""
+
+    def dumps(self, obj, **kwargs) -> str:
+        if kwargs or orjson is None:
+            return super().dumps(obj, **kwargs)
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs or orjson is None:
+            return super().loads(s, **kwargs)
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            # orjson rejects NaN and Infinity, which the standard library
+            # accepts; it also raises for malformed input, as it should
+            return super().loads(s)
+
+
+class ResponseOptimizer:
+    """Install the JSON provider and negotiate response compression."""
+
+    def __init__(
+        self,
+        json_provider: str = "auto",
+        min_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        echo_fields: bool = True,
+    ) -> None:
+        self.json_provider = json_provider
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.echo_fields = echo_fields
+        self.compressed_responses = 0
+        self.bytes_before = 0
+        self.bytes_after = 0
+
+    def init_app(self, app) -> None:
+        if self.json_provider != "default":
+            if orjson is not None:
+                app.json = FastJSONProvider(app)
+            elif self.json_provider == "orjson":
+                print("JSON_PROVIDER=orjson but orjson is not installed; using the default provider")
+        if self.min_size >= 0:
+            app.after_request(self.compress)
+
+    def echo_requested(self, data: Optional[dict] = None) -> bool:
+        """Return whether the current request wants its input fields echoed back."""
+        value = request.args.get("echo")
+        if value is None and isinstance(data, dict):
+            value = data.get("echo")
+        if value is None:
+            return self.echo_fields
+        return str(value).lower() not in _FALSE_VALUES
+
+    def choose_encoding(self) -> Optional[str]:
+        """Return ``"br"``, ``"gzip"`` or ``None`` for the current request."""
+        accepted = request.accept_encodings
+        gzip_quality = accepted["gzip"]
+        if brotli is not None and accepted["br"] and accepted["br"] >= gzip_quality:
+            return "br"
+        return "gzip" if gzip_quality else None
+
+    def compress(self, response):
+        """``after_request`` hook compressing large, compressible responses."""
+        if (
+            response.direct_passthrough
+            or response.is_streamed
+            or response.status_code < 200
+            or response.status_code in (204, 206, 304)
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        ):
+            return response
+        response.vary.add("Accept-Encoding")
+        body = response.get_data()
+        if len(body) < self.min_size:
+            return response
+        encoding = self.choose_encoding()
+        if encoding is None:
+            return response
+        if encoding == "br":
+            compressed = brotli.compress(body, quality=self.brotli_quality)
+        else:
+            compressed = gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+        if len(compressed) >= len(body):
+            return response
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        self.compressed_responses += 1
+        self.bytes_before += len(body)
+        self.bytes_after += len(compressed)
+        return response
+
+    def stats(self) -> dict:
+        return {
+            "json_provider": "orjson" if orjson is not None and self.json_provider != "default" else "default",
+            "brotli_available": brotli is not None,
+            "min_size": self.min_size,
+            "compressed_responses": self.compressed_responses,
+            "bytes_before": self.bytes_before,
+            "bytes_after": self.bytes_after,
+        }
+
+
+# Singleton instance
+response_optimizer = ResponseOptimizer(
+    json_provider=os.environ.get("JSON_PROVIDER", "auto").lower(),
+    min_size=int(os.environ.get("COMPRESS_MIN_SIZE", 1024)),
+    gzip_level=int(os.environ.get("COMPRESS_GZIP_LEVEL", 6)),
+    brotli_quality=int(os.environ.get("COMPRESS_BROTLI_QUALITY", 4)),
+    echo_fields=os.environ.get("RESPONSE_ECHO_FIELDS", "1").lower() not in _FALSE_VALUES,
+)
@@ -0,0 +1,301 @@
+"""
+Background jobs for heavy analysis requests.
+
+`JobService.submit` records a `Job` row and hands the work to a bounded
+thread pool, so the request returns a job id at once instead of holding
+a sync gunicorn worker for the whole analysis.  Clients poll
+``/api/jobs/<id>`` for the status, progress and result, which are kept
+in the database and therefore visible from every worker.
+
+Two limits protect the workers:
+
+* backpressure: each worker accepts at most ``JOB_WORKERS`` running plus
+  ``JOB_QUEUE_SIZE`` waiting jobs; further submissions are rejected with
+  `JobQueueFull` (HTTP 503 and ``Retry-After``) rather than queued
+  without bound;
+* fairness: a user may have at most ``JOB_MAX_PER_USER`` queued or
+  running jobs across all workers; further submissions are rejected with
+  `JobLimitExceeded` (HTTP 429).
+
+Active jobs that have not been updated for ``JOB_STALE_AFTER`` seconds
+belonged to a worker that died; they no longer count against the user's
+limit and are reported as failed when polled.  Finished jobs are purged
+``JOB_RESULT_TTL`` seconds after they finish.
+
+Heavy endpoints opt in per request with ``async=true`` (query string,
+form field or JSON body); see `async_requested`.  The pool threads only
+orchestrate: CPU-bound jobs hand their analysis to the worker processes
+of `services.corpus_analysis_service`, since threads would hold the GIL
+the worker's request threads need.
+"""
+
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from flask import request
+from sqlalchemy import delete, func, select, update
+
+from models.job import ACTIVE_JOB_STATUSES, JOB_FAILED, JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, Job
+from models.social_media import db
+
+# Minimum seconds between progress writes for one job
+PROGRESS_INTERVAL = 0.5
+# Minimum seconds between purges of expired jobs
+PURGE_INTERVAL = 60.0
+_TRUE_VALUES = ("1", "true", "yes", "on")
+
+
+class JobRejected(Exception):
+    """A job was not accepted; ``retry_after`` suggests when to try again."""
+
+    status_code = 503
+
+    def __init__(self, message: str, retry_after: int) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class JobQueueFull(JobRejected):
+    """This worker's job queue is full."""
+
+
+class JobLimitExceeded(JobRejected):
+    """The user already has the maximum number of active jobs."""
+
+    status_code = 429
+
+
+class JobContext:
+    """Handed to a job function to report progress."""
+
+    def __init__(self, service: "JobService", job_id: str) -> None:
+        self.service = service
+        self.job_id = job_id
+        self._last_write = 0.0
+
+    def progress(self, fraction: float) -> None:
+        """Record ``fraction`` (0 to 1) of the work as done; writes are throttled."""
+        now = time.monotonic()
+        if now - self._last_write < PROGRESS_INTERVAL:
+            return
+        self._last_write = now
+        self.service._update(self.job_id, progress=max(0.0, min(float(fraction), 1.0)))
+
+
+class JobService:
+    """Run heavy work in a bounded pool and track it in the ``jobs`` table."""
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        queue_size: int = 16,
+        max_per_user: int = 2,
+        stale_after: float = 3600.0,
+        result_ttl: float = 86400.0,
+    ) -> None:
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        self.max_per_user = max_per_user
+        self.stale_after = stale_after
+        self.result_ttl = result_ttl
+        self.app = None
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_pid: Optional[int] = None
+        self._in_flight = 0
+        self._last_purge = 0.0
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def init_app(self, app) -> None:
+        self.app = app
+
+    def async_requested(self, data: Optional[dict] = None) -> bool:
+        """Return whether the current request asked to run as a background job."""
+        value = request.args.get("async")
+        if value is None:
+            value = request.form.get("async")
+        if value is None and isinstance(data, dict):
+            value = data.get("async")
+        return str(value).lower() in _TRUE_VALUES
+
+    def submit(
+        self,
+        kind: str,
+        user_id: str,
+        func: Callable[..., dict],
+        *args,
+        cleanup: Optional[Callable[[], None]] = None,
+        **kwargs,
+    ) -> dict:
+        """Queue ``func(context, *args, **kwargs)`` and return the new job.
+
+        ``func`` runs in an app context and returns the JSON result;
+        ``cleanup`` runs after it, whatever the outcome, and also when the
+        job is rejected.  Raises `JobRejected` when a limit is reached.
+        """
+        executor = self._get_executor()
+        with self._lock:
+            full = self._in_flight >= self.max_workers + self.queue_size
+            if not full:
+                self._in_flight += 1
+        if full:
+            with self._lock:
+                self.rejected += 1
+            if cleanup is not None:
+                cleanup()
+            raise JobQueueFull("Too many jobs are queued; try again later", retry_after=5)
+        try:
+            job = self._create(kind, user_id)
+            executor.submit(self._run, job.id, func, args, kwargs, cleanup)
+        except BaseException as e:
+            with self._lock:
+                self._in_flight -= 1
+                if isinstance(e, JobRejected):
+                    self.rejected += 1
+            if cleanup is not None:
+                cleanup()
+            raise
+        with self._lock:
+            self.submitted += 1
+        self._purge_expired()
+        return job.to_dict()
+
+    def get(self, job_id: str) -> Optional[dict]:
+        job = db.session.get(Job, job_id)
+        if job is None:
+            return None
+        if job.status in ACTIVE_JOB_STATUSES and job.updated_at < self._stale_cutoff():
+            job.status = JOB_FAILED
+            job.error = "The worker running this job stopped before it finished"
+            job.finished_at = job.updated_at = datetime.utcnow()
+            db.session.commit()
+        return job.to_dict()
+
+    def stats(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "queue_size": self.queue_size,
+            "max_per_user": self.max_per_user,
+            "in_flight": self._in_flight,
+            "submitted": self.submitted,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+    def _create(self, kind: str, user_id: str) -> Job:
+        active = self._active_count(user_id)
+        if active >= self.max_per_user:
+            raise self._limit_exceeded(user_id, active)
+        job = Job(id=str(uuid.uuid4()), user_id=user_id, kind=kind, status=JOB_QUEUED)
+        db.session.add(job)
+        db.session.commit()
+        # Concurrent submissions (from any worker) can all pass the check
+        # above; counting again once the job is stored sees every one of
+        # them, and a job that put the user over the limit is withdrawn.
+        # Racing submissions may both be withdrawn, never both kept.
+        active = self._active_count(user_id)
+        if active > self.max_per_user:
+            db.session.execute(delete(Job).where(Job.id == job.id))
+            db.session.commit()
+            raise self._limit_exceeded(user_id, active - 1)
+        return job
+
+    def _active_count(self, user_id: str) -> int:
+        return db.session.scalar(
+            select(func.count(Job.id)).where(
+                Job.user_id == user_id,
+                Job.status.in_(ACTIVE_JOB_STATUSES),
+                Job.updated_at >= self._stale_cutoff(),
+            )
+        )
+
+    def _limit_exceeded(self, user_id: str, active: int) -> JobLimitExceeded:
+        return JobLimitExceeded(
+            f"User {user_id} already has {active} active job(s); the limit is {self.max_per_user}",
+            retry_after=10,
+        )
+
+    def _run(self, job_id: str, func, args, kwargs, cleanup) -> None:
+        try:
+            with self.app.app_context():
+                now = datetime.utcnow()
+                self._update(job_id, status=JOB_RUNNING, started_at=now)
+                try:
+                    result = func(JobContext(self, job_id), *args, **kwargs)
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Job {job_id} failed: {e}")
+                    self._update(job_id, status=JOB_FAILED, error=str(e), finished_at=datetime.utcnow())
+                    with self._lock:
+                        self.failed += 1
+                else:
+                    self._update(
+                        job_id, status=JOB_SUCCEEDED, progress=1.0, result=result, finished_at=datetime.utcnow()
+                    )
+                    with self._lock:
+                        self.succeeded += 1
+        except Exception as e:
+            print(f"Failed to record the outcome of job {job_id}: {e}")
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            if cleanup is not None:
+                try:
+                    cleanup()
+                except Exception as e:
+                    print(f"Cleanup for job {job_id} failed: {e}")
+
+    def _update(self, job_id: str, **values) -> None:
+        values["updated_at"] = datetime.utcnow()
+        db.session.execute(update(Job).where(Job.id == job_id).values(**values))
+        db.session.commit()
+
+    def _stale_cutoff(self) -> datetime:
+        return datetime.utcnow() - timedelta(seconds=self.stale_after)
+
+    def _purge_expired(self) -> None:
+        now = time.monotonic()
+        if now - self._last_purge < PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        try:
+            db.session.execute(
+                delete(Job).where(
+                    Job.finished_at.is_not(None),
+                    Job.finished_at < datetime.utcnow() - timedelta(seconds=self.result_ttl),
+                )
+            )
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Failed to purge expired jobs: {e}")
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Created lazily, and again after a fork, so that preloading the app
+        # in a gunicorn master never leaves threads behind
+        if self._executor is None or self._executor_pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._executor_pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+                    self._executor_pid = os.getpid()
+                    self._in_flight = 0
+        return self._executor
+
+
+# Singleton instance
+job_service = JobService(
+    max_workers=int(os.environ.get("JOB_WORKERS", 2)),
+    queue_size=int(os.environ.get("JOB_QUEUE_SIZE", 16)),
+    max_per_user=int(os.environ.get("JOB_MAX_PER_USER", 2)),
+    stale_after=float(os.environ.get("JOB_STALE_AFTER", 3600)),
+    result_ttl=float(os.environ.get("JOB_RESULT_TTL", 86400)),
+)
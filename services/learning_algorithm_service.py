@@ -4,28 +4,94 @@ Service for generating content recommendations.
 This service reads the user's training data from the database and
 generates simple content recommendations while invoking the SEO
 analysis service to score the generated content.
+
+Inspiration examples are the user's posts most similar to the requested
+topic, found with the per-user `similarity_index`; when nothing matches,
+the most recent posts of the content type are used instead.  Hashtags
+are the ones the user (or, failing that, everyone) most often pairs with
+those in the recommendation, from `hashtag_index`.
+
+Results are cached per ``(user_id, content_type, platform, topic)`` in a
+bounded `TTLCache`; `BrandVoiceService` invalidates a user's entries for
+a post type whenever new training data of that type is stored.
 """
 
+import os
 import random
+from collections import namedtuple
 
 from models.social_media import TrainingData, db
+from services.cache import TTLCache
+from services.hashtag_index import hashtag_index
 from services.seo_service import seo_service
+from services.similarity_index import similarity_index
+
+# Number of recent examples considered for inspiration
+EXAMPLE_LIMIT = 10
+# Characters of each example quoted in a recommendation
+EXAMPLE_PREVIEW_CHARS = 50
+# Hashtags suggested per recommendation
+RECOMMENDED_HASHTAGS = 3
+
+ExamplePreview = namedtuple("ExamplePreview", ["post_type", "preview"])
 
 
 class LearningAlgorithmService:
     """Service for generating new, SEO‑optimized content recommendations."""
 
+    def __init__(self) -> None:
+        self.cache = TTLCache(
+            maxsize=int(os.environ.get("RECOMMENDATION_CACHE_SIZE", 1024)),
+            ttl=float(os.environ.get("RECOMMENDATION_CACHE_TTL", 300)),
+        )
+
     def generate_content_recommendations(
-        self, user_id: str, content_type: str, platform: str
+        self, user_id: str, content_type: str, platform: str, topic: str | None = None
     ) -> dict:
         """Generate content recommendations based on a topic and learned brand voice."""
-        # Fetch training examples for the specific user and content type
-        training_examples = (
-            TrainingData.query.filter_by(user_id=user_id, post_type=content_type)
-            .limit(10)
-            .all()
+        topic = " ".join((topic or "").lower().split())
+        return self.cache.get_or_set(
+            (user_id, content_type, platform, topic),
+            lambda: self._build_recommendations(user_id, content_type, platform, topic),
+        )
+
+    def invalidate_recommendations(self, user_id: str, content_type: str) -> int:
+        """Drop cached recommendations for a user and content type on every platform."""
+        return self.cache.invalidate_where(
+            lambda key: key[0] == user_id and key[1] == content_type
         )
 
+    def find_similar(
+        self, user_id: str, query: str, k: int = 5, post_type: str | None = None
+    ) -> list:
+        """Return the user's posts most similar to ``query``."""
+        return similarity_index.search(user_id, query, k, post_type)
+
+    def _build_recommendations(
+        self, user_id: str, content_type: str, platform: str, topic: str
+    ) -> dict:
+        # Prefer the user's posts closest to the requested topic
+        query = topic or content_type.replace("_", " ")
+        matches = similarity_index.search(user_id, query, k=3, post_type=content_type)
+        training_examples = [
+            ExamplePreview(match["post_type"], match["preview"]) for match in matches
+        ]
+
+        if not training_examples:
+            # Fall back to the most recent examples for the content type,
+            # loading only the columns and content prefix that are quoted
+            training_examples = (
+                db.session.query(
+                    TrainingData.post_type,
+                    db.func.substr(TrainingData.content, 1, EXAMPLE_PREVIEW_CHARS).label("preview"),
+                )
+                .filter_by(user_id=user_id, post_type=content_type)
+                .order_by(TrainingData.created_at.desc())
+                .limit(EXAMPLE_LIMIT)
+                .all()
+            )
+            random.shuffle(training_examples)
+
         # If no data, return a helpful error
         if not training_examples:
             return {
@@ -37,17 +103,18 @@ class LearningAlgorithmService:
 
         # Generate three recommendations
         for i in range(3):
-            base_example = random.choice(training_examples)
+            base_example = training_examples[i % len(training_examples)]
             focus = f"Variation {i + 1} based on your '{base_example.post_type}' style"
-            topic = f"A new post about {content_type.replace('_', ' ')}"
-            new_content = f"{topic}.\n\n(Inspired by your post: '{base_example.content[:50]}...')"
+            heading = f"A new post about {topic or content_type.replace('_', ' ')}"
+            new_content = f"{heading}.\n\n(Inspired by your post: '{base_example.preview}...')"
             seo_analysis = seo_service.analyze_content(new_content)
+            hashtags = hashtag_index.suggest(new_content, user_id, k=RECOMMENDED_HASHTAGS)
 
             recommendations.append(
                 {
                     "content": new_content,
                     "focus": focus,
-                    "hashtags": ["#WindsorRealEstate", f"#{content_type}"],
+                    "hashtags": hashtags or ["#WindsorRealEstate", f"#{content_type}"],
                     "seo_score": seo_analysis.get("score"),
                     "seo_recommendations": seo_analysis.get("recommendations"),
                 }
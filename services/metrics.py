@@ -0,0 +1,374 @@
+"""
+Request, database and service metrics in Prometheus text format.
+
+`MetricsRegistry.init_app` times every request and records, per
+blueprint and endpoint, a latency histogram, a response size histogram
+and the number and duration of SQL statements the request executed
+(counted through SQLAlchemy ``before/after_cursor_execute`` engine
+events).  Service counters, such as SEO analyses and cache hits, are read
+from the services' own ``stats`` when a snapshot is taken, so they add no
+cost to the hot path.
+
+Each gunicorn worker writes its snapshot to ``metrics-<pid>.json`` in
+``METRICS_DIR`` every ``METRICS_FLUSH_INTERVAL`` seconds and at exit.
+`render` merges the files of all workers, summing counters and
+histogram buckets.  Files left by workers that have exited are folded
+into ``metrics-archive.json`` so their counts are not lost when the pid is
+reused.
+"""
+
+import atexit
+import bisect
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from flask import g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+try:  # POSIX only; without it dead workers' files are merged but never archived
+    import fcntl
+except ImportError:  # pragma: no cover - depends on the platform
+    fcntl = None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+STARTUP_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BACKGROUND_ENDPOINT = "_background"
+
+# name -> (type, help, buckets)
+METRICS = {
+    "http_requests_total": ("counter", "HTTP requests by endpoint, method and status.", None),
+    "http_request_duration_seconds": ("histogram", "Request latency in seconds.", LATENCY_BUCKETS),
+    "http_response_size_bytes": ("histogram", "Response body size in bytes as sent.", SIZE_BUCKETS),
+    "http_request_db_queries": ("histogram", "SQL statements executed per request.", QUERY_COUNT_BUCKETS),
+    "db_queries_total": ("counter", "SQL statements executed, by endpoint.", None),
+    "db_query_duration_seconds_total": ("counter", "Time spent in SQL statements, by endpoint.", None),
+    "worker_startup_seconds": ("histogram", "Worker import, create_app and first request time.", STARTUP_BUCKETS),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class MetricsRegistry:
+    """Process-local metrics with cross-worker aggregation through per-pid files."""
+
+    def __init__(self, directory: Optional[str] = None, flush_interval: float = 10.0) -> None:
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Labels], float] = defaultdict(float)
+        self._histograms: Dict[Tuple[str, Labels], list] = {}
+        self._collectors: List[Tuple[str, str, Callable[[], float]]] = []
+        self._thread: Optional[threading.Thread] = None
+        self._thread_pid: Optional[int] = None
+
+    def init_app(self, app) -> None:
+        """Install the request hooks and engine listeners.
+
+        Call before other ``after_request`` hooks are registered so sizes
+        are measured after compression.
+        """
+        if self.directory is None:
+            database = app.config.get("SQLALCHEMY_DATABASE_URI", "")
+            digest = hashlib.sha1(database.encode()).hexdigest()[:12]
+            self.directory = os.path.join(tempfile.gettempdir(), f"imp-metrics-{digest}")
+        os.makedirs(self.directory, exist_ok=True)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+            event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        self._register_service_collectors()
+        atexit.register(self.write_snapshot)
+
+    def register_collector(self, name: str, help_text: str, read: Callable[[], float]) -> None:
+        """Report ``read()`` as the cumulative counter ``name`` in every snapshot."""
+        self._collectors.append((name, help_text, read))
+
+    def inc(self, name: str, labels: Dict[str, str], amount: float = 1.0) -> None:
+        with self._lock:
+            self._counters[(name, tuple(sorted(labels.items())))] += amount
+
+    def observe(self, name: str, labels: Dict[str, str], value: float) -> None:
+        buckets = METRICS[name][2]
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * (len(buckets) + 1), 0.0, 0]
+            histogram[0][bisect.bisect_left(buckets, value)] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def reset(self) -> None:
+        """Forget this process's metrics, e.g. those a forked worker inherited from its parent."""
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)
+        self._histograms = {}
+
+    def snapshot(self) -> dict:
+        """Return this process's metrics as a JSON-serialisable dict."""
+        with self._lock:
+            counters = [[name, list(labels), value] for (name, labels), value in self._counters.items()]
+            histograms = [
+                [name, list(labels), list(buckets), total, count]
+                for (name, labels), (buckets, total, count) in self._histograms.items()
+            ]
+        for name, _, read in self._collectors:
+            try:
+                counters.append([name, [], float(read())])
+            except Exception as e:
+                print(f"Metrics collector {name} failed: {e}")
+        return {"counters": counters, "histograms": histograms}
+
+    def write_snapshot(self) -> None:
+        if self.directory is None:
+            return
+        try:
+            _write_json(os.path.join(self.directory, f"metrics-{os.getpid()}.json"), self.snapshot())
+        except OSError as e:
+            print(f"Failed to write metrics snapshot: {e}")
+
+    def render(self) -> str:
+        """Return the metrics of every worker, merged, in Prometheus text format."""
+        self.write_snapshot()
+        merged = _merge(self._read_live_snapshots() + [_read_json(self._archive_path())])
+        help_texts = {name: (kind, text) for name, (kind, text, _) in METRICS.items()}
+        help_texts.update({name: ("counter", text) for name, text, _ in self._collectors})
+        lines: List[str] = []
+        for name in sorted(help_texts):
+            kind, text = help_texts[name]
+            series = merged["counters"].get(name) or merged["histograms"].get(name)
+            if not series:
+                continue
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "counter":
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                continue
+            bounds = [_format_value(bound) for bound in METRICS[name][2]] + ["+Inf"]
+            for labels, (buckets, total, count) in sorted(series.items()):
+                cumulative = 0
+                for bound, bucket in zip(bounds, buckets):
+                    cumulative += bucket
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def _before_request(self) -> None:
+        g._metrics_start = time.perf_counter()
+        g._metrics_db = [0, 0.0]
+        self._ensure_writer()
+
+    def _after_request(self, response):
+        start = g.pop("_metrics_start", None)
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        queries, query_time = g.pop("_metrics_db", (0, 0.0))
+        labels = {"blueprint": request.blueprint or "", "endpoint": request.endpoint or "unmatched"}
+        self.inc("http_requests_total", dict(labels, method=request.method, status=str(response.status_code)))
+        self.observe("http_request_duration_seconds", labels, elapsed)
+        self.observe("http_request_db_queries", labels, queries)
+        if queries:
+            self.inc("db_queries_total", labels, queries)
+            self.inc("db_query_duration_seconds_total", labels, query_time)
+        if not response.is_streamed:
+            self.observe("http_response_size_bytes", labels, response.calculate_content_length() or 0)
+        return response
+
+    def _ensure_writer(self) -> None:
+        # Started lazily (and restarted after a fork) like the A/B event flusher
+        if self._thread is not None and self._thread_pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread_pid == os.getpid() and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="metrics-writer", daemon=True)
+            self._thread_pid = os.getpid()
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            self.write_snapshot()
+
+    def _archive_path(self) -> str:
+        return os.path.join(self.directory, "metrics-archive.json")
+
+    def _read_live_snapshots(self) -> List[dict]:
+        """Return the snapshots of running workers, archiving those of exited ones."""
+        live, dead = [], []
+        for filename in os.listdir(self.directory):
+            if not (filename.startswith("metrics-") and filename.endswith(".json")):
+                continue
+            pid = filename[len("metrics-"):-len(".json")]
+            if not pid.isdigit():
+                continue
+            path = os.path.join(self.directory, filename)
+            (live if _pid_alive(int(pid)) else dead).append(path)
+        if dead and fcntl is not None:
+            self._archive(dead)
+        else:
+            live.extend(dead)
+        return [_read_json(path) for path in live]
+
+    def _archive(self, paths: List[str]) -> None:
+        with open(os.path.join(self.directory, "metrics.lock"), "a+b") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                present = [path for path in paths if os.path.exists(path)]
+                if not present:
+                    return
+                archive = _merge([_read_json(self._archive_path())] + [_read_json(p) for p in present])
+                _write_json(self._archive_path(), _unmerge(archive))
+                for path in present:
+                    os.unlink(path)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _register_service_collectors(self) -> None:
+        if self._collectors:
+            return
+        # Imported here to keep this module free of service dependencies
+        from services.ab_event_service import ab_event_service
+        from services.ab_testing_service import ab_testing_service
+        from services.http_responses import response_optimizer
+        from services.job_service import job_service
+        from services.learning_algorithm_service import learning_algorithm_service
+        from services.seo_service import seo_service
+        from services.shared_cache import shared_cache
+
+        for name, help_text, read in (
+            ("seo_analyses_total", "SEO analyses performed.", lambda: seo_service.analyses),
+            ("recommendation_cache_hits_total", "Recommendation cache hits.", lambda: learning_algorithm_service.cache.hits),
+            ("recommendation_cache_misses_total", "Recommendation cache misses.", lambda: learning_algorithm_service.cache.misses),
+            ("ab_test_cache_hits_total", "A/B test cache hits.", lambda: ab_testing_service.cache.hits),
+            ("ab_test_cache_misses_total", "A/B test cache misses.", lambda: ab_testing_service.cache.misses),
+            ("ab_events_flushed_total", "A/B events written to the database.", lambda: ab_event_service.flushed_events),
+            ("shared_cache_hits_total", "Shared file cache hits.", lambda: shared_cache.hits),
+            ("shared_cache_misses_total", "Shared file cache misses.", lambda: shared_cache.misses),
+            ("compressed_responses_total", "Responses sent compressed.", lambda: response_optimizer.compressed_responses),
+            ("jobs_submitted_total", "Background jobs accepted.", lambda: job_service.submitted),
+            ("jobs_failed_total", "Background jobs that failed.", lambda: job_service.failed),
+            ("jobs_rejected_total", "Background jobs rejected by a queue or per-user limit.", lambda: job_service.rejected),
+        ):
+            self.register_collector(name, help_text, read)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["_metrics_query_start"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info.pop("_metrics_query_start", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    stats = g.get("_metrics_db") if has_app_context() else None
+    if stats is not None:
+        stats[0] += 1
+        stats[1] += elapsed
+    else:
+        labels = {"blueprint": "", "endpoint": BACKGROUND_ENDPOINT}
+        metrics.inc("db_queries_total", labels)
+        metrics.inc("db_query_duration_seconds_total", labels, elapsed)
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _read_json(path: str) -> dict:
+    try:
+        with open(path, encoding="utf-8") as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_json(path: str, data: dict) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".metrics-")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            json.dump(data, handle, separators=(",", ":"))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _merge(snapshots: List[dict]) -> dict:
+    """Sum snapshots into ``{"counters": {name: {labels: value}}, "histograms": {...}}``."""
+    counters: Dict[str, Dict[Labels, float]] = defaultdict(lambda: defaultdict(float))
+    histograms: Dict[str, Dict[Labels, list]] = defaultdict(dict)
+    for snapshot in snapshots:
+        for name, labels, value in snapshot.get("counters", ()):
+            counters[name][tuple(map(tuple, labels))] += value
+        for name, labels, buckets, total, count in snapshot.get("histograms", ()):
+            if name not in METRICS:
+                continue
+            key = tuple(map(tuple, labels))
+            merged = histograms[name].get(key)
+            if merged is None or len(merged[0]) != len(buckets):
+                histograms[name][key] = [list(buckets), total, count]
+            else:
+                merged[0] = [a + b for a, b in zip(merged[0], buckets)]
+                merged[1] += total
+                merged[2] += count
+    return {"counters": counters, "histograms": histograms}
+
+
+def _unmerge(merged: dict) -> dict:
+    """Turn `_merge` output back into the snapshot file format."""
+    return {
+        "counters": [
+            [name, list(labels), value]
+            for name, series in merged["counters"].items()
+            for labels, value in series.items()
+        ],
+        "histograms": [
+            [name, list(labels), buckets, total, count]
+            for name, series in merged["histograms"].items()
+            for labels, (buckets, total, count) in series.items()
+        ],
+    }
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+# Singleton instance
+metrics = MetricsRegistry(
+    directory=os.environ.get("METRICS_DIR") or None,
+    flush_interval=float(os.environ.get("METRICS_FLUSH_INTERVAL", 10)),
+)
@@ -0,0 +1,74 @@
+"""
+Keyset (cursor) pagination helpers.
+
+Listings are ordered by ``(created_at, id)`` and a page is addressed by
+an opaque cursor encoding the position of the last row returned.  Each
+page is then a bounded index range scan, unlike ``OFFSET`` pagination
+whose cost grows with the page number.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(created_at: datetime, row_id: Any) -> str:
+    """Encode a keyset position as an opaque URL-safe token."""
+    raw = json.dumps([created_at.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, Any]:
+    """Decode a token from `encode_cursor`, raising ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        if not isinstance(row_id, (int, str)):
+            raise TypeError("cursor id must be an int or string")
+        return datetime.fromisoformat(created_at), row_id
+    except Exception as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def keyset_page(
+    query,
+    created_column,
+    id_column,
+    limit: int,
+    cursor: Optional[str] = None,
+    descending: bool = False,
+) -> Tuple[List[Any], Optional[str]]:
+    """Return one page of ``query`` ordered by ``(created_column, id_column)``.
+
+    Returns the rows and the cursor for the following page, or None when
+    this is the last page.
+    """
+    if cursor:
+        created_at, last_id = decode_cursor(cursor)
+        if descending:
+            after = or_(
+                created_column < created_at,
+                and_(created_column == created_at, id_column < last_id),
+            )
+        else:
+            after = or_(
+                created_column > created_at,
+                and_(created_column == created_at, id_column > last_id),
+            )
+        query = query.filter(after)
+    if descending:
+        query = query.order_by(created_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(created_column, id_column)
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(
+            getattr(last, created_column.key), getattr(last, id_column.key)
+        )
+    return rows, next_cursor
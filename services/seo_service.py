@@ -4,15 +4,26 @@ SEO analysis service.
 This service analyzes a piece of text for SEO quality based on
 keywords, location references, length, and presence of calls to action.
 It returns a score (0–100) and a list of recommendations.
+
+Keyword, location and call-to-action phrases are compiled once into a
+`KeywordMatcher`, which finds every phrase in a single pass over the
+text's word tokens.  Matching is on whole words, so "home" no longer
+matches inside "homeowner".  Callers that have already scanned a text
+with `services.text_features.extract_features` can score it with
+`analyze_features` instead of rescanning it.
 """
 
-import re
+from typing import Dict, Iterable, List, Set
+
+from services.text_features import KeywordMatcher, TextFeatures, extract_features
 
 
 class SeoService:
     """A simple service to analyze the SEO quality of a piece of text."""
 
     def __init__(self) -> None:
+        # Number of texts scored, reported by `services.metrics`
+        self.analyses = 0
         # Keywords that are important for Windsor‑Essex real estate SEO
         self.primary_keywords = [
             "windsor",
@@ -35,64 +46,98 @@ class SeoService:
             "walkerville",
             "south windsor",
         ]
+        self.cta_phrases = [
+            "contact me",
+            "dm me",
+            "call now",
+            "learn more",
+            "schedule a viewing",
+        ]
+        self.matcher = KeywordMatcher(
+            {
+                "primary": self.primary_keywords,
+                "location": self.location_keywords,
+                "cta": self.cta_phrases,
+            }
+        )
 
     def analyze_content(self, text: str) -> dict:
         """Analyze content and return an SEO score and recommendations."""
         if not text:
             return {"score": 0, "recommendations": ["Content is empty."]}
+        return self.analyze_features(extract_features(text, self.matcher, keep_tokens=False))
+
+    def analyze_features(self, features: TextFeatures) -> dict:
+        """Score text that has already been scanned by `extract_features`.
 
-        text_lower = text.lower()
+        ``features`` must have been extracted with this service's
+        ``matcher`` so that its keyword hits are populated.
+        """
+        self.analyses += 1
+        hits = features.keyword_hits
+        word_count = features.whitespace_word_count
         recommendations = []
-        score = 0
 
-        # 1. Keyword Presence (Max 50 points)
-        primary_found = sum(1 for keyword in self.primary_keywords if keyword in text_lower)
-        score += min(primary_found * 5, 50)
-        if primary_found < 3:
+        if len(hits.get("primary", ())) < 3:
             recommendations.append(
                 "Include more primary keywords like 'Windsor', 'real estate', 'home'."
             )
-
-        # 2. Location Specificity (Max 20 points)
-        location_found = sum(1 for keyword in self.location_keywords if keyword in text_lower)
-        if location_found > 0:
-            score += 20
-        else:
+        if not hits.get("location"):
             recommendations.append(
                 "Add a specific location (e.g., 'Tecumseh', 'South Windsor') to target local buyers."
             )
-
-        # 3. Readability & Length (Max 20 points)
-        word_count = len(text.split())
-        if 50 <= word_count <= 150:
-            score += 20
-        elif 25 <= word_count < 50:
-            score += 10
-        else:
+        if not 25 <= word_count <= 150:
             recommendations.append(
                 f"Content length is {word_count} words. Aim for 50–150 words for optimal engagement."
             )
-
-        # 4. Call to Action (Max 10 points)
-        cta_phrases = [
-            "contact me",
-            "dm me",
-            "call now",
-            "learn more",
-            "schedule a viewing",
-        ]
-        if any(phrase in text_lower for phrase in cta_phrases):
-            score += 10
-        else:
+        if not hits.get("cta"):
             recommendations.append(
                 "Include a clear call to action (e.g., 'DM me for details')."
             )
 
         return {
-            "score": min(score, 100),
+            "score": self.score(hits, word_count),
             "recommendations": recommendations if recommendations else ["Looks good! This content is well‑optimized."],
         }
 
+    @staticmethod
+    def score(hits: Dict[str, Set[str]], word_count: int) -> int:
+        """Return the 0–100 score for keyword hits and a whitespace word count.
+
+        Split out of `analyze_features` so that callers scoring many
+        assembled texts (see `services.variation_engine`) can combine
+        precomputed hits without rescanning or building recommendations.
+        """
+        # 1. Keyword Presence (Max 50 points)
+        score = min(len(hits.get("primary", ())) * 5, 50)
+        # 2. Location Specificity (Max 20 points)
+        if hits.get("location"):
+            score += 20
+        # 3. Readability & Length (Max 20 points)
+        if 50 <= word_count <= 150:
+            score += 20
+        elif 25 <= word_count < 50:
+            score += 10
+        # 4. Call to Action (Max 10 points)
+        if hits.get("cta"):
+            score += 10
+        return min(score, 100)
+
+    def analyze_many(self, texts: Iterable[str]) -> List[dict]:
+        """Analyze a batch of texts, returning one result per input in order.
+
+        Identical texts within the batch are only analyzed once.
+        """
+        seen: Dict[str, dict] = {}
+        results = []
+        for text in texts:
+            key = text or ""
+            result = seen.get(key)
+            if result is None:
+                result = seen[key] = self.analyze_content(key)
+            results.append(result)
+        return results
+
 
 # Create a singleton instance for convenient imports
 seo_service = SeoService()
@@ -0,0 +1,301 @@
+"""
+Cross-worker cache in a memory-mapped file.
+
+`SharedFileCache` holds read-mostly JSON values (market statistics,
+brand voice profiles) in one file that every gunicorn worker on the host
+maps read-only, so a value computed by one worker is reused by the
+others and survives worker recycling.  The file layout is::
+
+    header   magic "IMSC", format version, entry count
+    index    per entry: key length, value offset, value length,
+             stored-at and expires-at timestamps, key bytes
+    values   compact UTF-8 JSON, back to back
+
+Readers parse the index once per file version and decode each value
+straight from the mapping.  Writers serialise under an exclusive
+``flock`` on a sidecar lock file, write a complete new file and
+``os.replace`` it over the old one, so readers only ever see a whole
+file; a reader notices the new version by its inode and remaps it.
+Writes cost a rewrite of the file, which is why it is bounded by
+``SHARED_CACHE_MAX_ENTRIES`` and meant for values read far more often
+than they change.
+
+Deleting keys that are not in the file costs no rewrite.  Every delete
+does stamp the time in a small table of invalidation slots (a second
+file, updated in place under a byte-range lock), and `set` accepts an
+``as_of`` time: a value whose sources were read before the key (or a
+``:``-separated prefix of it) was last invalidated is not stored.  This
+keeps a reader that loaded data just before a write from putting the
+stale value back after the writer's delete.
+
+Without ``fcntl`` (e.g. on Windows) or when ``SHARED_CACHE_ENABLED`` is
+``0`` every lookup misses and writes are ignored, leaving each worker's
+in-process caches to do the work.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+try:  # POSIX only; the cache is disabled without it
+    import fcntl
+except ImportError:  # pragma: no cover - depends on the platform
+    fcntl = None
+
+MAGIC = b"IMSC"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<4sHI")
+# key length, value offset, value length, stored at, expires at
+_ENTRY = struct.Struct("<HQIdd")
+# Last invalidation time of the keys hashed to each slot
+_SLOT = struct.Struct("<d")
+INVALIDATION_SLOTS = 4096
+
+
+class SharedFileCache:
+    """A host-wide key/value cache backed by an atomically replaced, mmapped file."""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: float = 3600.0,
+        max_entries: int = 4096,
+        enabled: bool = True,
+    ) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled and fcntl is not None
+        self._lock = threading.Lock()
+        self._mm: Optional[mmap.mmap] = None
+        self._file_id: Optional[Tuple[int, int]] = None
+        self._index: Dict[str, Tuple[int, int, float, float]] = {}
+        self._slots: Optional[mmap.mmap] = None
+        self._slots_fd: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    def init_app(self, app) -> None:
+        """Default the file to one per database, so separate apps never share entries."""
+        if self.path is None:
+            database = app.config.get("SQLALCHEMY_DATABASE_URI", "")
+            digest = hashlib.sha1(database.encode()).hexdigest()[:12]
+            self.path = os.path.join(tempfile.gettempdir(), f"imp-shared-cache-{digest}.bin")
+
+    def get(self, key: str, default: Any = None, max_age: Optional[float] = None) -> Any:
+        """Return the value for ``key``, or ``default`` if absent, expired or older than ``max_age``."""
+        if not self.enabled or self.path is None:
+            return default
+        now = time.time()
+        with self._lock:
+            self._remap()
+            entry = self._index.get(key)
+            if entry is None or entry[3] <= now or (max_age is not None and now - entry[2] > max_age):
+                self.misses += 1
+                return default
+            offset, length = entry[0], entry[1]
+            raw = self._mm[offset:offset + length]
+            self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, as_of: Optional[float] = None) -> None:
+        """Store ``value``; with ``as_of``, only if ``key`` was not invalidated since then."""
+        self.update({key: value}, ttl=ttl, as_of=as_of)
+
+    def delete(self, keys: Iterable[str]) -> None:
+        self.update(delete=keys)
+
+    def delete_prefix(self, prefix: str) -> None:
+        self.update(delete_prefix=prefix)
+
+    def update(
+        self,
+        values: Optional[Dict[str, Any]] = None,
+        ttl: Optional[float] = None,
+        delete: Iterable[str] = (),
+        delete_prefix: Optional[str] = None,
+        as_of: Optional[float] = None,
+    ) -> None:
+        """Store ``values`` and drop ``delete`` keys (and keys under ``delete_prefix``) in one rewrite.
+
+        ``as_of`` is when the sources of ``values`` were read; values of
+        keys invalidated since are skipped.  Errors are reported and
+        swallowed: the shared cache is an optimisation and must never
+        fail the caller.
+        """
+        if not self.enabled or self.path is None:
+            return
+        doomed = set(delete)
+        if not values and not doomed and delete_prefix is None:
+            return
+        now = time.time()
+        try:
+            self._invalidate([*doomed, *([delete_prefix] if delete_prefix is not None else [])], now)
+            if as_of is not None and values:
+                values = {key: value for key, value in values.items() if self._invalidated_at(key) < as_of}
+            if not values:
+                with self._lock:
+                    self._remap()
+                    present = any(
+                        key in doomed or (delete_prefix is not None and key.startswith(delete_prefix))
+                        for key in self._index
+                    )
+                if not present:
+                    return
+        except OSError as e:
+            print(f"Shared cache write failed: {e}")
+            return
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        encoded = {
+            key: json.dumps(value, separators=(",", ":"), default=str).encode()
+            for key, value in (values or {}).items()
+        }
+        try:
+            with open(self.path + ".lock", "a+b") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    with self._lock:
+                        self._remap()
+                        entries = {
+                            key: (bytes(self._mm[offset:offset + length]), stored_at, expiry)
+                            for key, (offset, length, stored_at, expiry) in self._index.items()
+                            if expiry > now
+                            and key not in doomed
+                            and not (delete_prefix is not None and key.startswith(delete_prefix))
+                        }
+                    for key, raw in encoded.items():
+                        entries[key] = (raw, now, expires_at)
+                    if len(entries) > self.max_entries:
+                        newest = sorted(entries.items(), key=lambda item: item[1][1], reverse=True)
+                        entries = dict(newest[: self.max_entries])
+                    self._write(entries)
+                    if as_of is not None:
+                        # A delete that stamped its keys after the check
+                        # above may have found them absent and not waited
+                        # for this write; take back what it invalidated
+                        stale = [key for key in encoded if self._invalidated_at(key) >= as_of]
+                        if stale:
+                            for key in stale:
+                                entries.pop(key, None)
+                            self._write(entries)
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+            self.writes += 1
+        except OSError as e:
+            print(f"Shared cache write failed: {e}")
+
+    def stats(self) -> dict:
+        if self.enabled and self.path is not None:
+            with self._lock:
+                self._remap()
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "path": self.path,
+            "entries": len(self._index),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "writes": self.writes,
+        }
+
+    def _slot_offset(self, key: str) -> int:
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "little") % INVALIDATION_SLOTS * _SLOT.size
+
+    def _open_slots(self) -> mmap.mmap:
+        """Map the invalidation slot file, creating it on first use.  Holds ``_lock``."""
+        if self._slots is None:
+            fd = os.open(self.path + ".slots", os.O_RDWR | os.O_CREAT, 0o600)
+            size = INVALIDATION_SLOTS * _SLOT.size
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+            self._slots, self._slots_fd = mmap.mmap(fd, size), fd
+        return self._slots
+
+    def _invalidate(self, keys: Iterable[str], now: float) -> None:
+        """Stamp ``now`` as the last invalidation of each key (or prefix)."""
+        with self._lock:
+            slots = self._open_slots()
+            for offset in sorted({self._slot_offset(key) for key in keys}):
+                fcntl.lockf(self._slots_fd, fcntl.LOCK_EX, _SLOT.size, offset)
+                try:
+                    if _SLOT.unpack_from(slots, offset)[0] < now:
+                        _SLOT.pack_into(slots, offset, now)
+                finally:
+                    fcntl.lockf(self._slots_fd, fcntl.LOCK_UN, _SLOT.size, offset)
+
+    def _invalidated_at(self, key: str) -> float:
+        """Return the last invalidation time of ``key`` or of any ``:``-separated prefix of it."""
+        prefixes = [key[: index + 1] for index, char in enumerate(key) if char == ":"]
+        with self._lock:
+            slots = self._open_slots()
+            return max(_SLOT.unpack_from(slots, self._slot_offset(name))[0] for name in (key, *prefixes))
+
+    def _write(self, entries: Dict[str, Tuple[bytes, float, float]]) -> None:
+        keys = [(key, key.encode()) for key in entries]
+        offset = _HEADER.size + sum(_ENTRY.size + len(raw_key) for _, raw_key in keys)
+        index, values = [], []
+        for key, raw_key in keys:
+            raw, stored_at, expiry = entries[key]
+            index.append(_ENTRY.pack(len(raw_key), offset, len(raw), stored_at, expiry) + raw_key)
+            values.append(raw)
+            offset += len(raw)
+        directory = os.path.dirname(self.path) or "."
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".shared-cache-")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(keys)))
+                handle.writelines(index)
+                handle.writelines(values)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _remap(self) -> None:
+        """Map the current file if it was replaced since it was last mapped.  Holds ``_lock``."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._close()
+            return
+        file_id = (stat.st_ino, stat.st_mtime_ns)
+        if file_id == self._file_id:
+            return
+        self._close()
+        with open(self.path, "rb") as handle:
+            mm = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = _HEADER.unpack_from(mm, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            mm.close()
+            return
+        index, position = {}, _HEADER.size
+        for _ in range(count):
+            key_length, offset, length, stored_at, expiry = _ENTRY.unpack_from(mm, position)
+            position += _ENTRY.size
+            key = mm[position:position + key_length].decode()
+            position += key_length
+            index[key] = (offset, length, stored_at, expiry)
+        self._mm, self._file_id, self._index = mm, file_id, index
+
+    def _close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+        self._mm, self._file_id, self._index = None, None, {}
+
+
+# Singleton instance
+shared_cache = SharedFileCache(
+    path=os.environ.get("SHARED_CACHE_PATH") or None,
+    ttl=float(os.environ.get("SHARED_CACHE_TTL", 3600)),
+    max_entries=int(os.environ.get("SHARED_CACHE_MAX_ENTRIES", 4096)),
+    enabled=os.environ.get("SHARED_CACHE_ENABLED", "1").lower() not in ("0", "false", "no"),
+)
@@ -0,0 +1,232 @@
+"""
+Per-user similarity index over training data.
+
+`SimilarityIndex` keeps an in-memory inverted index (term -> posting
+list) of each active user's `TrainingData` and ranks posts against a
+free-text query with BM25.  A user's index is built lazily from the
+database on first use, updated in place as new rows are stored, and
+evicted least-recently-used when too many users are indexed.  Rows
+written by other workers (or by bulk loads) are picked up by a cheap
+catch-up query, run at most every ``SIMILARITY_INDEX_REFRESH`` seconds
+or as soon as the index is marked stale.  Ids are allocated before
+their transactions commit, so rows can become visible out of id order;
+the catch-up re-lists the user's ids down to ``CATCHUP_ID_WINDOW``
+below the highest one indexed and loads only the rows not indexed yet.
+Scoring only touches the posting lists of the query terms, so lookups
+stay fast even for users with tens of thousands of posts.  BM25 length
+normalisations are kept per document and only recomputed for all of
+them when the average document length drifts.
+"""
+
+import heapq
+import math
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional
+
+from models.social_media import TrainingData, db
+from services.text_features import tokenize
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Rows fetched per round trip while building an index
+BUILD_CHUNK_SIZE = 1000
+# Characters of each post kept for display in search results
+PREVIEW_CHARS = 50
+# Ids below the highest indexed one re-checked by a catch-up, for rows
+# committed after rows with higher ids
+CATCHUP_ID_WINDOW = 1000
+# Relative drift of the average document length that triggers
+# recomputing every document's length normalisation
+NORM_DRIFT = 0.1
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have i in is it its me my of on or our "
+    "so that the this to us was we were will with you your".split()
+)
+
+
+def index_terms(text: str) -> List[str]:
+    """Return the indexable terms of ``text``."""
+    return [token for token in tokenize(text) if token not in STOPWORDS]
+
+
+class UserIndex:
+    """Inverted index over one user's posts."""
+
+    def __init__(self) -> None:
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.doc_lengths: Dict[int, int] = {}
+        self.doc_meta: Dict[int, tuple] = {}
+        self.total_length = 0
+        self.max_id = 0
+        self.built = False
+        self.stale = False
+        self.refreshed_at = 0.0
+        self.lock = threading.Lock()
+        self._norms: Dict[int, float] = {}
+        self._norms_avg_length = 0.0
+        self._norms_scale = 0.0
+
+    def add(self, doc_id: int, post_type: str, content: str) -> None:
+        if doc_id in self.doc_lengths:
+            return
+        self.max_id = max(self.max_id, doc_id)
+        terms = index_terms(content)
+        for term, count in Counter(terms).items():
+            self.postings.setdefault(term, {})[doc_id] = count
+        self.doc_lengths[doc_id] = len(terms)
+        self.doc_meta[doc_id] = (post_type, content[:PREVIEW_CHARS])
+        self.total_length += len(terms)
+        if self._norms:
+            # Normalised against the same average as the documents before it
+            self._norms[doc_id] = BM25_K1 * (1 - BM25_B) + self._norms_scale * len(terms)
+
+    def _doc_norms(self) -> Dict[int, float]:
+        """Return each document's BM25 length normalisation, recomputed on drift."""
+        doc_count = len(self.doc_lengths)
+        avg_length = self.total_length / doc_count or 1
+        if (
+            len(self._norms) != doc_count
+            or abs(avg_length - self._norms_avg_length) > NORM_DRIFT * self._norms_avg_length
+        ):
+            base, scale = BM25_K1 * (1 - BM25_B), BM25_K1 * BM25_B / avg_length
+            self._norms = {
+                doc_id: base + scale * length for doc_id, length in self.doc_lengths.items()
+            }
+            self._norms_avg_length, self._norms_scale = avg_length, scale
+        return self._norms
+
+    def search(self, query: str, k: int, post_type: Optional[str] = None) -> List[dict]:
+        doc_count = len(self.doc_lengths)
+        if not doc_count:
+            return []
+        norms = self._doc_norms()
+        scores: Dict[int, float] = {}
+        get_score = scores.get
+        for term in set(index_terms(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            weight = idf * (BM25_K1 + 1)
+            for doc_id, tf in postings.items():
+                scores[doc_id] = get_score(doc_id, 0.0) + weight * tf / (tf + norms[doc_id])
+        if post_type:
+            candidates = (
+                (score, doc_id)
+                for doc_id, score in scores.items()
+                if self.doc_meta[doc_id][0] == post_type
+            )
+        else:
+            candidates = ((score, doc_id) for doc_id, score in scores.items())
+        return [
+            {
+                "id": doc_id,
+                "score": round(score, 4),
+                "post_type": self.doc_meta[doc_id][0],
+                "preview": self.doc_meta[doc_id][1],
+            }
+            for score, doc_id in heapq.nlargest(k, candidates)
+        ]
+
+
+class SimilarityIndex:
+    """Lazily built, incrementally updated BM25 indexes keyed by user."""
+
+    def __init__(self, max_users: int = 256, refresh_seconds: float = 30.0) -> None:
+        self.max_users = max_users
+        self.refresh_seconds = refresh_seconds
+        self._indexes: "OrderedDict[str, UserIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def search(
+        self, user_id: str, query: str, k: int = 5, post_type: Optional[str] = None
+    ) -> List[dict]:
+        """Return up to ``k`` of the user's posts most similar to ``query``."""
+        index = self._get_index(user_id)
+        with index.lock:
+            return index.search(query, k, post_type)
+
+    def add(self, user_id: str, doc_id: int, post_type: str, content: str) -> None:
+        """Add a newly stored post to the user's index if it is loaded."""
+        with self._lock:
+            index = self._indexes.get(user_id)
+        if index is not None:
+            with index.lock:
+                index.add(doc_id, post_type, content)
+
+    def mark_stale(self, user_id: str) -> None:
+        """Make the next search for ``user_id`` catch up with the database first."""
+        with self._lock:
+            index = self._indexes.get(user_id)
+        if index is not None:
+            index.stale = True
+
+    def invalidate(self, user_id: str) -> None:
+        """Forget a user's index; it is rebuilt on the next search."""
+        with self._lock:
+            self._indexes.pop(user_id, None)
+
+    def _get_index(self, user_id: str) -> UserIndex:
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None:
+                self._indexes.move_to_end(user_id)
+            else:
+                index = UserIndex()
+                self._indexes[user_id] = index
+                while len(self._indexes) > self.max_users:
+                    self._indexes.popitem(last=False)
+        # Load outside the global lock; concurrent searches for this user
+        # wait on the index lock until it is populated.  Rows added while
+        # loading are deduplicated by id.
+        with index.lock:
+            now = time.monotonic()
+            if not index.built or index.stale or now - index.refreshed_at > self.refresh_seconds:
+                self._load(user_id, index)
+                index.built, index.stale, index.refreshed_at = True, False, now
+        return index
+
+    def _load(self, user_id: str, index: UserIndex) -> None:
+        """Index the user's stored rows that are not indexed yet.
+
+        A first load streams every row.  A catch-up lists the ids above
+        ``index.max_id - CATCHUP_ID_WINDOW`` and fetches only the rows
+        missing from the index.
+        """
+        columns = (TrainingData.id, TrainingData.post_type, TrainingData.content)
+        if not index.built:
+            rows = (
+                db.session.query(*columns)
+                .filter(TrainingData.user_id == user_id)
+                .yield_per(BUILD_CHUNK_SIZE)
+            )
+            for doc_id, post_type, content in rows:
+                index.add(doc_id, post_type, content)
+            return
+        ids = (
+            db.session.query(TrainingData.id)
+            .filter(
+                TrainingData.user_id == user_id,
+                TrainingData.id > index.max_id - CATCHUP_ID_WINDOW,
+            )
+            .all()
+        )
+        missing = [doc_id for doc_id, in ids if doc_id not in index.doc_lengths]
+        for start in range(0, len(missing), BUILD_CHUNK_SIZE):
+            chunk = missing[start:start + BUILD_CHUNK_SIZE]
+            for doc_id, post_type, content in (
+                db.session.query(*columns).filter(TrainingData.id.in_(chunk))
+            ):
+                index.add(doc_id, post_type, content)
+
+
+# Singleton instance
+similarity_index = SimilarityIndex(
+    int(os.environ.get("SIMILARITY_INDEX_MAX_USERS", 256)),
+    float(os.environ.get("SIMILARITY_INDEX_REFRESH", 30)),
+)
@@ -0,0 +1,137 @@
+"""
+Worker startup: schema creation, fork safety and a cold-start report.
+
+`create_app` has always run ``db.create_all()`` on every worker boot,
+which costs a round of schema queries per worker restart.  With
+``DB_AUTO_CREATE=0`` it is skipped and the schema is created once, on
+deploy, with ``flask init-db`` instead.
+
+Under ``gunicorn --preload`` the app is created in the master and the
+workers are forked from it, so they would share its database
+connections.  `StartupManager.init_app` registers an ``os.register_at_fork``
+hook that, in each child, drops the inherited pooled connections
+(``Engine.dispose(close=False)``, leaving them open for the parent) and
+clears the metrics inherited from the master.
+
+The report records how long the application modules took to import, how
+long `create_app` took and how long the worker's first request took
+(cold caches, lazily imported optional packages).  It is printed once
+per worker on its first request, observed into the
+``worker_startup_seconds`` histogram and returned by `stats`.
+"""
+
+import os
+import threading
+import time
+import weakref
+from typing import Optional
+
+import click
+from flask import g
+
+from models.social_media import db
+from services.metrics import metrics
+
+
+class StartupManager:
+    """Create the schema, make preloaded apps fork safe and time worker startup."""
+
+    def __init__(self, auto_create: bool = True) -> None:
+        self.auto_create = auto_create
+        self.import_seconds: Optional[float] = None
+        self.create_app_seconds: Optional[float] = None
+        self.first_request_seconds: Optional[float] = None
+        self._create_app_started: Optional[float] = None
+        self._engines = weakref.WeakSet()
+        self._first_request_lock = threading.Lock()
+        self._fork_hook_registered = False
+
+    def begin(self, import_started: Optional[float] = None) -> None:
+        """Mark the start of `create_app`; ``import_started`` is when ``main`` began importing."""
+        self._create_app_started = time.perf_counter()
+        if import_started is not None and self.import_seconds is None:
+            self.import_seconds = self._create_app_started - import_started
+
+    def init_app(self, app) -> None:
+        """Create the tables (unless disabled), register ``init-db`` and the fork hook.
+
+        Call at the end of `create_app`, after the blueprints are registered.
+        """
+        app.cli.add_command(init_db_command)
+        if self.auto_create:
+            with app.app_context():
+                db.create_all()
+        with app.app_context():
+            self._engines.update(db.engines.values())
+        if not self._fork_hook_registered and hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+            self._fork_hook_registered = True
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+        if self._create_app_started is not None:
+            self.create_app_seconds = time.perf_counter() - self._create_app_started
+
+    def stats(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "auto_create": self.auto_create,
+            "import_seconds": _rounded(self.import_seconds),
+            "create_app_seconds": _rounded(self.create_app_seconds),
+            "first_request_seconds": _rounded(self.first_request_seconds),
+        }
+
+    def _after_fork(self) -> None:
+        # Connections inherited from the parent must not be used by the
+        # child; close=False leaves them to the parent instead of closing
+        # its sockets from under it.
+        for engine in list(self._engines):
+            engine.dispose(close=False)
+        metrics.reset()
+        self.first_request_seconds = None
+        self._first_request_lock = threading.Lock()
+
+    def _before_request(self) -> None:
+        if self.first_request_seconds is None:
+            g._startup_request_start = time.perf_counter()
+
+    def _teardown_request(self, exc=None) -> None:
+        start = g.pop("_startup_request_start", None)
+        if start is None:
+            return
+        with self._first_request_lock:
+            if self.first_request_seconds is not None:
+                return
+            self.first_request_seconds = time.perf_counter() - start
+        for phase, seconds in (
+            ("import", self.import_seconds),
+            ("create_app", self.create_app_seconds),
+            ("first_request", self.first_request_seconds),
+        ):
+            if seconds is not None:
+                metrics.observe("worker_startup_seconds", {"phase": phase}, seconds)
+        print(
+            f"Worker {os.getpid()} startup: import {_format_seconds(self.import_seconds)}, "
+            f"create_app {_format_seconds(self.create_app_seconds)}, "
+            f"first request {_format_seconds(self.first_request_seconds)}"
+        )
+
+
+def _rounded(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds, 4)
+
+
+def _format_seconds(seconds: Optional[float]) -> str:
+    return "n/a" if seconds is None else f"{seconds:.3f}s"
+
+
+@click.command("init-db")
+def init_db_command():
+    """Create any missing database tables."""
+    db.create_all()
+    click.echo(f"Database schema is up to date ({len(db.metadata.tables)} tables)")
+
+
+# Singleton instance
+startup = StartupManager(
+    auto_create=os.environ.get("DB_AUTO_CREATE", "1").lower() not in ("0", "false", "no"),
+)
@@ -0,0 +1,243 @@
+"""
+Single-pass text feature extraction.
+
+Brand voice analysis and SEO scoring both need the same basic facts
+about a piece of text: its words, where sentences end, how much
+punctuation and emoji it uses, its hashtags and which keywords it
+mentions.  The `extract_features` function gathers all of them in one
+scan so that large inputs are only tokenized once and the resulting
+`TextFeatures` object can be shared by every consumer.
+"""
+
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set
+
+# Emoji code points: emoticons, pictographs, transport, supplemental
+# symbols, flags, dingbats and the miscellaneous symbol blocks.
+EMOJI_RANGES = (
+    "\U0001F000-\U0001F02F"  # Mahjong tiles
+    "\U0001F0A0-\U0001F0FF"  # Playing cards
+    "\U0001F100-\U0001F1FF"  # Enclosed alphanumerics and regional indicators
+    "\U0001F200-\U0001F2FF"  # Enclosed ideographic supplement
+    "\U0001F300-\U0001F5FF"  # Miscellaneous symbols and pictographs
+    "\U0001F600-\U0001F64F"  # Emoticons
+    "\U0001F680-\U0001F6FF"  # Transport and map symbols
+    "\U0001F700-\U0001F77F"  # Alchemical symbols
+    "\U0001F780-\U0001F7FF"  # Geometric shapes extended
+    "\U0001F800-\U0001F8FF"  # Supplemental arrows-C
+    "\U0001F900-\U0001F9FF"  # Supplemental symbols and pictographs
+    "\U0001FA00-\U0001FAFF"  # Chess symbols, symbols and pictographs extended-A
+    "\u2300-\u23FF"  # Miscellaneous technical (⌚, ⏰, ...)
+    "\u2600-\u26FF"  # Miscellaneous symbols (☀, ⚡, ...)
+    "\u2700-\u27BF"  # Dingbats (✨, ✅, ...)
+    "\u2B00-\u2BFF"  # Miscellaneous symbols and arrows (⭐, ...)
+    "\u3030\u303D\u3297\u3299"  # Wavy dash, part alternation mark, circled ideographs
+)
+
+# Characters that only modify a neighbouring emoji (zero-width joiner,
+# variation selectors, keycap and skin tone modifiers); not counted.
+_EMOJI_JOINERS = "\u200D\uFE0E\uFE0F\u20E3\U0001F3FB-\U0001F3FF"
+
+SENTENCE_TERMINATORS = frozenset(".!?")
+
+# Words longer than this count towards ``long_word_count``
+LONG_WORD_LENGTH = 6
+
+_WORD_RE = re.compile(r"\w+")
+_HASHTAG_RE = re.compile(r"#\w+")
+
+_TOKEN_RE = re.compile(
+    rf"(?P<hashtag>#\w+)"
+    rf"|(?P<word>\w+)"
+    rf"|(?P<space>\s+)"
+    rf"|(?P<joiner>[{_EMOJI_JOINERS}])"
+    rf"|(?P<emoji>[{EMOJI_RANGES}])"
+    rf"|(?P<punct>[^\w\s])"
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Return the lowercase word tokens of ``text``."""
+    return _WORD_RE.findall(text.lower())
+
+
+def extract_hashtags(text: str) -> List[str]:
+    """Return the hashtags of ``text`` in order of appearance, as written."""
+    return _HASHTAG_RE.findall(text)
+
+
+class KeywordMatcher:
+    """Find whole-word keyword phrases in text with a single token pass.
+
+    Phrases are grouped by name (e.g. ``"primary"``, ``"location"``) and
+    stored in a token trie, so multi-word phrases such as "real estate"
+    and overlapping phrases such as "windsor" / "south windsor" are all
+    found while walking the text once.
+    """
+
+    def __init__(self, groups: Dict[str, Iterable[str]]) -> None:
+        self.groups = {name: tuple(phrases) for name, phrases in groups.items()}
+        self._trie: dict = {}
+        self.max_phrase_len = 0
+        for name, phrases in self.groups.items():
+            for phrase in phrases:
+                tokens = _WORD_RE.findall(phrase.lower())
+                if not tokens:
+                    continue
+                node = self._trie
+                for token in tokens:
+                    node = node.setdefault(token, {})
+                node.setdefault(None, []).append((name, phrase))
+                self.max_phrase_len = max(self.max_phrase_len, len(tokens))
+
+    def scan_tokens(self, tokens: List[str]) -> Dict[str, Set[str]]:
+        """Return the phrases of each group found in lowercase ``tokens``."""
+        hits: Dict[str, Set[str]] = {name: set() for name in self.groups}
+        trie = self._trie
+        for start, token in enumerate(tokens):
+            node = trie.get(token)
+            pos = start + 1
+            while node is not None:
+                for name, phrase in node.get(None, ()):
+                    hits[name].add(phrase)
+                if pos >= len(tokens):
+                    break
+                node = node.get(tokens[pos])
+                pos += 1
+        return hits
+
+    def scan(self, text: str) -> Dict[str, Set[str]]:
+        """Return the phrases of each group found in ``text``."""
+        return self.scan_tokens(tokenize(text))
+
+
+@dataclass
+class TextFeatures:
+    """Everything the analysis services need to know about a text.
+
+    ``tokens`` holds the lowercase word tokens and is only populated when
+    requested; all other fields are counts that can be merged across
+    texts with `merge`.
+    """
+
+    tokens: List[str] = field(default_factory=list)
+    word_count: int = 0
+    total_word_length: int = 0
+    whitespace_word_count: int = 0
+    sentence_boundaries: List[int] = field(default_factory=list)
+    sentence_count: int = 0
+    punctuation: Counter = field(default_factory=Counter)
+    long_word_count: int = 0
+    emoji_count: int = 0
+    hashtags: Counter = field(default_factory=Counter)
+    keyword_hits: Dict[str, Set[str]] = field(default_factory=dict)
+
+    @property
+    def exclamations(self) -> int:
+        return self.punctuation["!"]
+
+    @property
+    def questions(self) -> int:
+        return self.punctuation["?"]
+
+    @property
+    def sentence_fragments(self) -> int:
+        """Pieces the text splits into at ``.``, ``!`` and ``?``, empty ones included.
+
+        The same as ``len(re.split(r"[.!?]", text))``: unlike
+        ``sentence_count``, "Big yard. Call now." is three fragments.
+        """
+        return sum(self.punctuation[char] for char in SENTENCE_TERMINATORS) + 1
+
+    @property
+    def avg_word_length(self) -> float:
+        return self.total_word_length / self.word_count if self.word_count else 0
+
+    def merge(self, other: "TextFeatures") -> "TextFeatures":
+        """Add the counts of ``other`` into this object and return it.
+
+        Token lists and sentence boundaries are positional and are not
+        merged; only the aggregate counts and keyword hits are combined.
+        """
+        self.word_count += other.word_count
+        self.total_word_length += other.total_word_length
+        self.whitespace_word_count += other.whitespace_word_count
+        self.sentence_count += other.sentence_count
+        self.punctuation.update(other.punctuation)
+        self.long_word_count += other.long_word_count
+        self.emoji_count += other.emoji_count
+        self.hashtags.update(other.hashtags)
+        for name, phrases in other.keyword_hits.items():
+            self.keyword_hits.setdefault(name, set()).update(phrases)
+        return self
+
+
+def extract_features(
+    text: str, matcher: Optional[KeywordMatcher] = None, keep_tokens: bool = True
+) -> TextFeatures:
+    """Scan ``text`` once and return its `TextFeatures`.
+
+    When a `KeywordMatcher` is given, its phrases are looked up in the
+    word tokens produced by the same scan.  Pass ``keep_tokens=False``
+    to drop the token list and sentence offsets once keyword hits have
+    been computed, e.g. when only aggregate counts are needed.
+    """
+    features = TextFeatures()
+    if not text:
+        if matcher is not None:
+            features.keyword_hits = {name: set() for name in matcher.groups}
+        return features
+
+    tokens = features.tokens
+    punctuation = features.punctuation
+    boundaries = features.sentence_boundaries
+    hashtags = features.hashtags
+    total_word_length = 0
+    long_word_count = 0
+    space_runs = 0
+    emoji_count = 0
+    words_in_sentence = False
+
+    for match in _TOKEN_RE.finditer(text):
+        kind = match.lastgroup
+        if kind == "word" or kind == "hashtag":
+            word = match.group()
+            if kind == "hashtag":
+                word = word[1:]
+                hashtags["#" + word] += 1
+            tokens.append(word.lower())
+            total_word_length += len(word)
+            long_word_count += len(word) > LONG_WORD_LENGTH
+            words_in_sentence = True
+        elif kind == "space":
+            space_runs += 1
+        elif kind == "punct":
+            char = match.group()
+            punctuation[char] += 1
+            if char in SENTENCE_TERMINATORS and words_in_sentence:
+                boundaries.append(match.end())
+                words_in_sentence = False
+        elif kind == "emoji":
+            emoji_count += 1
+            words_in_sentence = True
+
+    # A trailing sentence without a terminator still counts.
+    if words_in_sentence:
+        boundaries.append(len(text))
+
+    features.word_count = len(tokens)
+    features.total_word_length = total_word_length
+    features.long_word_count = long_word_count
+    features.emoji_count = emoji_count
+    features.sentence_count = len(boundaries)
+    # Equivalent to len(text.split()) without materializing the pieces.
+    features.whitespace_word_count = space_runs + 1 - text[0].isspace() - text[-1].isspace()
+    if matcher is not None:
+        features.keyword_hits = matcher.scan_tokens(tokens)
+    if not keep_tokens:
+        features.tokens = []
+        features.sentence_boundaries = []
+    return features
+
@@ -0,0 +1,301 @@
+"""
+Combinatorial generation of A/B test variations.
+
+A candidate variation combines the base content with one option from
+each axis: an opening hook, a call to action, an emoji density and a
+hashtag set.  The axes multiply into a candidate space of tens of
+thousands of variations; `VariationEngine.generate` ranks up to
+``AB_VARIATION_CANDIDATES`` of them and returns the best ``count``.
+
+Candidates are never materialised as text while ranking.  Every option
+is scanned once up front (keyword hits, word counts, punctuation), a
+candidate is just an index into the space, and its score is assembled
+from the precomputed parts:
+
+* the SEO score of the combined keyword hits and word count
+  (`SeoService.score`, the same rubric as ``/api/seo/analyze``);
+* a brand voice fit, when a brand profile is given: emoji use,
+  exclamations and questions matching the profile's communication
+  preferences, and overlap with the profile's own hashtags.
+
+The best candidates are kept in bounded heaps, one per hook so that the
+winners open differently where possible, and only the winners are
+rendered.  When the space is larger than the candidate budget, the
+indices ranked are a random sample drawn from a ``random.Random``
+seeded by the caller (by default from the content itself), so the same
+input always yields the same variations.
+"""
+
+import hashlib
+import heapq
+import os
+import random
+from functools import lru_cache
+from itertools import combinations
+from typing import Dict, FrozenSet, Iterator, List, Optional, Sequence, Tuple
+
+from services.seo_service import seo_service
+from services.text_features import extract_features
+
+HOOKS = (
+    "",
+    "Just listed!",
+    "Don't miss this one!",
+    "Looking for your next home in Windsor?",
+    "Fresh on the market in Windsor-Essex.",
+    "Your search might end here.",
+    "Open house this weekend!",
+    "Thinking of making a move?",
+)
+CTAS = (
+    "",
+    "DM me for details.",
+    "Contact me to book a private showing.",
+    "Call now!",
+    "Schedule a viewing today.",
+    "Learn more at the link in bio.",
+)
+EMOJI_DENSITIES = (0, 1, 2, 3)
+EMOJI = ("🏡", "🔑", "✨", "📍", "🎉", "👀")
+HASHTAG_POOL = (
+    "#WindsorRealEstate",
+    "#WindsorEssex",
+    "#YQG",
+    "#RealEstate",
+    "#HomeForSale",
+    "#DreamHome",
+)
+HASHTAG_SET_SIZES = (2, 3)
+# Largest hashtag pool combined into sets; C(8, 2) + C(8, 3) = 84 sets
+MAX_HASHTAG_POOL = 8
+# Most variations a single test may ask for
+MAX_VARIATIONS = 10
+# Keyword hits, words, exclamations and questions of combined parts
+_Combined = Tuple[Dict[str, FrozenSet[str]], int, int, int]
+
+
+class _Part:
+    """Precomputed scoring inputs of one option (hook, CTA, body or hashtag set)."""
+
+    __slots__ = ("text", "hits", "words", "exclamations", "questions", "hashtags")
+
+    def __init__(self, text: str) -> None:
+        features = extract_features(text, seo_service.matcher, keep_tokens=False)
+        self.text = text
+        self.hits: Dict[str, FrozenSet[str]] = {
+            name: frozenset(found) for name, found in features.keyword_hits.items()
+        }
+        self.words = features.whitespace_word_count
+        self.exclamations = features.exclamations
+        self.questions = features.questions
+        self.hashtags = tuple(features.hashtags)
+
+
+@lru_cache(maxsize=4096)
+def _option_part(text: str) -> _Part:
+    """Return the (shared, read-only) part of a hook, CTA or hashtag set."""
+    return _Part(text)
+
+
+class VariationEngine:
+    """Generate, score and select A/B test variations."""
+
+    def __init__(self, max_candidates: int = 10000) -> None:
+        self.max_candidates = max_candidates
+
+    def hashtag_sets(self, content_type: str, extra: Sequence[str] = ()) -> List[Tuple[str, ...]]:
+        """Return the hashtag sets to combine for ``content_type``.
+
+        ``extra`` hashtags (e.g. those already in the content, favoured by
+        the brand profile or related to it) come first in the pool, ahead
+        of the defaults.
+        """
+        pool: List[str] = []
+        for tag in (*extra, *HASHTAG_POOL, f"#{content_type}"):
+            if tag and tag.lower() not in {existing.lower() for existing in pool}:
+                pool.append(tag)
+        pool = pool[:MAX_HASHTAG_POOL]
+        return [tags for size in HASHTAG_SET_SIZES for tags in combinations(pool, size)]
+
+    def generate(
+        self,
+        content: str,
+        content_type: str = "general",
+        count: int = 2,
+        brand_profile: Optional[dict] = None,
+        seed: Optional[int] = None,
+        hashtag_sets: Optional[List[Tuple[str, ...]]] = None,
+        suggested_hashtags: Sequence[str] = (),
+        max_candidates: Optional[int] = None,
+    ) -> dict:
+        """Return the ``count`` best variations of ``content`` and how they were chosen.
+
+        Each variation has its rendered ``content``, ``hashtags``, total
+        ``score`` with its ``seo_score`` and ``brand_score`` parts, and
+        the ``options`` that produced it.  Hashtag sets are drawn from the
+        content's and profile's hashtags, then ``suggested_hashtags``
+        (e.g. from `services.hashtag_index`), then the default pool.
+        ``max_candidates`` lowers the ranking budget for this call.
+        """
+        count = max(1, min(count, MAX_VARIATIONS))
+        body = (content or "").strip()
+        if seed is None:
+            seed = int.from_bytes(hashlib.sha1(f"{content_type}\n{body}".encode()).digest()[:8], "big")
+        profile_tags = tuple((brand_profile or {}).get("hashtags") or ())
+        body_part = _Part(body)
+        if hashtag_sets is None:
+            hashtag_sets = self.hashtag_sets(
+                content_type, extra=(*body_part.hashtags, *profile_tags, *suggested_hashtags)
+            )
+        axes = (len(HOOKS), len(CTAS), len(EMOJI_DENSITIES), len(hashtag_sets))
+        space = axes[0] * axes[1] * axes[2] * axes[3]
+
+        tag_parts = [_option_part(" ".join(tags)) for tags in hashtag_sets]
+        # The union of a hook × CTA pair with the body is computed when a
+        # candidate first needs it; the pair's own union is shared by calls
+        pairs: Dict[Tuple[int, int], _Combined] = {}
+        fit = _BrandFit(brand_profile, profile_tags)
+        tag_overlap = [fit.hashtag_points(tags) for tags in hashtag_sets]
+
+        rng = random.Random(seed)
+        ranked = 0
+        # One bounded min-heap per hook, so the winners can open differently
+        heaps: List[List[Tuple[int, int, int, int, int]]] = [[] for _ in HOOKS]
+        budget = self.max_candidates if max_candidates is None else min(max_candidates, self.max_candidates)
+        for index in self._candidate_indices(space, rng, budget):
+            ranked += 1
+            rest, tag_index = divmod(index, axes[3])
+            rest, density_index = divmod(rest, axes[2])
+            hook_index, cta_index = divmod(rest, axes[1])
+            pair = pairs.get((hook_index, cta_index))
+            if pair is None:
+                pair = _with_body(body_part, _option_pair(HOOKS[hook_index], CTAS[cta_index]))
+                pairs[hook_index, cta_index] = pair
+            hits, words, exclamations, questions = pair
+            tags = tag_parts[tag_index]
+            density = EMOJI_DENSITIES[density_index]
+            if any(tags.hits.values()):
+                hits = {name: found | tags.hits.get(name, frozenset()) for name, found in hits.items()}
+            seo_score = seo_service.score(hits, words + tags.words + (density > 0))
+            brand_score = fit.score(density, exclamations, questions) + tag_overlap[tag_index]
+            # Ties are broken by a seeded hash of the index: varied across
+            # seeds, reproducible for one
+            entry = (seo_score + brand_score, _tiebreak(seed, index), index, seo_score, brand_score)
+            heap = heaps[hook_index]
+            if len(heap) < count:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+
+        # The best candidate of each hook first, then the best of the rest
+        ranked_heaps = [sorted(heap, reverse=True) for heap in heaps if heap]
+        leaders = sorted((heap[0] for heap in ranked_heaps), reverse=True)[:count]
+        if len(leaders) < count:
+            rest = sorted((entry for heap in ranked_heaps for entry in heap[1:]), reverse=True)
+            leaders += rest[: count - len(leaders)]
+
+        variations = []
+        for total, _, index, seo_score, brand_score in leaders:
+            rest, tag_index = divmod(index, axes[3])
+            rest, density_index = divmod(rest, axes[2])
+            hook_index, cta_index = divmod(rest, axes[1])
+            variations.append(
+                self._render(
+                    body, HOOKS[hook_index], CTAS[cta_index], EMOJI_DENSITIES[density_index],
+                    hashtag_sets[tag_index], random.Random(seed ^ index),
+                )
+                | {
+                    "score": total,
+                    "seo_score": seo_score,
+                    "brand_score": brand_score,
+                }
+            )
+        return {"seed": seed, "candidate_space": space, "candidates_ranked": ranked, "variations": variations}
+
+    @staticmethod
+    def _candidate_indices(space: int, rng: random.Random, budget: int) -> Iterator[int]:
+        if space <= budget:
+            return iter(range(space))
+        # Sampling from a range object draws indices without building the space
+        return iter(rng.sample(range(space), budget))
+
+    @staticmethod
+    def _render(
+        body: str, hook: str, cta: str, density: int, hashtags: Tuple[str, ...], rng: random.Random
+    ) -> dict:
+        text = f"{hook} {body}" if hook and body else hook or body
+        if cta:
+            text = f"{text}\n\n{cta}" if text else cta
+        if density:
+            text = f"{text} {''.join(rng.sample(EMOJI, density))}"
+        return {
+            "content": text,
+            "hashtags": list(hashtags),
+            "options": {"hook": hook, "cta": cta, "emoji_count": density, "hashtags": list(hashtags)},
+        }
+
+
+def _tiebreak(seed: int, index: int) -> int:
+    return ((index + 1) * 0x9E3779B97F4A7C15 ^ seed) & 0xFFFFFFFFFFFFFFFF
+
+
+@lru_cache(maxsize=1024)
+def _option_pair(hook: str, cta: str) -> _Combined:
+    """Return the combined scoring inputs of a hook and a CTA (shared, read-only)."""
+    return _combine(_option_part(hook), _option_part(cta))
+
+
+def _with_body(body: _Part, pair: _Combined) -> _Combined:
+    hits, words, exclamations, questions = pair
+    if any(body.hits.values()):
+        hits = {name: found | body.hits.get(name, frozenset()) for name, found in hits.items()}
+    return hits, words + body.words, exclamations + body.exclamations, questions + body.questions
+
+
+def _combine(*parts: _Part) -> _Combined:
+    hits: Dict[str, FrozenSet[str]] = {}
+    for part in parts:
+        for name, found in part.hits.items():
+            hits[name] = hits.get(name, frozenset()) | found
+    return (
+        hits,
+        sum(part.words for part in parts),
+        sum(part.exclamations for part in parts),
+        sum(part.questions for part in parts),
+    )
+
+
+class _BrandFit:
+    """Score how well a candidate's style matches a brand profile (0 to 30 points)."""
+
+    def __init__(self, brand_profile: Optional[dict], profile_tags: Sequence[str]) -> None:
+        preferences = (brand_profile or {}).get("communication_preferences") or {}
+        self.enabled = bool(brand_profile)
+        self.uses_emojis = bool(preferences.get("uses_emojis"))
+        self.uses_exclamations = bool(preferences.get("uses_exclamations"))
+        self.uses_questions = bool(preferences.get("uses_questions"))
+        self.profile_tags = {tag.lower() for tag in profile_tags}
+
+    def score(self, density: int, exclamations: int, questions: int) -> int:
+        if not self.enabled:
+            return 0
+        points = 0
+        # 1. Emoji use (Max 10 points): some emoji, not many, if the brand uses them
+        if self.uses_emojis:
+            points += 10 if density in (1, 2) else 5 if density else 0
+        else:
+            points += 10 if not density else 0
+        # 2. Punctuation (Max 10 points)
+        points += 5 if (exclamations > 0) == self.uses_exclamations else 0
+        points += 5 if (questions > 0) == self.uses_questions else 0
+        return points
+
+    def hashtag_points(self, hashtags: Sequence[str]) -> int:
+        # 3. Familiar hashtags (Max 10 points)
+        if not self.enabled:
+            return 0
+        return min(5 * sum(tag.lower() in self.profile_tags for tag in hashtags), 10)
+
+
+# Singleton instance
+variation_engine = VariationEngine(max_candidates=int(os.environ.get("AB_VARIATION_CANDIDATES", 10000)))
@@ -0,0 +1,334 @@
+"""
+Scheduled ingestion of WECAR monthly market statistics.
+
+`parse_wecar_report` extracts monthly figures from WECAR report HTML,
+either from a statistics table (one row per month) or from the prose of
+a monthly news release.  `WecarIngestionService` fetches the report from
+``WECAR_REPORT_SOURCE`` (a URL or a local file, such as the fixtures in
+``fixtures/wecar/``), parses it and upserts one `MarketStat` row per
+month.
+
+Ingestion runs only from the background scheduler (every
+``WECAR_INGEST_INTERVAL`` seconds; disabled when ``0`` or when no source
+is configured) or from the ``flask wecar-ingest`` command, never from a
+request.  The scheduler
+skips a cycle when another worker has ingested within the interval, so
+running several gunicorn workers does not multiply the scrapes.  Each
+worker starts its scheduler on its first request, so neither a
+preloading gunicorn master, the CLI nor processes forked for other work
+(such as corpus analysis) run one.
+"""
+
+import os
+import re
+import threading
+from datetime import date, datetime, timedelta
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
+
+import click
+from sqlalchemy import func, select
+
+from models.market_data import MarketStat
+from models.social_media import db
+from services.wecar_market_service import STAT_FIELDS, WECAR_SOURCE, wecar_market_service
+
+if TYPE_CHECKING:  # bs4 and requests are imported on first use to keep startup fast
+    from bs4 import BeautifulSoup
+
+FETCH_TIMEOUT = 30
+
+_MONTHS = {
+    name: index
+    for index in range(1, 13)
+    for name in (
+        date(2000, index, 1).strftime("%B").lower(),
+        date(2000, index, 1).strftime("%b").lower(),
+    )
+}
+_PERIOD_RE = re.compile(
+    r"\b(?P<month>" + "|".join(sorted(_MONTHS, key=len, reverse=True)) + r")\.?\s+(?P<year>(?:19|20)\d{2})\b"
+    r"|\b(?P<iso_year>(?:19|20)\d{2})-(?P<iso_month>0?[1-9]|1[0-2])\b",
+    re.IGNORECASE,
+)
+_NUMBER_RE = re.compile(r"\$?\s*(\d[\d,]*(?:\.\d+)?)")
+
+# Table header keywords per field; headers mentioning a change are skipped
+_HEADER_KEYWORDS = (
+    ("period", ("month", "period")),
+    ("new_listings", ("new listing", "listings")),
+    ("average_price", ("average", "avg")),
+    ("properties_sold", ("sales", "sold", "units")),
+)
+_CHANGE_WORDS = ("change", "%", "y/y", "yoy", "m/m")
+
+# Sentence patterns for news-release style reports
+_RELEASE_PATTERNS = {
+    "properties_sold": re.compile(
+        r"(\d[\d,]*)\s+(?:properties|homes|units|residential\s+units|sales)\s+(?:were\s+)?sold", re.I
+    ),
+    "new_listings": re.compile(r"(\d[\d,]*)\s+new\s+listings", re.I),
+    "average_price": re.compile(
+        r"average\s+(?:sale\s+|sales\s+|selling\s+)?price\s+(?:was|of|reached|rose\s+to|fell\s+to)?\s*\$\s*(\d[\d,]*)",
+        re.I,
+    ),
+}
+
+
+def parse_period(text: str) -> Optional[date]:
+    """Return the first month mentioned in ``text`` as the first day of that month."""
+    match = _PERIOD_RE.search(text or "")
+    if not match:
+        return None
+    if match.group("month"):
+        return date(int(match.group("year")), _MONTHS[match.group("month").lower()], 1)
+    return date(int(match.group("iso_year")), int(match.group("iso_month")), 1)
+
+
+def parse_number(text: str) -> Optional[int]:
+    """Return the first number in ``text`` (ignoring ``$`` and thousands separators)."""
+    match = _NUMBER_RE.search(text or "")
+    if not match:
+        return None
+    return int(round(float(match.group(1).replace(",", ""))))
+
+
+def _column_map(headers: List[str]) -> Dict[str, int]:
+    columns: Dict[str, int] = {}
+    for position, header in enumerate(headers):
+        header = header.lower()
+        if any(word in header for word in _CHANGE_WORDS):
+            continue
+        for field, keywords in _HEADER_KEYWORDS:
+            if field not in columns and any(keyword in header for keyword in keywords):
+                columns[field] = position
+                break
+    return columns
+
+
+def _parse_tables(soup: "BeautifulSoup") -> List[dict]:
+    stats = []
+    for table in soup.find_all("table"):
+        rows = table.find_all("tr")
+        if not rows:
+            continue
+        headers = [cell.get_text(" ", strip=True) for cell in rows[0].find_all(["th", "td"])]
+        columns = _column_map(headers)
+        if "period" not in columns or not any(field in columns for field in STAT_FIELDS):
+            continue
+        for row in rows[1:]:
+            cells = [cell.get_text(" ", strip=True) for cell in row.find_all(["th", "td"])]
+            if len(cells) <= columns["period"]:
+                continue
+            period = parse_period(cells[columns["period"]])
+            if period is None:
+                continue
+            entry = {"period": period}
+            for field in STAT_FIELDS:
+                position = columns.get(field)
+                entry[field] = parse_number(cells[position]) if position is not None and position < len(cells) else None
+            stats.append(entry)
+    return stats
+
+
+def _parse_release(soup: "BeautifulSoup") -> List[dict]:
+    container = soup.find("article") or soup.body or soup
+    text = container.get_text(" ", strip=True)
+    heading = soup.find(["h1", "title"])
+    period = parse_period(heading.get_text(" ", strip=True) if heading else "") or parse_period(text)
+    if period is None:
+        return []
+    entry = {"period": period}
+    for field, pattern in _RELEASE_PATTERNS.items():
+        match = pattern.search(text)
+        entry[field] = parse_number(match.group(1)) if match else None
+    if all(entry[field] is None for field in STAT_FIELDS):
+        return []
+    return [entry]
+
+
+def parse_wecar_report(html: str) -> List[dict]:
+    """Return ``{"period", "new_listings", "properties_sold", "average_price"}`` per month.
+
+    Statistics tables are preferred; a news release is parsed only when
+    the page has no usable table.  Later rows for the same month win.
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    stats = _parse_tables(soup) or _parse_release(soup)
+    by_period = {entry["period"]: entry for entry in stats}
+    return [by_period[period] for period in sorted(by_period)]
+
+
+class WecarIngestionService:
+    """Fetch, parse and store WECAR statistics on a schedule."""
+
+    def __init__(self, source: str = "", interval: float = 0.0) -> None:
+        self.source = source
+        self.interval = interval
+        self.app = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_pid: Optional[int] = None
+        self.last_run: Optional[dict] = None
+
+    def init_app(self, app) -> None:
+        """Register the ``wecar-ingest`` command and, if enabled, the scheduler.
+
+        The scheduler starts on the worker's first request, not here.
+        """
+        self.app = app
+        app.cli.add_command(wecar_ingest_command)
+        if self.interval > 0 and self.source:
+            app.before_request(self._ensure_scheduler)
+
+    def fetch(self, source: Optional[str] = None) -> str:
+        """Return the report HTML from a URL or a local file path."""
+        source = source or self.source
+        if not source:
+            raise ValueError("No report source given and WECAR_REPORT_SOURCE is not set")
+        if source.startswith(("http://", "https://")):
+            import requests
+
+            response = requests.get(
+                source, timeout=FETCH_TIMEOUT, headers={"User-Agent": "intelligent-marketing-platform"}
+            )
+            response.raise_for_status()
+            return response.text
+        with open(source.removeprefix("file://"), encoding="utf-8") as handle:
+            return handle.read()
+
+    def ingest(self, source: Optional[str] = None, html: Optional[str] = None) -> dict:
+        """Fetch (unless ``html`` is given), parse and upsert one report.
+
+        Must be called inside an application context.
+        """
+        with self._lock:
+            source = source or self.source
+            stats = parse_wecar_report(html if html is not None else self.fetch(source))
+            upserted = self.upsert(stats)
+            self.last_run = {
+                "source": source,
+                "parsed": len(stats),
+                "upserted": upserted,
+                "periods": [entry["period"].strftime("%Y-%m") for entry in stats],
+                "finished_at": datetime.utcnow().isoformat(),
+            }
+        wecar_market_service.invalidate()
+        return self.last_run
+
+    def upsert(self, stats: Iterable[dict], source: str = WECAR_SOURCE) -> int:
+        """Insert or update one `MarketStat` per month; return the rows written."""
+        now = datetime.utcnow()
+        rows = [
+            {"source": source, "period": entry["period"], "fetched_at": now,
+             **{field: entry.get(field) for field in STAT_FIELDS}}
+            for entry in stats
+        ]
+        if not rows:
+            return 0
+        dialect = db.session.get_bind().dialect.name
+        try:
+            if dialect in ("sqlite", "postgresql"):
+                if dialect == "sqlite":
+                    from sqlalchemy.dialects.sqlite import insert
+                else:
+                    from sqlalchemy.dialects.postgresql import insert
+                stmt = insert(MarketStat).values(rows)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=["source", "period"],
+                    # Keep previously parsed values when a report omits a field
+                    set_={
+                        **{field: func.coalesce(stmt.excluded[field], MarketStat.__table__.c[field])
+                           for field in STAT_FIELDS},
+                        "fetched_at": stmt.excluded.fetched_at,
+                    },
+                )
+                db.session.execute(stmt)
+            else:
+                existing = {
+                    stat.period: stat
+                    for stat in MarketStat.query.filter(
+                        MarketStat.source == source,
+                        MarketStat.period.in_([row["period"] for row in rows]),
+                    ).with_for_update()
+                }
+                for row in rows:
+                    stat = existing.get(row["period"])
+                    if stat is None:
+                        db.session.add(MarketStat(**row))
+                        continue
+                    for field in STAT_FIELDS:
+                        if row[field] is not None:
+                            setattr(stat, field, row[field])
+                    stat.fetched_at = now
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return len(rows)
+
+    def is_due(self) -> bool:
+        """Return whether no worker has ingested within the last interval."""
+        last = db.session.scalar(
+            select(func.max(MarketStat.fetched_at)).where(MarketStat.source == WECAR_SOURCE)
+        )
+        return last is None or datetime.utcnow() - last >= timedelta(seconds=self.interval)
+
+    def start(self) -> None:
+        """Run the scheduler in this process, unless it already is."""
+        with self._start_lock:
+            if self._running():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="wecar-ingest", daemon=True)
+            self._thread_pid = os.getpid()
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _running(self) -> bool:
+        # A thread started before a fork does not exist in the child
+        return self._thread is not None and self._thread_pid == os.getpid() and self._thread.is_alive()
+
+    def _ensure_scheduler(self) -> None:
+        # ``before_request`` hook; a stopped scheduler stays stopped
+        if not self._running() and not self._stop.is_set():
+            self.start()
+
+    def stats(self) -> dict:
+        return {
+            "source": self.source,
+            "interval_seconds": self.interval,
+            "scheduler_running": self._running(),
+            "last_run": self.last_run,
+        }
+
+    def _run(self) -> None:
+        delay = 0.0
+        while not self._stop.wait(delay):
+            delay = self.interval
+            try:
+                with self.app.app_context():
+                    if self.is_due():
+                        self.ingest()
+            except Exception as e:
+                print(f"WECAR ingestion failed: {e}")
+
+
+@click.command("wecar-ingest")
+@click.option("--source", default=None, help="Report URL or local HTML file (defaults to WECAR_REPORT_SOURCE).")
+def wecar_ingest_command(source):
+    """Fetch the WECAR report once and store its monthly statistics."""
+    result = wecar_ingestion_service.ingest(source)
+    click.echo(f"Parsed {result['parsed']} month(s), upserted {result['upserted']} from {result['source']}")
+
+
+# Singleton instance
+wecar_ingestion_service = WecarIngestionService(
+    source=os.environ.get("WECAR_REPORT_SOURCE", ""),
+    interval=float(os.environ.get("WECAR_INGEST_INTERVAL", 0)),
+)
@@ -1,61 +1,256 @@
 """
-WECAR market data service (simplified).
+WECAR market data service.
 
-The original project scraped statistics from the Windsor‑Essex County
-Association of REALTORS (WECAR) website.  Network access may not be
-available during deployment, so this service instead returns static
-sample data and simple trends.  You can replace the placeholders with
-real scraping logic when network access is permitted.
+Serves Windsor-Essex real-estate statistics from the `MarketStat` table,
+which `WecarIngestionService` fills in the background from WECAR
+reports.  Reads never fetch anything from WECAR; until the first report
+has been ingested there is simply no data.
+
+The current snapshot is cached with stale-while-revalidate semantics:
+within ``WECAR_CACHE_TTL`` seconds the cached copy is served as is, and
+for a further ``WECAR_CACHE_MAX_STALE`` seconds it is served stale while
+one background refresh runs.  Trend ranges are cached per ``(from, to,
+window)`` for the same TTL.  Both are also published to the host-wide
+`shared_cache`, so only one worker per TTL reads them from the database.
+Each payload carries an ETag derived from its content (ignoring fetch
+timestamps) so HTTP caches can revalidate it.
 """
 
-from datetime import datetime
-from typing import Dict, List
+import hashlib
+import json
+import os
+from collections import deque
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+
+from models.market_data import MarketStat
+from models.social_media import db
+from services.cache import StaleWhileRevalidate, TTLCache
+from services.shared_cache import shared_cache
+
+WECAR_SOURCE = "WECAR"
+STAT_FIELDS = ("new_listings", "properties_sold", "average_price")
+# Months returned by /market-trends when no range is given
+DEFAULT_TREND_MONTHS = 6
+MAX_TREND_WINDOW = 24
+# Sales-to-new-listings ratios bounding a balanced market
+BUYERS_MARKET_RATIO = 0.4
+SELLERS_MARKET_RATIO = 0.6
+
+# Fields that change on every fetch without the statistics changing
+_VOLATILE_FIELDS = ("last_updated",)
+
+
+def content_etag(payload) -> str:
+    """Return a stable ETag for a JSON-serialisable payload."""
+    if isinstance(payload, dict):
+        payload = {k: v for k, v in payload.items() if k not in _VOLATILE_FIELDS}
+    digest = hashlib.sha1(
+        json.dumps(payload, sort_keys=True, default=str).encode()
+    ).hexdigest()
+    return digest[:16]
+
+
+def add_months(month: date, count: int) -> date:
+    """Return the first day of the month ``count`` months after ``month``."""
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _percent_change(current: Optional[int], previous: Optional[int]) -> Optional[str]:
+    if not current or not previous:
+        return None
+    return f"{(current - previous) / previous * 100:+.1f}%"
 
 
 class WecarMarketService:
     """Provide real‑estate market statistics and trends for Windsor‑Essex."""
 
-    def get_market_data(self) -> Dict:
-        """Return current market statistics.  Placeholder implementation."""
-        # Example data; in a real implementation this would be scraped from
-        # the WECAR website and cached
+    def __init__(self, ttl: float = 3600.0, max_stale: float = 86400.0) -> None:
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.app = None
+        self._market_cache = StaleWhileRevalidate(self._load_market_data, ttl, max_stale)
+        self._trends_cache = TTLCache(maxsize=256, ttl=ttl)
+
+    def init_app(self, app) -> None:
+        """Bind the service to a Flask app so background refreshes can query the database."""
+        self.app = app
+
+    def get_market_data(self) -> Tuple[Optional[Dict], str]:
+        """Return the latest monthly statistics (``None`` before any ingestion) and their ETag.
+
+        Both come from one cache read, so the ETag always describes the
+        payload returned with it.
+        """
+        data, etag = self._market_cache.get()
+        if data is None:
+            # Nothing ingested yet; look again on the next read rather than
+            # caching the empty state for a full TTL
+            self._market_cache.invalidate(drop=True)
+        return data, etag
+
+    def get_trends(
+        self, start: Optional[date] = None, end: Optional[date] = None, window: int = 1
+    ) -> Tuple[List[Dict], str]:
+        """Return monthly statistics between ``start`` and ``end`` and their ETag.
+
+        ``end`` defaults to the latest ingested month and ``start`` to
+        `DEFAULT_TREND_MONTHS` months before it.  With ``window`` > 1 every
+        month also carries the rolling average of the preceding ``window``
+        calendar months (fewer where months are missing).
+        """
+        key = (start, end, window)
+        result = self._trends_cache.get_or_set(
+            key,
+            lambda: self._shared(
+                f"market:trends:{start}:{end}:{window}",
+                lambda: self._fetch_trends(start, end, window),
+            ),
+        )
+        if not result[0]:
+            self._trends_cache.invalidate(key)
+        return result
+
+    def get_historical_trends(self) -> List[Dict]:
+        """Return the default trend range."""
+        return self.get_trends()[0]
+
+    def invalidate(self) -> None:
+        """Make the next reads pick up newly ingested statistics."""
+        self._market_cache.invalidate(drop=True)
+        self._trends_cache.clear()
+        shared_cache.delete_prefix("market:")
+
+    def cache_stats(self) -> Dict:
+        return {"market_data": self._market_cache.stats(), "trends": self._trends_cache.stats()}
+
+    @staticmethod
+    def _with_etag(payload) -> Tuple[object, str]:
+        return payload, content_etag(payload)
+
+    def _load_market_data(self) -> Tuple[Optional[Dict], str]:
+        return self._shared("market:current", lambda: self._in_app_context(self._fetch_market_data))
+
+    def _shared(self, key: str, fetch) -> Tuple[object, str]:
+        """Return ``fetch()`` with its ETag, reusing another worker's result while fresh."""
+        cached = shared_cache.get(key, max_age=self.ttl)
+        if cached is not None:
+            return tuple(cached)
+        result = self._with_etag(fetch())
+        if result[0]:
+            shared_cache.set(key, result, ttl=self.ttl)
+        return result
+
+    def _in_app_context(self, load):
+        # Background refreshes run outside any request
+        if self.app is None:
+            return load()
+        with self.app.app_context():
+            return load()
+
+    def _fetch_market_data(self) -> Optional[Dict]:
+        latest = (
+            MarketStat.query.filter_by(source=WECAR_SOURCE)
+            .order_by(MarketStat.period.desc())
+            .first()
+        )
+        if latest is None:
+            return None
+        # WECAR reports changes year over year
+        previous = MarketStat.query.filter_by(
+            source=WECAR_SOURCE, period=add_months(latest.period, -12)
+        ).first()
+        changes = {
+            f"{field}_change": _percent_change(
+                getattr(latest, field), getattr(previous, field) if previous else None
+            )
+            for field in STAT_FIELDS
+        }
         return {
-            "source": "WECAR",
-            "report_period": datetime.utcnow().strftime("%B %Y"),
-            "new_listings": 1200,
-            "properties_sold": 450,
-            "average_price": 550000,
-            "new_listings_change": "+5%",
-            "properties_sold_change": "-3%",
-            "average_price_change": "+2%",
-            "market_insights": {
-                "market_trend": "rising",
-                "buyer_market": False,
-                "seller_market": True,
-                "key_points": [
-                    "Home prices increased by 2% year‑over‑year",
-                    "Low inventory levels favor sellers",
-                ],
-            },
+            "source": WECAR_SOURCE,
+            "report_period": latest.period.strftime("%B %Y"),
+            "period": latest.period.strftime("%Y-%m"),
+            "new_listings": latest.new_listings,
+            "properties_sold": latest.properties_sold,
+            "average_price": latest.average_price,
+            **changes,
+            "market_insights": self._insights(latest, changes["average_price_change"]),
             "status": "success",
-            "last_updated": datetime.utcnow().isoformat(),
+            "last_updated": latest.fetched_at.isoformat(),
         }
 
-    def get_historical_trends(self) -> List[Dict]:
-        """Return simplified historical market trends for demonstration."""
-        current_year = datetime.utcnow().year
-        trends = []
-        for month in range(1, 7):  # Last six months
-            trends.append(
-                {
-                    "month": datetime(current_year, month, 1).strftime("%B %Y"),
-                    "new_listings": 1000 + month * 20,
-                    "properties_sold": 400 + month * 15,
-                    "average_price": 525000 + month * 3000,
-                }
+    @staticmethod
+    def _insights(latest: MarketStat, price_change: Optional[str]) -> Dict:
+        key_points = []
+        trend = "stable"
+        if price_change is not None:
+            change = float(price_change.rstrip("%"))
+            trend = "rising" if change > 1 else "falling" if change < -1 else "stable"
+            direction = "increased" if change >= 0 else "decreased"
+            key_points.append(f"Average price {direction} by {abs(change):.1f}% year-over-year")
+        ratio = (
+            latest.properties_sold / latest.new_listings
+            if latest.properties_sold is not None and latest.new_listings
+            else None
+        )
+        if ratio is not None:
+            market = (
+                "seller's" if ratio > SELLERS_MARKET_RATIO
+                else "buyer's" if ratio < BUYERS_MARKET_RATIO
+                else "balanced"
+            )
+            key_points.append(f"Sales-to-new-listings ratio of {ratio:.0%} indicates a {market} market")
+        return {
+            "market_trend": trend,
+            "buyer_market": ratio is not None and ratio < BUYERS_MARKET_RATIO,
+            "seller_market": ratio is not None and ratio > SELLERS_MARKET_RATIO,
+            "sales_to_new_listings_ratio": round(ratio, 3) if ratio is not None else None,
+            "key_points": key_points,
+        }
+
+    def _fetch_trends(self, start: Optional[date], end: Optional[date], window: int) -> List[Dict]:
+        if end is None:
+            end = db.session.scalar(
+                select(func.max(MarketStat.period)).where(MarketStat.source == WECAR_SOURCE)
             )
+            if end is None:
+                return []
+        if start is None:
+            start = add_months(end, -(DEFAULT_TREND_MONTHS - 1))
+        # Read back far enough to fill the first month's window
+        rows = (
+            MarketStat.query.filter(
+                MarketStat.source == WECAR_SOURCE,
+                MarketStat.period.between(add_months(start, -(window - 1)), end),
+            )
+            .order_by(MarketStat.period)
+            .all()
+        )
+        trends = []
+        recent: deque = deque()
+        for row in rows:
+            recent.append(row)
+            while recent[0].period < add_months(row.period, -(window - 1)):
+                recent.popleft()
+            if row.period < start:
+                continue
+            entry = row.to_dict()
+            if window > 1:
+                averages = {}
+                for field in STAT_FIELDS:
+                    values = [getattr(stat, field) for stat in recent if getattr(stat, field) is not None]
+                    averages[field] = round(sum(values) / len(values)) if values else None
+                entry["rolling_average"] = averages
+                entry["rolling_months"] = len(recent)
+            trends.append(entry)
         return trends
 
 
 # Singleton instance
-wecar_market_service = WecarMarketService()
+wecar_market_service = WecarMarketService(
+    ttl=float(os.environ.get("WECAR_CACHE_TTL", 3600)),
+    max_stale=float(os.environ.get("WECAR_CACHE_MAX_STALE", 86400)),
+)
@@ -37,12 +37,12 @@ document.addEventListener('DOMContentLoaded', function() {
             // Method 3: Use most recent test ID as fallback
             if (!testId) {
                 // Fetch all tests and use the most recent one
-                fetch('/api/ab-testing/tests')
+                fetch('/api/ab-testing/tests?order=desc&limit=1&summary=true')
                     .then(response => response.json())
                     .then(data => {
                         if (data.success && data.tests && data.tests.length > 0) {
                             // Use the most recent test
-                            testId = data.tests[data.tests.length - 1].id;
+                            testId = data.tests[0].id;
                             loadTestResults(testId);
                         } else {
                             alert('No tests found. Please create a test first.');
@@ -71,15 +71,15 @@ document.addEventListener('DOMContentLoaded', function() {
             // Show loading
             showLoading('Loading Active Tests...');
             
-            // Fetch active tests
-            fetch('/api/ab-testing/tests')
-                .then(response => response.json())
+            // Fetch the first page of active tests, newest first; further
+            // pages are only loaded when asked for
+            fetchTestsPage(null)
                 .then(data => {
                     hideLoading();
                     console.log('✅ Active tests data:', data);
                     
                     if (data.success && data.tests) {
-                        showActiveTestsList(data.tests);
+                        showActiveTestsList(data.tests, data.next_cursor);
                     } else {
                         alert('Error loading active tests: ' + (data.error || 'Unknown error'));
                     }
@@ -92,6 +92,51 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
     
+    // Tests listed per page; summaries leave out the variation bodies
+    const TESTS_PAGE_SIZE = 50;
+    let testsShown = 0;
+    let nextTestsCursor = null;
+    
+    // Fetch one page of test summaries after the given cursor
+    function fetchTestsPage(cursor) {
+        let url = `/api/ab-testing/tests?order=desc&summary=true&limit=${TESTS_PAGE_SIZE}`;
+        if (cursor) {
+            url += '&cursor=' + encodeURIComponent(cursor);
+        }
+        return fetch(url).then(response => response.json());
+    }
+    
+    // Append the next page of tests to the open list
+    function loadMoreTests(button) {
+        if (!nextTestsCursor) return;
+        button.disabled = true;
+        button.textContent = 'Loading...';
+        fetchTestsPage(nextTestsCursor)
+            .then(data => {
+                if (!data.success || !data.tests) {
+                    throw new Error(data.error || 'Unknown error');
+                }
+                const list = document.getElementById('active-tests-list');
+                if (!list) return;
+                list.insertAdjacentHTML('beforeend', data.tests.map((test, index) => testCardHTML(test, testsShown + index)).join(''));
+                testsShown += data.tests.length;
+                nextTestsCursor = data.next_cursor;
+                document.getElementById('active-tests-count').textContent = `Tests shown: ${testsShown}`;
+                if (nextTestsCursor) {
+                    button.disabled = false;
+                    button.textContent = 'Load More';
+                } else {
+                    button.remove();
+                }
+            })
+            .catch(error => {
+                console.error('❌ Error:', error);
+                button.disabled = false;
+                button.textContent = 'Load More';
+                alert('Error loading more tests: ' + error.message);
+            });
+    }
+    
     // Function to load test results
     function loadTestResults(testId) {
         console.log('📡 Fetching results for:', testId);
@@ -232,45 +277,52 @@ document.addEventListener('DOMContentLoaded', function() {
         document.body.insertAdjacentHTML('beforeend', modalHTML);
     }
     
+    // One test card in the active tests list
+    function testCardHTML(test, index) {
+        return `
+            <div style="border:2px solid #e9ecef;padding:20px;margin:15px 0;border-radius:8px;background:#f8f9fa;transition:transform 0.2s ease;" onmouseover="this.style.transform='translateY(-2px)'" onmouseout="this.style.transform='translateY(0)'">
+                <div style="display:flex;justify-content:space-between;align-items:center;margin-bottom:15px;">
+                    <h4 style="color:#007bff;margin:0;font-size:18px;display:flex;align-items:center;">
+                        <span style="background:#007bff;color:white;width:30px;height:30px;border-radius:50%;display:flex;align-items:center;justify-content:center;margin-right:10px;font-size:14px;">${index + 1}</span>
+                        ${test.name || 'Unnamed Test'}
+                    </h4>
+                    <span style="background:${test.status === 'running' ? '#28a745' : '#6c757d'};color:white;padding:4px 12px;border-radius:12px;font-size:12px;text-transform:uppercase;">
+                        ${test.status || 'created'}
+                    </span>
+                </div>
+                
+                <div style="margin:10px 0;">
+                    <p style="color:#666;margin:5px 0;font-size:14px;">
+                        <strong>Platform:</strong> ${test.platform || 'instagram'}
+                    </p>
+                    <p style="color:#666;margin:5px 0;font-size:14px;">
+                        <strong>Test Type:</strong> ${test.test_type || 'content optimization'}
+                    </p>
+                    <p style="color:#666;margin:5px 0;font-size:14px;">
+                        <strong>Created:</strong> ${test.created_at ? new Date(test.created_at).toLocaleDateString() : 'Unknown'}
+                    </p>
+                    <p style="color:#999;margin:5px 0;font-size:12px;font-family:monospace;">
+                        <strong>ID:</strong> ${test.id}
+                    </p>
+                </div>
+                
+                <div style="margin-top:15px;">
+                    <button onclick="loadTestResults('${test.id}')" style="background:#007bff;color:white;border:none;padding:8px 16px;border-radius:4px;cursor:pointer;margin-right:10px;font-size:14px;transition:background 0.2s;">📊 View Results</button>
+                    <button onclick="copyTestId('${test.id}')" style="background:#17a2b8;color:white;border:none;padding:8px 16px;border-radius:4px;cursor:pointer;font-size:14px;transition:background 0.2s;">📋 Copy ID</button>
+                </div>
+            </div>
+        `;
+    }
+    
     // Show active tests list
-    function showActiveTestsList(tests) {
+    function showActiveTestsList(tests, nextCursor) {
         removeModals();
+        testsShown = tests ? tests.length : 0;
+        nextTestsCursor = nextCursor || null;
         
         let testsHTML = '';
         if (tests && tests.length > 0) {
-            testsHTML = tests.map((test, index) => `
-                <div style="border:2px solid #e9ecef;padding:20px;margin:15px 0;border-radius:8px;background:#f8f9fa;transition:transform 0.2s ease;" onmouseover="this.style.transform='translateY(-2px)'" onmouseout="this.style.transform='translateY(0)'">
-                    <div style="display:flex;justify-content:space-between;align-items:center;margin-bottom:15px;">
-                        <h4 style="color:#007bff;margin:0;font-size:18px;display:flex;align-items:center;">
-                            <span style="background:#007bff;color:white;width:30px;height:30px;border-radius:50%;display:flex;align-items:center;justify-content:center;margin-right:10px;font-size:14px;">${index + 1}</span>
-                            ${test.name || 'Unnamed Test'}
-                        </h4>
-                        <span style="background:${test.status === 'running' ? '#28a745' : '#6c757d'};color:white;padding:4px 12px;border-radius:12px;font-size:12px;text-transform:uppercase;">
-                            ${test.status || 'created'}
-                        </span>
-                    </div>
-                    
-                    <div style="margin:10px 0;">
-                        <p style="color:#666;margin:5px 0;font-size:14px;">
-                            <strong>Platform:</strong> ${test.platform || 'instagram'}
-                        </p>
-                        <p style="color:#666;margin:5px 0;font-size:14px;">
-                            <strong>Test Type:</strong> ${test.test_type || 'content optimization'}
-                        </p>
-                        <p style="color:#666;margin:5px 0;font-size:14px;">
-                            <strong>Created:</strong> ${test.created_at ? new Date(test.created_at).toLocaleDateString() : 'Unknown'}
-                        </p>
-                        <p style="color:#999;margin:5px 0;font-size:12px;font-family:monospace;">
-                            <strong>ID:</strong> ${test.id}
-                        </p>
-                    </div>
-                    
-                    <div style="margin-top:15px;">
-                        <button onclick="loadTestResults('${test.id}')" style="background:#007bff;color:white;border:none;padding:8px 16px;border-radius:4px;cursor:pointer;margin-right:10px;font-size:14px;transition:background 0.2s;">📊 View Results</button>
-                        <button onclick="copyTestId('${test.id}')" style="background:#17a2b8;color:white;border:none;padding:8px 16px;border-radius:4px;cursor:pointer;font-size:14px;transition:background 0.2s;">📋 Copy ID</button>
-                    </div>
-                </div>
-            `).join('');
+            testsHTML = tests.map((test, index) => testCardHTML(test, index)).join('');
         } else {
             testsHTML = `
                 <div style="text-align:center;padding:40px;color:#666;">
@@ -295,14 +347,20 @@ document.addEventListener('DOMContentLoaded', function() {
                     <div style="margin-bottom:20px;padding:15px;background:#f8f9fa;border-radius:8px;">
                         <p style="color:#666;margin:0;display:flex;align-items:center;">
                             <span style="margin-right:8px;">📊</span>
-                            <strong>Total Tests: ${tests ? tests.length : 0}</strong>
+                            <strong id="active-tests-count">Tests shown: ${testsShown}</strong>
                         </p>
                     </div>
                     
-                    <div style="max-height:60vh;overflow-y:auto;">
+                    <div id="active-tests-list" style="max-height:60vh;overflow-y:auto;">
                         ${testsHTML}
                     </div>
                     
+                    ${nextTestsCursor ? `
+                    <div style="text-align:center;margin-top:15px;">
+                        <button onclick="loadMoreTests(this)" style="background:#007bff;color:white;border:none;padding:10px 24px;border-radius:6px;cursor:pointer;font-size:14px;transition:background 0.2s;">Load More</button>
+                    </div>
+                    ` : ''}
+                    
                     <div style="text-align:center;margin-top:25px;padding-top:20px;border-top:1px solid #eee;">
                         <button onclick="removeModals()" style="background:#6c757d;color:white;border:none;padding:12px 30px;border-radius:8px;cursor:pointer;font-size:16px;transition:background 0.2s;">Close</button>
                     </div>
@@ -324,6 +382,7 @@ document.addEventListener('DOMContentLoaded', function() {
     // Make functions globally available
     window.loadTestResults = loadTestResults;
     window.removeModals = removeModals;
+    window.loadMoreTests = loadMoreTests;
     window.copyContent = function(text, button) {
         navigator.clipboard.writeText(text).then(() => {
             const originalText = button.textContent;
@@ -0,0 +1,41 @@
+"""
+Shared fixtures: one app per test session on a throwaway SQLite database.
+
+The services read their settings from the environment when they are
+imported, so the environment is set before anything from the app is.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+_DB_DIR = tempfile.mkdtemp(prefix="imp-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+os.environ["SHARED_CACHE_ENABLED"] = "0"
+os.environ["WECAR_INGEST_INTERVAL"] = "0"
+
+
+@pytest.fixture(scope="session")
+def app():
+    from main import create_app
+
+    app = create_app()
+    app.config["TESTING"] = True
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def app_context(app):
+    with app.app_context():
+        yield
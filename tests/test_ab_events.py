@@ -0,0 +1,89 @@
+import pytest
+
+from models.ab_testing import ABTestVariation
+from models.social_media import db
+from services.ab_event_service import ABEventService, ShardedCounter
+from services.ab_testing_service import ab_testing_service
+
+
+@pytest.fixture
+def variation_ids(app_context):
+    test = ab_testing_service.create_test_variations("Events", {"content": "Open house Sunday", "seed": 3})
+    return [variation["id"] for variation in test["variations"]]
+
+
+def _counts(variation_id):
+    db.session.expire_all()
+    variation = db.session.get(ABTestVariation, variation_id)
+    return variation.impressions, variation.clicks, variation.conversions
+
+
+def test_sharded_counter_drain_and_restore():
+    counter = ShardedCounter(shards=4)
+    counter.add("a", 0)
+    counter.add("a", 0, 2)
+    counter.add("b", 1)
+    drained = counter.drain()
+    assert drained == {"a": [3, 0, 0], "b": [0, 1, 0]}
+    assert counter.pending() == 0
+    counter.add("a", 2)
+    counter.restore(drained)
+    assert counter.drain() == {"a": [3, 0, 1], "b": [0, 1, 0]}
+
+
+def test_invalid_events_are_reported_by_index(variation_ids):
+    service = ABEventService()
+    result = service.record_events([
+        {"variation_id": variation_ids[0], "type": "impression"},
+        {"variation_id": variation_ids[0], "type": "view"},
+        {"variation_id": "no-such-variation", "type": "click"},
+        {"variation_id": variation_ids[1], "type": "click", "count": 0},
+        "click",
+    ])
+    assert (result["accepted"], result["rejected"]) == (1, 4)
+    assert [error["index"] for error in result["errors"]] == [1, 2, 3, 4]
+    assert result["errors"][1]["error"] == "Unknown variation_id"
+
+
+def test_flush_applies_every_pending_count(variation_ids):
+    service = ABEventService()
+    service.record_events(
+        [{"variation_id": variation_ids[0], "type": "impression", "count": 10}]
+        + [{"variation_id": variation_ids[0], "type": "click"}] * 3
+        + [{"variation_id": variation_ids[1], "type": "conversion"}]
+    )
+    version = ab_testing_service.current_version()
+    assert service.flush() == 2
+    assert _counts(variation_ids[0]) == (10, 3, 0)
+    assert _counts(variation_ids[1]) == (0, 0, 1)
+    assert ab_testing_service.current_version() == version + 1
+    assert service.stats()["flushed_events"] == 14
+    assert service.flush() == 0
+
+
+def test_failed_flush_restores_the_counts(variation_ids, monkeypatch):
+    service = ABEventService()
+    service.record_events([{"variation_id": variation_ids[0], "type": "impression", "count": 5}])
+
+    def fail():
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(ab_testing_service, "bump_version", fail)
+    with pytest.raises(RuntimeError):
+        service.flush()
+    assert _counts(variation_ids[0]) == (0, 0, 0)
+    assert service.counter.pending() == 1
+
+    monkeypatch.undo()
+    service.record_events([{"variation_id": variation_ids[0], "type": "impression"}])
+    service.flush()
+    assert _counts(variation_ids[0]) == (6, 0, 0)
+
+
+def test_events_route_accepts_a_batch(client, variation_ids):
+    response = client.post(
+        "/api/ab-testing/events", json={"events": [{"variation_id": variation_ids[0], "type": "click"}]}
+    )
+    assert response.status_code == 202
+    assert response.get_json()["data"]["accepted"] == 1
+    assert client.post("/api/ab-testing/events", json={"events": "click"}).status_code == 400
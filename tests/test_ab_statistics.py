@@ -0,0 +1,108 @@
+import math
+
+import pytest
+
+from services.ab_statistics import (
+    ABStatisticsEngine,
+    analyze_counts,
+    probability_b_beats_a,
+    probability_best,
+    two_proportion_z_test,
+    wilson_interval,
+)
+
+
+def test_wilson_interval_brackets_the_rate():
+    low, high = wilson_interval(30, 100)
+    assert 0.21 < low < 0.3 < high < 0.4
+
+
+def test_wilson_interval_without_trials():
+    assert wilson_interval(0, 0) == (0.0, 0.0)
+
+
+def test_wilson_interval_clamps_more_successes_than_trials():
+    # Clicks and impressions are recorded separately, so this happens
+    low, high = wilson_interval(5, 2)
+    assert 0.0 <= low <= high == 1.0
+
+
+def test_two_proportion_z_test():
+    z, p_value = two_proportion_z_test(100, 1000, 150, 1000)
+    assert z > 3
+    assert p_value < 0.01
+    assert two_proportion_z_test(1, 0, 1, 10) == (0.0, 1.0)
+
+
+def test_two_proportion_z_test_with_more_successes_than_trials():
+    z, p_value = two_proportion_z_test(3, 1, 1, 10)
+    assert math.isfinite(z)
+    assert 0.0 <= p_value <= 1.0
+
+
+def test_probability_b_beats_a_is_symmetric():
+    p = probability_b_beats_a(11, 91, 21, 81)
+    assert p > 0.95
+    assert probability_b_beats_a(21, 81, 11, 91) == pytest.approx(1 - p, abs=1e-9)
+
+
+def test_probability_b_beats_a_normal_approximation_agrees():
+    exact = probability_b_beats_a(1001, 9001, 1101, 8901)
+    approx = probability_b_beats_a(1001.5, 9001, 1101.5, 8901)
+    assert approx == pytest.approx(exact, abs=0.02)
+
+
+def test_probability_best_sums_to_one():
+    best = probability_best([(11, 91), (21, 81), (16, 86)], seed=1)
+    assert sum(best) == pytest.approx(1.0)
+    assert best.index(max(best)) == 1
+
+
+def test_probability_best_of_two_is_the_closed_form():
+    best = probability_best([(11, 91), (21, 81)])
+    assert best[1] == probability_b_beats_a(11, 91, 21, 81)
+
+
+def test_probability_best_is_reproducible_for_a_seed():
+    posteriors = [(11, 91), (13, 89), (12, 90)]
+    assert probability_best(posteriors, seed=5) == probability_best(posteriors, seed=5)
+
+
+def test_analyze_counts_picks_a_significant_winner():
+    result = analyze_counts([(1000, 100), (1000, 160)])
+    assert result["winner"] == 1
+    assert result["variations"][1]["significant"]
+    assert result["variations"][1]["lift_vs_control"] == pytest.approx(0.6)
+    assert result["total_trials"] == 2000
+
+
+def test_analyze_counts_without_a_winner():
+    result = analyze_counts([(50, 5), (50, 6)])
+    assert result["winner"] is None
+    assert result["leader"] in (0, 1)
+
+
+def test_analyze_counts_with_more_successes_than_trials():
+    result = analyze_counts([(1, 3), (10, 1)])
+    control = result["variations"][0]
+    assert control["rate"] == 1.0
+    assert 0.0 <= control["confidence_interval"][0] <= control["confidence_interval"][1] <= 1.0
+    assert 0.0 <= result["variations"][1]["probability_beats_control"] <= 1.0
+
+
+def test_analyze_counts_empty():
+    assert analyze_counts([]) == {"variations": [], "winner": None, "total_trials": 0}
+
+
+def test_engine_memoises_until_counts_change():
+    engine = ABStatisticsEngine()
+    test = {"id": "t", "variations": [{"impressions": 10, "clicks": 1}, {"impressions": 10, "clicks": 2}]}
+    first = engine.analyze_test(test)
+    assert engine.analyze_test(test) is first
+    test["variations"][1]["clicks"] = 3
+    assert engine.analyze_test(test) is not first
+
+
+def test_engine_rejects_unknown_metric():
+    with pytest.raises(ValueError):
+        ABStatisticsEngine().analyze_test({"id": "t", "variations": []}, metric="views")
@@ -0,0 +1,63 @@
+from sqlalchemy import update
+
+from models.ab_testing import ABTestVariation
+from models.social_media import db
+from services.ab_testing_service import ab_testing_service
+
+
+def _create_test(client, **base_content):
+    response = client.post(
+        "/api/ab-testing/create",
+        json={"test_name": "Store test", "base_content": {"content": "Just listed in Windsor", "seed": 7, **base_content}},
+    )
+    assert response.status_code == 200
+    return response.get_json()["test"]
+
+
+def _impressions(client, test_id):
+    data = client.get(f"/api/ab-testing/analyze-results/{test_id}").get_json()["data"]
+    return [variation["impressions"] for variation in data["variations"]]
+
+
+def test_tests_are_read_back_from_the_database(client, app):
+    test = _create_test(client)
+    with app.app_context():
+        ab_testing_service.cache.clear()
+        stored = ab_testing_service.get_test(test["id"])
+    assert stored["variations"] == test["variations"]
+    assert stored["name"] == "Store test"
+
+
+def test_unknown_test_is_404(client):
+    assert client.get("/api/ab-testing/analyze-results/no-such-test").status_code == 404
+
+
+def test_counters_flushed_by_another_worker_are_not_served_stale(client, app):
+    test = _create_test(client)
+    assert _impressions(client, test["id"]) == [0, 0]
+
+    # Another worker's flush: it updates the counters and bumps the store
+    # version, but cannot drop this worker's cached copy
+    with app.app_context():
+        db.session.execute(
+            update(ABTestVariation)
+            .where(ABTestVariation.id == test["variations"][0]["id"])
+            .values(impressions=ABTestVariation.impressions + 40)
+        )
+        ab_testing_service.bump_version()
+        db.session.commit()
+
+    assert _impressions(client, test["id"]) == [40, 0]
+
+
+def test_cached_tests_are_reused_while_the_store_is_unchanged(client):
+    test = _create_test(client)
+    _impressions(client, test["id"])
+    hits = ab_testing_service.cache.hits
+    _impressions(client, test["id"])
+    assert ab_testing_service.cache.hits == hits + 1
+
+
+def test_invalid_options_are_rejected(client):
+    response = client.post("/api/ab-testing/create", json={"base_content": {"content": "x", "variations": 0}})
+    assert response.status_code == 400
@@ -0,0 +1,77 @@
+import uuid
+
+import pytest
+
+from services.ab_event_service import ab_event_service
+from services.ab_testing_service import ab_testing_service
+
+
+@pytest.fixture
+def platform():
+    return f"platform-{uuid.uuid4().hex[:8]}"
+
+
+@pytest.fixture
+def tests_created(app, client, platform):
+    # A background flush of pending events would change the ETags mid-test
+    with app.app_context():
+        ab_event_service.flush()
+    ids = []
+    for i in range(5):
+        response = client.post(
+            "/api/ab-testing/create",
+            json={"test_name": f"Listing {i}", "base_content": {"content": "Open house", "platform": platform, "seed": i}},
+        )
+        ids.append(response.get_json()["test"]["id"])
+    return ids
+
+
+def _pages(client, query):
+    ids, cursor = [], None
+    while True:
+        url = f"/api/ab-testing/tests?{query}" + (f"&cursor={cursor}" if cursor else "")
+        data = client.get(url).get_json()
+        ids += [test["id"] for test in data["tests"]]
+        cursor = data["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+def test_pages_follow_next_cursor(client, platform, tests_created):
+    assert _pages(client, f"platform={platform}&limit=2") == tests_created
+    assert _pages(client, f"platform={platform}&limit=2&order=desc") == tests_created[::-1]
+
+
+def test_summaries_leave_out_variations(client, platform, tests_created):
+    data = client.get(f"/api/ab-testing/tests?platform={platform}&summary=true&limit=1").get_json()
+    (test,) = data["tests"]
+    assert "variations" not in test
+    assert test["variation_count"] == 2
+
+
+def test_unchanged_poll_is_answered_before_reading_tests(client, platform, tests_created, monkeypatch):
+    first = client.get(f"/api/ab-testing/tests?platform={platform}")
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "no-cache"
+
+    def unexpected(*args, **kwargs):
+        raise AssertionError("tests were read for an unchanged poll")
+
+    monkeypatch.setattr(ab_testing_service, "list_tests", unexpected)
+    response = client.get(f"/api/ab-testing/tests?platform={platform}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+
+def test_etag_changes_with_the_store_and_the_query(client, platform, tests_created):
+    etag = client.get(f"/api/ab-testing/tests?platform={platform}").headers["ETag"]
+    assert client.get(f"/api/ab-testing/tests?platform={platform}&limit=1").headers["ETag"] != etag
+    client.post("/api/ab-testing/create", json={"base_content": {"content": "Sold", "platform": platform}})
+    response = client.get(f"/api/ab-testing/tests?platform={platform}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+@pytest.mark.parametrize("query", ["limit=many", "cursor=not-a-cursor"])
+def test_bad_parameters_are_400(client, query):
+    assert client.get(f"/api/ab-testing/tests?{query}").status_code == 400
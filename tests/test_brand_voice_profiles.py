@@ -0,0 +1,88 @@
+import uuid
+
+from models.social_media import BrandVoiceProfile, TrainingData, db
+
+
+def _user() -> str:
+    return f"profile-{uuid.uuid4()}"
+
+
+def _train(client, user_id, content, post_type="listing"):
+    response = client.post(
+        "/api/brand-voice/train", json={"user_id": user_id, "content": content, "post_type": post_type}
+    )
+    assert response.status_code == 200
+
+
+def test_voice_profile_without_a_user_is_the_sample(client):
+    response = client.get("/api/brand-voice/voice-profile")
+    assert response.status_code == 200
+    assert response.get_json()["data"]["dominant_tone"]
+
+
+def test_voice_profile_follows_training_data(client):
+    user_id = _user()
+    _train(client, user_id, "Just listed in Windsor! #YQG")
+    _train(client, user_id, "Open house Sunday? #YQG #OpenHouse", post_type="event")
+
+    overall = client.get(f"/api/brand-voice/voice-profile?user_id={user_id}")
+    assert overall.status_code == 200
+    assert overall.get_json()["data"]["hashtags"][0] == "#YQG"
+
+    events = client.get(f"/api/brand-voice/voice-profile?user_id={user_id}&post_type=event")
+    assert "#OpenHouse" in events.get_json()["data"]["hashtags"]
+    assert client.get(f"/api/brand-voice/voice-profile?user_id={user_id}&post_type=post").status_code == 404
+
+
+def test_unknown_user_has_no_profile(client):
+    assert client.get(f"/api/brand-voice/voice-profile?user_id={_user()}").status_code == 404
+
+
+def test_reads_do_not_rebuild_profiles(app, client):
+    user_id = _user()
+    with app.app_context():
+        # Posts stored without their profile, as before profiles existed
+        db.session.add(TrainingData(user_id=user_id, content="Sold in Windsor! #Sold", post_type="listing"))
+        db.session.commit()
+
+    assert client.get(f"/api/brand-voice/voice-profile?user_id={user_id}").status_code == 404
+    with app.app_context():
+        assert BrandVoiceProfile.query.filter_by(user_id=user_id).count() == 0
+
+    with app.app_context():
+        result = app.test_cli_runner().invoke(args=["rebuild-profiles", "--user-id", user_id])
+    assert result.exit_code == 0
+    assert "from 1 posts" in result.output
+    response = client.get(f"/api/brand-voice/voice-profile?user_id={user_id}")
+    assert response.status_code == 200
+    assert response.get_json()["data"]["hashtags"] == ["#Sold"]
+
+
+def test_rebuild_matches_the_incremental_profile(app, client):
+    user_id = _user()
+    for content in ("Just listed! #Windsor", "Price drop on Elm St. #Windsor #Deal", "Open house?"):
+        _train(client, user_id, content)
+    before = client.get(f"/api/brand-voice/voice-profile?user_id={user_id}").get_json()["data"]
+    with app.app_context():
+        app.test_cli_runner().invoke(args=["rebuild-profiles", "--user-id", user_id])
+    after = client.get(f"/api/brand-voice/voice-profile?user_id={user_id}").get_json()["data"]
+    before.pop("last_updated")
+    after.pop("last_updated")
+    assert after == before
+
+
+def test_the_all_post_types_value_is_reserved(client):
+    user_id = _user()
+    reserved = BrandVoiceProfile.ALL_POST_TYPES
+    response = client.post(
+        "/api/brand-voice/train", json={"user_id": user_id, "content": "Hello", "post_type": reserved}
+    )
+    assert response.status_code == 400
+
+    response = client.post(
+        "/api/brand-voice/train-batch",
+        json=[{"user_id": user_id, "content": "Hello", "post_type": reserved}],
+    )
+    summary = response.get_json()["data"]
+    assert (summary["inserted"], summary["failed"]) == (0, 1)
+    assert "reserved" in summary["errors"][0]["error"]
@@ -0,0 +1,99 @@
+import pytest
+
+from services.cache import TTLCache
+
+
+class FakeTimer:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_ttl_cache_expires_entries():
+    timer = FakeTimer()
+    cache = TTLCache(maxsize=4, ttl=10, timer=timer)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    timer.now += 10
+    assert cache.get("a") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_ttl_cache_per_entry_ttl():
+    timer = FakeTimer()
+    cache = TTLCache(ttl=10, timer=timer)
+    cache.set("short", 1, ttl=1)
+    cache.set("long", 2)
+    timer.now += 5
+    assert cache.get("short") is None
+    assert cache.get("long") == 2
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_cache_invalidation():
+    cache = TTLCache()
+    cache.set(("test", 1), "x")
+    cache.set(("test", 2), "y")
+    cache.set(("other", 1), "z")
+    assert cache.invalidate(("other", 1))
+    assert not cache.invalidate(("other", 1))
+    assert cache.invalidate_where(lambda key: key[0] == "test") == 2
+    assert len(cache) == 0
+
+
+def test_get_or_set_computes_once():
+    cache = TTLCache()
+    calls = []
+    for _ in range(3):
+        assert cache.get_or_set("k", lambda: calls.append(1) or "v") == "v"
+    assert len(calls) == 1
+
+
+def test_get_or_set_does_not_store_a_value_invalidated_while_computing():
+    cache = TTLCache()
+
+    def compute():
+        cache.invalidate("k")
+        return "stale"
+
+    assert cache.get_or_set("k", compute) == "stale"
+    assert cache.get("k") is None
+    assert cache.get_or_set("k", lambda: "fresh") == "fresh"
+    assert cache.get("k") == "fresh"
+
+
+@pytest.mark.parametrize("wipe", [lambda cache: cache.clear(), lambda cache: cache.invalidate_where(lambda key: True)])
+def test_get_or_set_does_not_store_across_a_clear(wipe):
+    cache = TTLCache()
+
+    def compute():
+        wipe(cache)
+        return "stale"
+
+    cache.get_or_set("k", compute)
+    assert cache.get("k") is None
+
+
+def test_get_or_set_propagates_errors():
+    cache = TTLCache()
+
+    def compute():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_set("k", compute)
+    assert cache.get_or_set("k", lambda: 1) == 1
@@ -0,0 +1,55 @@
+import time
+import uuid
+
+import pytest
+
+from services import corpus_analysis_service as corpus_module
+from services.corpus_analysis_service import CorpusAnalysisService, corpus_analysis_service
+
+POSTS = ["Just listed in Windsor! #YQG", "Open house Sunday?", "Sold over asking. Thank you!"]
+
+
+@pytest.fixture
+def user_id(client):
+    user_id = f"user-{uuid.uuid4()}"
+    records = [{"user_id": user_id, "content": content, "post_type": "listing"} for content in POSTS]
+    assert client.post("/api/brand-voice/train-batch", json=records).status_code == 200
+    return user_id
+
+
+def _wait_for_job(client, status_url, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(status_url).get_json()["data"]
+        if job["status"] not in ("queued", "running") or time.monotonic() > deadline:
+            return job
+        time.sleep(0.02)
+
+
+@pytest.mark.parametrize("cores, web_workers, expected", [(8, 1, 8), (8, 4, 2), (8, 16, 1), (None, 4, 1)])
+def test_default_pool_shares_the_cores_between_web_workers(monkeypatch, cores, web_workers, expected):
+    monkeypatch.setattr(corpus_module.os, "cpu_count", lambda: cores)
+    assert CorpusAnalysisService(web_workers=web_workers).processes == expected
+    assert CorpusAnalysisService(processes=3, web_workers=web_workers).processes == 3
+
+
+def test_small_corpus_is_analysed_in_the_request(client, user_id):
+    response = client.get(f"/api/brand-voice/analyze-corpus?user_id={user_id}")
+    assert response.status_code == 200
+    data = response.get_json()["data"]
+    assert data["post_count"] == 3
+    assert list(data["by_post_type"]) == ["listing"]
+
+
+def test_large_corpus_runs_as_a_job(client, user_id, monkeypatch):
+    monkeypatch.setattr(corpus_analysis_service, "min_parallel", 3)
+    response = client.get(f"/api/brand-voice/analyze-corpus?user_id={user_id}")
+    assert response.status_code == 202
+    job = _wait_for_job(client, response.get_json()["status_url"])
+    assert job["status"] == "succeeded"
+    assert job["result"]["post_count"] == 3
+
+
+def test_unknown_user_is_404(client):
+    response = client.get(f"/api/brand-voice/analyze-corpus?user_id=user-{uuid.uuid4()}")
+    assert response.status_code == 404
@@ -0,0 +1,29 @@
+import json
+
+import pytest
+
+
+def test_generate_content_batch_streams_ndjson(client):
+    response = client.post(
+        "/api/brand-voice/generate-content/batch",
+        json={
+            "prompts": ["New listing downtown", {"prompt": "Open house", "content_type": "event"}, "New listing downtown"],
+            "profiles": [{}],
+        },
+    )
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    items = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    summary = items.pop()["summary"]
+    assert summary == {"total": 3, "unique": 2, "duplicates": 1}
+    assert [item["index"] for item in items] == [0, 1, 2]
+    assert items[2]["duplicate_of"] == 0
+    assert "generated_content" in items[0]
+
+
+@pytest.mark.parametrize(
+    "body",
+    [{"prompts": []}, {"prompts": [1]}, {"prompts": ["x"], "profiles": "all"}, {"prompts": ["x"], "profiles": [{"brand_profile": 1}]}],
+)
+def test_generate_content_batch_validates_its_input(client, body):
+    assert client.post("/api/brand-voice/generate-content/batch", json=body).status_code == 400
@@ -0,0 +1,81 @@
+import uuid
+
+import pytest
+
+from models.social_media import TrainingData, db
+from services.hashtag_index import HashtagIndex
+
+
+def _store(user_id, contents):
+    rows = [TrainingData(user_id=user_id, content=content, post_type="listing") for content in contents]
+    db.session.add_all(rows)
+    db.session.commit()
+    return [row.id for row in rows]
+
+
+@pytest.fixture
+def tag():
+    # Hashtags unique to the test keep the shared database's other posts out of the counts
+    suffix = uuid.uuid4().hex[:8]
+    return lambda name: f"#{name}{suffix}"
+
+
+@pytest.fixture
+def user_id(app_context, tag):
+    user_id = f"hashtags-{uuid.uuid4()}"
+    _store(
+        user_id,
+        [
+            f"Just listed {tag('Windsor')} {tag('Riverfront')}",
+            f"Open house {tag('Windsor')} {tag('Riverfront')}",
+            f"Sold {tag('Windsor')} {tag('Walkerville')}",
+        ],
+    )
+    return user_id
+
+
+def _counts(index, user_id, text, k=3):
+    return {result["tag"]: result["count"] for result in index.related(text, user_id, k) if result["score"]}
+
+
+def test_related_ranks_by_co_occurrence(user_id, tag):
+    index = HashtagIndex(refresh_seconds=1e9)
+    results = index.related(f"New listing {tag('Windsor')}", user_id, k=2)
+    assert [result["tag"] for result in results] == [tag("Riverfront"), tag("Walkerville")]
+    assert results[0]["score"] > results[1]["score"] > 0
+    assert results[0]["count"] == 2
+
+
+def test_added_posts_are_counted_once_without_a_reload(user_id, tag):
+    index = HashtagIndex(refresh_seconds=1e9)
+    assert _counts(index, user_id, tag("Windsor"))[tag("Walkerville")] == 1
+    index.add(user_id, 10**9, f"Walkerville bungalow {tag('Windsor')} {tag('Walkerville')}")
+    index.add(user_id, 10**9, f"Walkerville bungalow {tag('Windsor')} {tag('Walkerville')}")
+    assert _counts(index, user_id, tag("Windsor"))[tag("Walkerville")] == 2
+
+
+def test_catch_up_skips_posts_already_added(user_id, tag):
+    index = HashtagIndex(refresh_seconds=1e9)
+    index.related(tag("Windsor"), user_id)
+    (new_id,) = _store(user_id, [f"Corner lot {tag('Windsor')} {tag('Walkerville')}"])
+    index.add(user_id, new_id, f"Corner lot {tag('Windsor')} {tag('Walkerville')}")
+    # The catch-up re-reads the new row, which is within the window of ids it remembers
+    index.mark_stale(user_id)
+    assert _counts(index, user_id, tag("Windsor"))[tag("Walkerville")] == 2
+
+
+@pytest.mark.parametrize("window, found", [(1, False), (2, True)])
+def test_catch_up_finds_rows_committed_out_of_id_order(user_id, tag, window, found):
+    late_id, newest_id = _store(user_id, [f"Pool {tag('Windsor')} {tag('Pool')}", "Corner lot"])
+    db.session.delete(db.session.get(TrainingData, late_id))
+    db.session.commit()
+
+    index = HashtagIndex(refresh_seconds=1e9, catchup_window=window)
+    assert tag("Pool") not in _counts(index, user_id, tag("Windsor"))
+    # The lower id commits after the higher one was counted
+    db.session.add(TrainingData(id=late_id, user_id=user_id, content=f"Pool {tag('Windsor')} {tag('Pool')}", post_type="listing"))
+    db.session.commit()
+
+    index.mark_stale(user_id)
+    assert (tag("Pool") in _counts(index, user_id, tag("Windsor"))) is found
+    assert index._users[user_id].max_id == newest_id
@@ -0,0 +1,103 @@
+import io
+import os
+import time
+import uuid
+
+import pytest
+
+from services.brand_voice_analysis_service import brand_voice_analysis_service
+from services.corpus_analysis_service import corpus_analysis_service
+from services.job_service import job_service
+
+POSTS = "Just listed in Windsor! #YQG\n\nOpen house Sunday?\nCall me.\n\n\n🏡 Dream home #DreamHome\n"
+
+
+def _user() -> str:
+    return f"user-{uuid.uuid4()}"
+
+
+def _wait_for_job(client, status_url, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(status_url).get_json()["data"]
+        if job["status"] not in ("queued", "running") or time.monotonic() > deadline:
+            return job
+        time.sleep(0.02)
+
+
+@pytest.fixture
+def worker_processes(monkeypatch):
+    corpus_analysis_service.shutdown()
+    monkeypatch.setattr(corpus_analysis_service, "processes", 2)
+    monkeypatch.setattr(corpus_analysis_service, "chunk_size", 1)
+    yield
+    corpus_analysis_service.shutdown()
+
+
+def test_analyze_text_runs_as_a_job(client):
+    response = client.post(
+        "/api/brand-voice/analyze-text",
+        json={"content": "Great home. Big yard. Call now!", "async": True, "user_id": _user()},
+    )
+    assert response.status_code == 202
+    status_url = response.get_json()["status_url"]
+    assert response.headers["Location"] == status_url
+
+    job = _wait_for_job(client, status_url)
+    assert job["status"] == "succeeded"
+    assert job["progress"] == 1.0
+    assert job["result"]["writing_style"] == "detailed"
+
+    synchronous = client.post("/api/brand-voice/analyze-text", json={"content": "Great home. Big yard. Call now!"})
+    assert synchronous.get_json()["data"] == job["result"]
+
+
+def test_unknown_job_is_404(client):
+    assert client.get(f"/api/jobs/{uuid.uuid4()}").status_code == 404
+
+
+def test_jobs_beyond_the_per_user_limit_are_rejected(client, monkeypatch):
+    monkeypatch.setattr(job_service, "max_per_user", 1)
+    release = []
+
+    def slow(context):
+        deadline = time.monotonic() + 5
+        while not release and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return {}
+
+    user_id = _user()
+    with client.application.app_context():
+        first = job_service.submit("test", user_id, slow)
+    try:
+        response = client.post(
+            "/api/brand-voice/analyze-text", json={"content": "Hello", "async": True, "user_id": user_id}
+        )
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "10"
+    finally:
+        release.append(True)
+    job = _wait_for_job(client, f"/api/jobs/{first['id']}")
+    assert job["status"] == "succeeded"
+
+
+def test_run_computes_in_a_worker_process(worker_processes):
+    assert corpus_analysis_service.run(os.getpid) != os.getpid()
+    assert corpus_analysis_service.run(
+        brand_voice_analysis_service.analyze_from_text_input, "Great home. Big yard. Call now!", "listing"
+    ) == brand_voice_analysis_service.analyze_from_text_input("Great home. Big yard. Call now!", "listing")
+
+
+def test_uploads_are_analysed_in_worker_processes(worker_processes):
+    progress = []
+    data = POSTS.encode("utf-8")
+    result = corpus_analysis_service.analyze_stream(
+        io.BytesIO(data), progress=progress.append, total_bytes=len(data)
+    )
+    expected = brand_voice_analysis_service.analyze_stream(io.BytesIO(data))
+    # Chunks are merged as they complete, so only the float sums may differ
+    stats, expected_stats = result.pop("post_stats"), expected.pop("post_stats")
+    assert result == expected
+    assert stats["post_count"] == expected_stats["post_count"] == 3
+    assert stats["words_per_post"]["mean"] == pytest.approx(expected_stats["words_per_post"]["mean"])
+    assert len(progress) == 3 and progress[-1] == 1.0
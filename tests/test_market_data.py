@@ -0,0 +1,95 @@
+from datetime import date
+
+import pytest
+
+from models.market_data import MarketStat
+from models.social_media import db
+from services.wecar_ingestion_service import wecar_ingestion_service
+from services.wecar_market_service import wecar_market_service
+
+MONTHS = [
+    (date(2025, 7, 1), 1184, 488, 535800),
+    (date(2025, 8, 1), 1241, 485, 543150),
+    (date(2025, 9, 1), 1298, 482, 542100),
+    (date(2025, 10, 1), 1235, 479, 549450),
+]
+
+
+def _reset(stats):
+    MarketStat.query.delete()
+    db.session.commit()
+    wecar_ingestion_service.upsert(stats)
+    wecar_market_service.invalidate()
+
+
+@pytest.fixture
+def market(app):
+    with app.app_context():
+        _reset(
+            {"period": period, "new_listings": listings, "properties_sold": sold, "average_price": price}
+            for period, listings, sold, price in MONTHS
+        )
+    yield
+    with app.app_context():
+        _reset([])
+
+
+def test_current_stats_without_data_is_503(app, client):
+    with app.app_context():
+        _reset([])
+    response = client.get("/api/market-data/")
+    assert response.status_code == 503
+    assert response.get_json()["success"] is False
+
+
+def test_current_stats_carry_cache_headers(client, market):
+    response = client.get("/api/market-data/")
+    assert response.status_code == 200
+    assert response.get_json()["data"]["average_price"] == 549450
+    assert response.headers["ETag"].startswith('"market-')
+    assert response.headers["Cache-Control"] == (
+        f"public, max-age={int(wecar_market_service.ttl)}, "
+        f"stale-while-revalidate={int(wecar_market_service.max_stale)}"
+    )
+
+
+def test_matching_if_none_match_is_304(client, market):
+    etag = client.get("/api/market-data/").headers["ETag"]
+    response = client.get("/api/market-data/", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.get_data() == b""
+    assert response.headers["ETag"] == etag
+    assert "max-age" in response.headers["Cache-Control"]
+
+
+def test_etag_changes_after_ingestion(app, client, market):
+    etag = client.get("/api/market-data/").headers["ETag"]
+    with app.app_context():
+        wecar_ingestion_service.upsert([{"period": date(2025, 11, 1), "new_listings": 1100, "properties_sold": 470, "average_price": 552000}])
+        wecar_market_service.invalidate()
+    response = client.get("/api/market-data/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.get_json()["data"]["average_price"] == 552000
+
+
+def test_trends_cover_the_requested_range(client, market):
+    response = client.get("/api/market-data/market-trends?from=2025-08&to=2025-10&window=2")
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [trend["period"] for trend in body["trends"]] == ["2025-08", "2025-09", "2025-10"]
+    assert body["window"] == 2
+    assert response.headers["ETag"].startswith('"trends-')
+
+    repeat = client.get(
+        "/api/market-data/market-trends?from=2025-08&to=2025-10&window=2",
+        headers={"If-None-Match": response.headers["ETag"]},
+    )
+    assert repeat.status_code == 304
+
+
+@pytest.mark.parametrize(
+    "query",
+    ["from=2025-13", "to=October", "window=two", "window=0", "window=25", "from=2025-10&to=2025-08"],
+)
+def test_bad_trend_parameters_are_400(client, query):
+    assert client.get(f"/api/market-data/market-trends?{query}").status_code == 400
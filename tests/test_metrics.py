@@ -0,0 +1,74 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+from services.metrics import MetricsRegistry
+
+TRAINING_DATA = 'blueprint="brand_voice",endpoint="brand_voice.list_training_data"'
+
+
+def _samples(text):
+    """Parse Prometheus text into ``{series: value}``, skipping comments."""
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            series, value = line.rsplit(" ", 1)
+            samples[series] = float(value)
+    return samples
+
+
+def _dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def test_metrics_report_requests_and_their_queries(client):
+    before = _samples(client.get("/api/_metrics").get_data(as_text=True))
+    for _ in range(3):
+        assert client.get("/api/brand-voice/training-data?user_id=metrics-user").status_code == 200
+
+    response = client.get("/api/_metrics")
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    text = response.get_data(as_text=True)
+    assert "# TYPE http_request_duration_seconds histogram" in text
+    samples = _samples(text)
+
+    requests = f'http_requests_total{{{TRAINING_DATA},method="GET",status="200"}}'
+    assert samples[requests] - before.get(requests, 0) == 3
+    count = f"http_request_duration_seconds_count{{{TRAINING_DATA}}}"
+    assert samples[count] - before.get(count, 0) == 3
+    assert samples[f'http_request_duration_seconds_bucket{{{TRAINING_DATA},le="+Inf"}}'] == samples[count]
+    assert samples[f"db_queries_total{{{TRAINING_DATA}}}"] >= 3
+    assert "seo_analyses_total" in samples
+
+
+def test_histogram_buckets_are_cumulative(tmp_path):
+    registry = MetricsRegistry(directory=str(tmp_path))
+    labels = {"blueprint": "b", "endpoint": "e"}
+    for value in (0.001, 0.02, 0.02, 3.0, 60.0):
+        registry.observe("http_request_duration_seconds", labels, value)
+    samples = _samples(registry.render())
+    bucket = 'http_request_duration_seconds_bucket{blueprint="b",endpoint="e",le="%s"}'
+    assert samples[bucket % "0.005"] == 1
+    assert samples[bucket % "0.025"] == 3
+    assert samples[bucket % "5"] == 4
+    assert samples[bucket % "+Inf"] == 5
+    assert samples['http_request_duration_seconds_sum{blueprint="b",endpoint="e"}'] == pytest.approx(63.041)
+
+
+def test_snapshots_of_exited_workers_are_merged_once(tmp_path):
+    registry = MetricsRegistry(directory=str(tmp_path))
+    registry.inc("http_requests_total", {"endpoint": "e"}, 2)
+    dead = tmp_path / f"metrics-{_dead_pid()}.json"
+    dead.write_text(json.dumps({"counters": [["http_requests_total", [["endpoint", "e"]], 5]], "histograms": []}))
+
+    series = 'http_requests_total{endpoint="e"}'
+    assert _samples(registry.render())[series] == 7
+    # The exited worker's counts moved into the archive, and are not counted twice
+    assert not dead.exists()
+    assert (tmp_path / "metrics-archive.json").exists()
+    assert _samples(registry.render())[series] == 7
@@ -0,0 +1,60 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from models.social_media import TrainingData, db
+from services.pagination import decode_cursor, encode_cursor, keyset_page
+
+
+@pytest.fixture
+def rows(app_context):
+    """Twelve rows of a fresh user; pairs of them share a timestamp."""
+    user_id = f"pagination-{uuid.uuid4()}"
+    start = datetime(2024, 1, 1)
+    db.session.add_all(
+        TrainingData(user_id=user_id, content=f"post {i}", post_type="post", created_at=start + timedelta(minutes=i // 2))
+        for i in range(12)
+    )
+    db.session.commit()
+    return TrainingData.query.filter_by(user_id=user_id)
+
+
+def _all_pages(query, limit, descending=False):
+    ids, cursor, pages = [], None, 0
+    while True:
+        page, cursor = keyset_page(query, TrainingData.created_at, TrainingData.id, limit, cursor, descending)
+        ids += [row.id for row in page]
+        pages += 1
+        if cursor is None:
+            return ids, pages
+
+
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("limit", [1, 5, 12, 50])
+def test_pages_cover_every_row_once_in_order(rows, limit, descending):
+    expected = [
+        row.id
+        for row in sorted(rows.all(), key=lambda row: (row.created_at, row.id), reverse=descending)
+    ]
+    ids, pages = _all_pages(rows, limit, descending)
+    assert ids == expected
+    assert pages == max(1, -(-len(expected) // limit))
+
+
+def test_last_page_has_no_cursor(rows):
+    page, cursor = keyset_page(rows, TrainingData.created_at, TrainingData.id, 12)
+    assert len(page) == 12
+    assert cursor is None
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 6, 7, 8, 9)
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+    assert decode_cursor(encode_cursor(created_at, "abc")) == (created_at, "abc")
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", encode_cursor(datetime(2024, 1, 1), 1)[:-3], "W10"])
+def test_bad_cursor_raises_value_error(rows, cursor):
+    with pytest.raises(ValueError):
+        keyset_page(rows, TrainingData.created_at, TrainingData.id, 5, cursor)
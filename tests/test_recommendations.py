@@ -0,0 +1,45 @@
+import uuid
+
+from services.learning_algorithm_service import learning_algorithm_service
+
+
+def _user() -> str:
+    return f"recommend-{uuid.uuid4()}"
+
+
+def _train(client, user_id, content, post_type):
+    response = client.post(
+        "/api/brand-voice/train", json={"user_id": user_id, "content": content, "post_type": post_type}
+    )
+    assert response.status_code == 200
+
+
+def _recommend(client, user_id, content_type, **params):
+    query = {"user_id": user_id, "type": content_type, **params}
+    return client.get("/api/learning/content-recommendations", query_string=query).get_json()
+
+
+def test_recommendations_are_cached(client):
+    user_id = _user()
+    _train(client, user_id, "Just listed in Windsor! #YQG", "listing")
+    first = _recommend(client, user_id, "listing")
+    hits = learning_algorithm_service.cache.stats()["hits"]
+    assert _recommend(client, user_id, "listing") == first
+    assert learning_algorithm_service.cache.stats()["hits"] == hits + 1
+
+
+def test_new_training_data_invalidates_its_content_type(client):
+    user_id = _user()
+    assert _recommend(client, user_id, "listing")["success"] is False
+    _train(client, user_id, "Just listed in Windsor! #YQG", "listing")
+    assert _recommend(client, user_id, "listing")["success"] is not False
+
+
+def test_other_content_types_stay_cached(client):
+    user_id = _user()
+    _train(client, user_id, "Open house Sunday!", "event")
+    _recommend(client, user_id, "event")
+    _recommend(client, user_id, "event", platform="facebook")
+    _recommend(client, user_id, "listing")
+    assert learning_algorithm_service.invalidate_recommendations(user_id, "listing") == 1
+    assert learning_algorithm_service.invalidate_recommendations(user_id, "event") == 2
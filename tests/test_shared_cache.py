@@ -0,0 +1,99 @@
+import os
+import time
+
+import pytest
+
+from services import shared_cache as shared_cache_module
+from services.shared_cache import SharedFileCache
+
+pytestmark = pytest.mark.skipif(shared_cache_module.fcntl is None, reason="the shared cache needs fcntl")
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "shared-cache.bin")
+
+
+@pytest.fixture
+def cache(path):
+    return SharedFileCache(path)
+
+
+def test_values_are_shared_between_instances(cache, path):
+    cache.set("market:current", {"average_price": 549450, "months": ["2025-10"]})
+    other = SharedFileCache(path)
+    assert other.get("market:current") == {"average_price": 549450, "months": ["2025-10"]}
+    assert other.get("missing", "default") == "default"
+    assert other.stats()["entries"] == 1
+
+
+def test_entries_expire_and_respect_max_age(cache):
+    cache.set("short", 1, ttl=-1)
+    cache.set("long", 2)
+    assert cache.get("short") is None
+    assert cache.get("long", max_age=60) == 2
+    assert cache.get("long", max_age=-1) is None
+
+
+def test_readers_remap_after_a_replace(cache, path):
+    reader = SharedFileCache(path)
+    cache.set("profile:a:*", {"tone": "friendly"})
+    assert reader.get("profile:a:*") == {"tone": "friendly"}
+    inode = os.stat(path).st_ino
+    cache.set("profile:a:*", {"tone": "professional"})
+    # The writer replaced the file rather than rewriting it in place
+    assert os.stat(path).st_ino != inode
+    assert reader.get("profile:a:*") == {"tone": "professional"}
+
+
+def test_delete_prefix_only_drops_keys_under_it(cache, path):
+    cache.update({"profile:a:*": 1, "profile:a:listing": 2, "profile:ab:*": 3, "market:current": 4})
+    cache.delete_prefix("profile:a:")
+    reader = SharedFileCache(path)
+    assert reader.get("profile:a:*") is None
+    assert reader.get("profile:a:listing") is None
+    assert reader.get("profile:ab:*") == 3
+    assert reader.get("market:current") == 4
+
+
+def test_deleting_absent_keys_does_not_rewrite(cache, path):
+    cache.set("market:current", 1)
+    writes, inode = cache.writes, os.stat(path).st_ino
+    cache.delete(["profile:nobody:*"])
+    cache.delete_prefix("profile:nobody:")
+    assert cache.writes == writes
+    assert os.stat(path).st_ino == inode
+
+
+def test_as_of_refuses_values_read_before_an_invalidation(cache, path):
+    read_at = time.time()
+    # Another worker stores new data and invalidates the key meanwhile
+    SharedFileCache(path).delete(["profile:a:*"])
+    cache.set("profile:a:*", "stale", as_of=read_at)
+    assert cache.get("profile:a:*") is None
+
+    cache.set("profile:a:*", "fresh", as_of=time.time())
+    assert cache.get("profile:a:*") == "fresh"
+
+
+def test_as_of_honours_a_prefix_invalidation(cache):
+    read_at = time.time()
+    cache.delete_prefix("profile:a:")
+    cache.set("profile:a:listing", "stale", as_of=read_at)
+    cache.set("profile:b:listing", "unrelated", as_of=read_at)
+    assert cache.get("profile:a:listing") is None
+    assert cache.get("profile:b:listing") == "unrelated"
+
+
+def test_max_entries_keeps_the_newest(path):
+    cache = SharedFileCache(path, max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.set(key, key)
+    assert [cache.get(key) for key in ("a", "b", "c")] == [None, "b", "c"]
+
+
+def test_disabled_cache_misses_and_ignores_writes(path):
+    cache = SharedFileCache(path, enabled=False)
+    cache.set("k", 1)
+    assert cache.get("k") is None
+    assert not os.path.exists(path)
@@ -0,0 +1,89 @@
+import uuid
+
+import pytest
+
+from models.social_media import TrainingData, db
+from services import similarity_index as similarity_module
+from services.similarity_index import SimilarityIndex, similarity_index
+
+POSTS = [
+    ("listing", "Just listed: riverfront condo in Windsor with a view"),
+    ("listing", "New listing near the university, great for students"),
+    ("event", "Open house Sunday at the riverfront condo"),
+]
+
+
+def _store(user_id, posts):
+    rows = [TrainingData(user_id=user_id, content=content, post_type=post_type) for post_type, content in posts]
+    db.session.add_all(rows)
+    db.session.commit()
+    return [row.id for row in rows]
+
+
+@pytest.fixture
+def user_id(app_context):
+    user_id = f"similar-{uuid.uuid4()}"
+    _store(user_id, POSTS)
+    return user_id
+
+
+def test_search_ranks_and_filters(user_id):
+    index = SimilarityIndex(refresh_seconds=1e9)
+    results = index.search(user_id, "riverfront condo", k=5)
+    assert sorted(result["post_type"] for result in results) == ["event", "listing"]
+    assert results[0]["score"] >= results[1]["score"]
+    assert [r["preview"] for r in index.search(user_id, "university", 5)] == [POSTS[1][1][:50]]
+    assert [r["post_type"] for r in index.search(user_id, "riverfront condo", 5, "event")] == ["event"]
+    assert index.search(user_id, "the and of", 5) == []
+
+
+def test_added_posts_are_searchable_without_a_reload(user_id):
+    index = SimilarityIndex(refresh_seconds=1e9)
+    assert index.search(user_id, "pool", 5) == []
+    index.add(user_id, 10**9, "listing", "Backyard pool and hot tub")
+    assert [result["id"] for result in index.search(user_id, "pool", 5)] == [10**9]
+
+
+def test_stored_posts_reach_a_loaded_index(client, app):
+    user_id = f"similar-{uuid.uuid4()}"
+    client.post("/api/brand-voice/train", json={"user_id": user_id, "content": "Riverfront condo", "post_type": "listing"})
+    with app.app_context():
+        assert similarity_index.search(user_id, "pool", 5) == []
+    client.post("/api/brand-voice/train", json={"user_id": user_id, "content": "Pool and hot tub", "post_type": "listing"})
+    with app.app_context():
+        assert len(similarity_index.search(user_id, "pool", 5)) == 1
+
+
+@pytest.mark.parametrize("window, found", [(1, False), (2, True)])
+def test_catch_up_finds_rows_committed_out_of_id_order(user_id, monkeypatch, window, found):
+    monkeypatch.setattr(similarity_module, "CATCHUP_ID_WINDOW", window)
+    late_id, newest_id = _store(user_id, [("listing", "Backyard pool"), ("listing", "Corner lot")])
+    late = db.session.get(TrainingData, late_id)
+    db.session.delete(late)
+    db.session.commit()
+
+    index = SimilarityIndex(refresh_seconds=1e9)
+    assert index.search(user_id, "pool", 5) == []
+    # The lower id commits after the higher one was indexed
+    db.session.add(TrainingData(id=late_id, user_id=user_id, content="Backyard pool", post_type="listing"))
+    db.session.commit()
+    assert index.search(user_id, "pool", 5) == []
+
+    index.mark_stale(user_id)
+    assert bool(index.search(user_id, "pool", 5)) is found
+    assert index._indexes[user_id].max_id == newest_id
+
+
+def test_catch_up_only_loads_rows_missing_from_the_index(user_id, monkeypatch):
+    index = SimilarityIndex(refresh_seconds=1e9)
+    index.search(user_id, "condo", 5)
+    user_index = index._indexes[user_id]
+    added = []
+    original_add = user_index.add
+    monkeypatch.setattr(user_index, "add", lambda *args: added.append(args[0]) or original_add(*args))
+
+    (new_id,) = _store(user_id, [("listing", "Backyard pool")])
+    index.mark_stale(user_id)
+    index.search(user_id, "pool", 5)
+    assert added == [new_id]
+    assert len(user_index.doc_lengths) == len(POSTS) + 1
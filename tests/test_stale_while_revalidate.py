@@ -0,0 +1,88 @@
+import threading
+import time
+
+import pytest
+
+from services.cache import StaleWhileRevalidate
+
+
+class FakeTimer:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_stale_while_revalidate_serves_fresh_value():
+    timer = FakeTimer()
+    loads = []
+    swr = StaleWhileRevalidate(lambda: loads.append(1) or len(loads), ttl=10, max_stale=100, timer=timer)
+    assert swr.get() == 1
+    assert swr.get() == 1
+    assert swr.stats()["hits"] == 1
+    assert len(loads) == 1
+
+
+def test_stale_while_revalidate_serves_stale_value_while_refreshing():
+    timer = FakeTimer()
+    release = threading.Event()
+    values = iter([1, 2])
+
+    def load():
+        value = next(values)
+        if value == 2:
+            release.wait(5)
+        return value
+
+    swr = StaleWhileRevalidate(load, ttl=10, max_stale=100, timer=timer)
+    assert swr.get() == 1
+    timer.now += 20
+    assert swr.get() == 1
+    assert swr.get() == 1
+    assert swr.stats()["stale_hits"] == 2
+    release.set()
+    deadline = time.monotonic() + 5
+    while swr.stats()["loads"] < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert swr.get() == 2
+
+
+def test_stale_while_revalidate_loads_once_for_concurrent_cold_reads():
+    started = threading.Event()
+    calls = []
+
+    def load():
+        calls.append(1)
+        started.set()
+        time.sleep(0.05)
+        return "value"
+
+    swr = StaleWhileRevalidate(load, ttl=10, max_stale=100)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(swr.get())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["value"] * 8
+    assert len(calls) == 1
+
+
+def test_stale_while_revalidate_invalidate_drop_waits_for_reload():
+    timer = FakeTimer()
+    values = iter([1, 2])
+    swr = StaleWhileRevalidate(lambda: next(values), ttl=10, max_stale=100, timer=timer)
+    assert swr.get() == 1
+    swr.invalidate(drop=True)
+    assert swr.get() == 2
+
+
+def test_stale_while_revalidate_raises_when_the_first_load_fails():
+    def load():
+        raise RuntimeError("down")
+
+    swr = StaleWhileRevalidate(load)
+    with pytest.raises(RuntimeError):
+        swr.get()
+    assert swr.stats()["errors"] == 1
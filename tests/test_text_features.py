@@ -0,0 +1,73 @@
+"""
+`extract_features` must agree with the separate regex and split passes
+it replaced, so that analyses do not change with the single scan.
+"""
+
+import re
+
+import pytest
+
+from services.seo_service import seo_service
+from services.text_features import extract_features, extract_hashtags, tokenize
+
+TEXTS = [
+    "",
+    "   ",
+    "Great home. Big yard. Call now.",
+    "Just listed in Windsor! 3 bedrooms, 2 baths... Open house Sunday?",
+    "Looking for real estate in Windsor-Essex? DM me! #WindsorRealEstate #YQG",
+    "🏡✨ Dream home alert!!! 🔑 #DreamHome",
+    "trailing text without a terminator",
+    "Price: $549,900.\n\nNew listing\tnear the riverfront. Email me@example.com",
+    "multiple   spaces\n\nand\r\nline breaks ? ! .",
+    "café résumé naïve — unicode words, #Été",
+]
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_counts_match_the_regex_passes(text):
+    features = extract_features(text)
+    assert features.tokens == re.findall(r"\w+", text.lower())
+    assert features.word_count == len(tokenize(text))
+    assert features.whitespace_word_count == len(text.split())
+    assert features.exclamations == text.count("!")
+    assert features.questions == text.count("?")
+    assert features.sentence_fragments == len(re.split(r"[.!?]", text))
+    assert list(features.hashtags.elements()) == extract_hashtags(text)
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_keyword_hits_match_a_separate_scan(text):
+    features = extract_features(text, seo_service.matcher)
+    assert features.keyword_hits == seo_service.matcher.scan(text)
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_dropping_tokens_keeps_the_counts(text):
+    full = extract_features(text, seo_service.matcher)
+    lean = extract_features(text, seo_service.matcher, keep_tokens=False)
+    assert lean.tokens == [] and lean.sentence_boundaries == []
+    assert (lean.word_count, lean.sentence_count, lean.keyword_hits) == (
+        full.word_count,
+        full.sentence_count,
+        full.keyword_hits,
+    )
+
+
+def test_sentence_count_ignores_empty_fragments():
+    features = extract_features("Great home. Big yard. Call now.")
+    assert features.sentence_count == 3
+    assert features.sentence_fragments == 4
+
+
+def test_merge_adds_counts():
+    merged = extract_features("One! #a").merge(extract_features("Two? #a #b"))
+    assert merged.exclamations == 1
+    assert merged.questions == 1
+    assert merged.hashtags == {"#a": 2, "#b": 1}
+    assert merged.sentence_count == 4
+
+
+def test_seo_analysis_is_the_same_from_text_or_features():
+    text = TEXTS[4]
+    assert seo_service.analyze_features(extract_features(text, seo_service.matcher)) == seo_service.analyze_content(text)
@@ -0,0 +1,57 @@
+import json
+import uuid
+
+
+def _user() -> str:
+    return f"user-{uuid.uuid4()}"
+
+
+def test_train_batch_accepts_a_json_array(client):
+    user_id = _user()
+    records = [
+        {"user_id": user_id, "content": "Just listed in Windsor! #YQG", "post_type": "listing"},
+        {"user_id": user_id, "post_type": "listing"},
+        {"user_id": user_id, "content": "Open house Sunday?", "post_type": "listing"},
+    ]
+    response = client.post("/api/brand-voice/train-batch", json=records)
+    assert response.status_code == 200
+    summary = response.get_json()["data"]
+    assert (summary["received"], summary["inserted"], summary["failed"]) == (3, 2, 1)
+    assert summary["errors"][0]["row"] == 1
+
+    listed = client.get(f"/api/brand-voice/training-data?user_id={user_id}").get_json()
+    assert len(listed["data"]) == 2
+
+
+def test_train_batch_accepts_records_wrapped_in_an_object(client):
+    user_id = _user()
+    response = client.post(
+        "/api/brand-voice/train-batch",
+        json={"records": [{"user_id": user_id, "content": "Sold!", "post_type": "post"}]},
+    )
+    assert response.get_json()["data"]["inserted"] == 1
+
+
+def test_train_batch_streams_ndjson(client):
+    user_id = _user()
+    lines = [
+        json.dumps({"user_id": user_id, "content": f"Post number {i} #Windsor", "post_type": "post"})
+        for i in range(25)
+    ]
+    lines[3] = "{not json"
+    lines.insert(10, "")
+    response = client.post(
+        "/api/brand-voice/train-batch",
+        data="\n".join(lines) + "\n",
+        content_type="application/x-ndjson",
+    )
+    assert response.status_code == 200
+    summary = response.get_json()["data"]
+    assert (summary["received"], summary["inserted"], summary["failed"]) == (25, 24, 1)
+    assert summary["errors"][0]["row"] == 3
+    assert summary["errors"][0]["error"].startswith("Invalid JSON")
+
+
+def test_train_batch_rejects_a_non_list_body(client):
+    response = client.post("/api/brand-voice/train-batch", json={"records": "nope"})
+    assert response.status_code == 400
@@ -0,0 +1,98 @@
+import io
+import time
+
+import pytest
+
+from services import brand_voice_analysis_service as analysis_module
+from services.brand_voice_analysis_service import brand_voice_analysis_service
+
+POSTS = "Just listed in Windsor! #YQG\n\nOpen house Sunday?\nCall me.\n\n\n🏡 Dream home #DreamHome\n"
+
+
+def _analyze(text: str) -> dict:
+    return brand_voice_analysis_service.analyze_stream(io.BytesIO(text.encode("utf-8")))
+
+
+def _total_words(result: dict) -> float:
+    stats = result["post_stats"]
+    return stats["post_count"] * stats["words_per_post"]["mean"]
+
+
+def test_stream_splits_posts_on_blank_lines():
+    stats = _analyze(POSTS)["post_stats"]
+    assert stats["post_count"] == 3
+    assert stats["posts_with_questions"] == 1
+    assert stats["posts_with_emojis"] == 1
+
+
+def test_stream_matches_the_text_analysis_of_a_single_post():
+    text = "Great home. Big yard. Call now!"
+    result = _analyze(text)
+    result.pop("post_stats")
+    assert result == brand_voice_analysis_service.analyze_from_text_input(text)
+
+
+def test_overlong_posts_are_split_between_words(monkeypatch):
+    monkeypatch.setattr(analysis_module, "STREAM_READ_SIZE", 4)
+    monkeypatch.setattr(analysis_module, "MAX_POST_CHARS", 10)
+    text = "Windsor homes sell quickly near the riverfront"
+    result = _analyze(text)
+    # Every chunk boundary falls inside a word, yet no word is cut in two
+    assert result["post_stats"]["post_count"] > 1
+    assert _total_words(result) == len(text.split())
+    assert result["seo"] == brand_voice_analysis_service.analyze_from_text_input(text)["seo"]
+
+
+def test_a_single_overlong_token_is_still_split(monkeypatch):
+    monkeypatch.setattr(analysis_module, "STREAM_READ_SIZE", 4)
+    monkeypatch.setattr(analysis_module, "MAX_POST_CHARS", 10)
+    assert _analyze("x" * 35)["post_stats"]["post_count"] > 1
+
+
+def test_whitespace_inside_a_long_line_is_not_a_post_boundary(monkeypatch):
+    monkeypatch.setattr(analysis_module, "STREAM_READ_SIZE", 8)
+    # The second read of the first line is only spaces and its newline
+    stats = _analyze("Windsor!        \nmore of the same post\n\nnext post")["post_stats"]
+    assert stats["post_count"] == 2
+
+
+def _upload(client, text, filename="posts.txt", **form):
+    return client.post(
+        "/api/brand-voice/upload-content",
+        data={"file": (io.BytesIO(text.encode("utf-8")), filename), **form},
+        content_type="multipart/form-data",
+    )
+
+
+def test_upload_content_analyses_the_file(client):
+    response = _upload(client, POSTS)
+    assert response.status_code == 200
+    assert response.get_json()["data"] == _analyze(POSTS)
+
+
+@pytest.mark.parametrize(
+    "data, error",
+    [
+        ({}, "No file uploaded"),
+        ({"file": (io.BytesIO(b"x"), "")}, "No file selected"),
+        ({"file": (io.BytesIO(b"x"), "posts.csv")}, "Only .txt files are supported"),
+    ],
+)
+def test_upload_content_rejects_bad_files(client, data, error):
+    response = client.post("/api/brand-voice/upload-content", data=data, content_type="multipart/form-data")
+    assert response.status_code == 400
+    assert response.get_json()["error"] == error
+
+
+def test_upload_content_runs_as_a_job(client):
+    response = _upload(client, POSTS, **{"async": "true"})
+    assert response.status_code == 202
+    status_url = response.get_json()["status_url"]
+    deadline = time.monotonic() + 10
+    while True:
+        job = client.get(status_url).get_json()["data"]
+        if job["status"] not in ("queued", "running") or time.monotonic() > deadline:
+            break
+        time.sleep(0.02)
+    assert job["status"] == "succeeded"
+    assert job["result"] == _analyze(POSTS)
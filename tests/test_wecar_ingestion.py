@@ -0,0 +1,91 @@
+import os
+from datetime import date
+
+import pytest
+
+from models.market_data import MarketStat
+from models.social_media import db
+from services.wecar_ingestion_service import parse_period, parse_wecar_report, wecar_ingestion_service
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures", "wecar")
+
+
+def _fixture_path(name):
+    return os.path.join(FIXTURES, name)
+
+
+def _fixture(name):
+    with open(_fixture_path(name), encoding="utf-8") as handle:
+        return handle.read()
+
+
+@pytest.fixture
+def empty_market(app_context):
+    MarketStat.query.delete()
+    db.session.commit()
+    yield
+    MarketStat.query.delete()
+    db.session.commit()
+
+
+def test_statistics_table_gives_every_month():
+    stats = parse_wecar_report(_fixture("monthly_statistics.html"))
+    assert len(stats) == 16
+    assert stats[0] == {"period": date(2024, 7, 1), "new_listings": 980, "properties_sold": 380, "average_price": 498000}
+    assert stats[-1]["period"] == date(2025, 10, 1)
+    # The year-over-year change column is not mistaken for the price
+    assert stats[-1]["average_price"] == 549450
+
+
+def test_news_release_gives_its_month():
+    assert parse_wecar_report(_fixture("monthly_release.html")) == [
+        {"period": date(2025, 10, 1), "properties_sold": 468, "new_listings": 1187, "average_price": 581432}
+    ]
+
+
+def test_malformed_table_rows_are_skipped_or_left_empty():
+    stats = {entry["period"]: entry for entry in parse_wecar_report(_fixture("malformed_table.html"))}
+    # Rows without a month (totals, notes) are skipped; the header-less
+    # layout table and the release text are ignored
+    assert sorted(stats) == [date(2025, 8, 1), date(2025, 9, 1), date(2025, 10, 1)]
+    assert stats[date(2025, 8, 1)]["new_listings"] == 1241
+    # Unparseable and missing cells are None
+    assert stats[date(2025, 9, 1)] == {
+        "period": date(2025, 9, 1), "new_listings": None, "properties_sold": None, "average_price": 542100,
+    }
+    # The later, complete row for the same month wins over the empty one
+    assert stats[date(2025, 10, 1)]["properties_sold"] == 479
+
+
+def test_page_without_usable_data_gives_nothing():
+    assert parse_wecar_report("<html><body><table><tr><td>Phone</td></tr></table></body></html>") == []
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [("October 2025", date(2025, 10, 1)), ("Sep. 2024", date(2024, 9, 1)), ("2025-03", date(2025, 3, 1)), ("Total", None)],
+)
+def test_parse_period(text, expected):
+    assert parse_period(text) == expected
+
+
+def test_ingest_stores_a_report_file(empty_market):
+    result = wecar_ingestion_service.ingest(_fixture_path("monthly_statistics.html"))
+    assert (result["parsed"], result["upserted"]) == (16, 16)
+    assert result["periods"][-1] == "2025-10"
+    assert MarketStat.query.count() == 16
+
+
+def test_ingest_keeps_stored_values_a_malformed_report_omits(empty_market):
+    wecar_ingestion_service.ingest(html=_fixture("monthly_statistics.html"))
+    result = wecar_ingestion_service.ingest(html=_fixture("malformed_table.html"))
+    assert result["upserted"] == 3
+    september = MarketStat.query.filter_by(period=date(2025, 9, 1)).one()
+    assert (september.new_listings, september.properties_sold, september.average_price) == (1298, 482, 542100)
+    assert MarketStat.query.count() == 16
+
+
+def test_ingest_of_a_page_without_data_writes_nothing(empty_market):
+    result = wecar_ingestion_service.ingest(html="<html><body><p>Maintenance</p></body></html>")
+    assert (result["parsed"], result["upserted"]) == (0, 0)
+    assert MarketStat.query.count() == 0